@@ -0,0 +1,87 @@
+"""
+Per-backend parser throughput on saved HTML fixtures.
+
+    python -m bench.bench_parsers --generate --firms 300 --licensees 40
+    python -m bench.bench_parsers --fixtures data/bench/fixtures --repeat 5
+
+A fixture directory holds list.html, firm_*.html and person_*.html. Every backend/mode is
+checked against html.parser full-tree output before it is timed.
+"""
+import argparse
+import glob
+import os
+import time
+from typing import Dict, List
+from config import Config
+from src.html_backend import resolve_backend
+from src.scraper_bsoup import FirmDetailParser, ListPageParser, PersonHistoryParser
+from .server import SyntheticSite
+
+DEFAULT_DIR = os.path.join("data", "bench", "fixtures")
+STUB = {"firm_name": "Fixture", "firm_url": "https://webb-site.com/dbpub/SFClicensees.asp",
+        "licence_start_list": "", "licence_end_list": ""}
+
+
+def generate(path: str, firms: int, licensees: int, samples: int = 50):
+    site = SyntheticSite(firms, licensees)
+    os.makedirs(path, exist_ok=True)
+    pages = {"list.html": site.list_page()}
+    for i in range(min(samples, firms)):
+        pages[f"firm_{i}.html"] = site.firm_page(i)
+    for i in range(min(samples, site.people)):
+        pages[f"person_{i}.html"] = site.person_page(i)
+    for name, html in pages.items():
+        with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+            f.write(html)
+    print(f"[BENCH] Wrote {len(pages)} fixtures -> {path}")
+
+
+def load(path: str) -> Dict[str, List[str]]:
+    def read(pattern: str) -> List[str]:
+        out = []
+        for name in sorted(glob.glob(os.path.join(path, pattern))):
+            with open(name, "r", encoding="utf-8") as f:
+                out.append(f.read())
+        return out
+    return {"list": read("list*.html"), "firm": read("firm_*.html"), "person": read("person_*.html")}
+
+
+def parse_all(cfg: Config, pages: Dict[str, List[str]]) -> Dict[str, list]:
+    lister, firm, person = ListPageParser(cfg), FirmDetailParser(None, cfg), PersonHistoryParser(None, cfg)
+    return {
+        "list": [lister.parse(h) for h in pages["list"]],
+        "firm": [firm.parse_html(STUB, h) for h in pages["firm"]],
+        "person": [person.parse_history_html(h) for h in pages["person"]],
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--fixtures", default=DEFAULT_DIR)
+    ap.add_argument("--generate", action="store_true", help="write synthetic fixtures first")
+    ap.add_argument("--firms", type=int, default=300)
+    ap.add_argument("--licensees", type=int, default=40)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--backends", default="html.parser,lxml,html5lib")
+    args = ap.parse_args()
+
+    if args.generate or not os.path.isdir(args.fixtures):
+        generate(args.fixtures, args.firms, args.licensees)
+    pages = load(args.fixtures)
+    mb = sum(len(h.encode("utf-8")) for group in pages.values() for h in group) / 1e6
+    n_pages = sum(len(group) for group in pages.values())
+
+    baseline = parse_all(Config(HTML_PARSER="html.parser", HTML_TARGETED=False), pages)
+    for backend in args.backends.split(","):
+        if resolve_backend(backend) != backend:
+            continue
+        for targeted in (False, True):
+            cfg = Config(HTML_PARSER=backend, HTML_TARGETED=targeted)
+            same = parse_all(cfg, pages) == baseline
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                parse_all(cfg, pages)
+            secs = (time.perf_counter() - t0) / args.repeat
+            mode = "targeted" if targeted else "full"
+            print(f"[BENCH] {backend:>11} {mode:>8}: {n_pages / secs:8.1f} pages/s "
+                  f"{mb / secs:6.2f} MB/s  identical={same}")
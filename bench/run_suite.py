@@ -0,0 +1,240 @@
+"""
+Per-stage benchmark of the pipeline on synthetic pages, saved as JSON for regression checks.
+
+    python -m bench.run_suite --firms 500 --licensees 30 --out data/bench/results.json
+    python -m bench.run_suite --fetch --error-rate 0.05 --latency-ms 20
+    python -m bench.run_suite --baseline data/bench/results.json --tolerance 0.15
+
+Stages: fetch (optional, HttpClient against bench.server), list_parse (ListPageParser),
+list_stream (ListPageParser.iter_parse over 64 KB chunks), firm_parse (FirmDetailParser), normalize (Transformer.normalize), validate (Validator) and
+snapshot (SnapshotStore write + latest). Latency percentiles are per unit: one request or
+page for fetch/parsers, one --batch of records for normalize/validate, one snapshot round trip.
+Peak RSS is sampled while each stage runs. Nothing leaves the machine.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from config import Config
+from src.schema import Firm
+from src.scraper_bsoup import FirmDetailParser, ListPageParser
+from src.snapshot import SnapshotStore
+from src.telemetry import percentile
+from src.transformer import Transformer
+from src.utils import HttpClient
+from src.validator import Validator
+from .server import FIRM_PATH, LIST_PATH, SyntheticSite, add_fault_args, faults_from_args, start_server
+
+DEFAULT_OUT = os.path.join("data", "bench", "results.json")
+
+
+def _rss_mb() -> float:
+    """Current resident set size; falls back to the process peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler:
+    """Highest RSS seen while the `with` block runs, sampled every `interval` seconds."""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_mb())
+
+
+def run_stage(name: str, units: List[Any], fn: Callable[[Any], Any], items_per_unit: Callable[[Any], int],
+              workers: int = 1) -> Dict[str, Any]:
+    """Time `fn` on each unit (on `workers` threads when > 1) and summarize."""
+    latencies: List[float] = []
+
+    def timed(unit):
+        t0 = time.perf_counter()
+        fn(unit)
+        latencies.append(time.perf_counter() - t0)
+
+    with RssSampler() as rss:
+        t0 = time.perf_counter()
+        if workers > 1:
+            with ThreadPoolExecutor(workers) as ex:
+                list(ex.map(timed, units))
+        else:
+            for unit in units:
+                timed(unit)
+        secs = time.perf_counter() - t0
+    items = sum(items_per_unit(u) for u in units)
+    result = {
+        "units": len(units),
+        "items": items,
+        "seconds": round(secs, 4),
+        "items_per_sec": round(items / secs, 2) if secs else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": round(rss.peak, 1),
+    }
+    print(f"[BENCH] {name:>10}: {result['items_per_sec']:>10.1f} items/s  p50 {result['p50_ms']:.2f}ms  "
+          f"p99 {result['p99_ms']:.2f}ms  rss {result['peak_rss_mb']}MB")
+    return result
+
+
+def _batches(records: List[Firm], size: int) -> List[List[Firm]]:
+    return [records[i:i + size] for i in range(0, len(records), size)] or [[]]
+
+
+def _git_rev() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    site = SyntheticSite(args.firms, args.licensees)
+    cfg = Config(HTML_PARSER=args.parser, HTML_TARGETED=args.targeted, CACHE_MODE="off",
+                 FETCH_LICENSEE_HISTORY=False, MAX_RETRIES=args.retries, BACKOFF_SECONDS=args.backoff)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    list_html = site.list_page()
+    stubs = ListPageParser(cfg).parse(list_html)
+    firm_pages = {s["firm_url"]: site.firm_page(i) for i, s in enumerate(stubs)}
+
+    if args.fetch:
+        faults = faults_from_args(args)
+        server, list_url = start_server(site, args.latency_ms, faults=faults)
+        base = list_url[:-len(LIST_PATH)]
+        http = HttpClient(cfg)
+        fetched: Dict[str, Optional[str]] = {}
+
+        def fetch(i: int):
+            r = http.get(f"{base}{FIRM_PATH}?p={i}")
+            fetched[i] = r.text if r else None
+
+        stages["fetch"] = run_stage("fetch", list(range(args.firms)), fetch, lambda _: 1, workers=http.policy.max_in_flight)
+        stages["fetch"]["failed"] = sum(1 for t in fetched.values() if t is None)
+        stages["fetch"]["server_statuses"] = {str(k): v for k, v in sorted(faults.statuses.items())}
+        stages["fetch"]["http"] = http.policy.stats()
+        server.shutdown()
+
+    stages["list_parse"] = run_stage("list_parse", [list_html] * args.repeat,
+                                     ListPageParser(cfg).parse, lambda _: args.firms)
+    chunked = [list_html[i:i + 64 * 1024] for i in range(0, len(list_html), 64 * 1024)]
+    stages["list_stream"] = run_stage("list_stream", [chunked] * args.repeat,
+                                      lambda c: list(ListPageParser(cfg).iter_parse(c)), lambda _: args.firms)
+
+    firm_parser = FirmDetailParser(None, cfg, fetch_history=False)
+    records: List[Firm] = []
+    stages["firm_parse"] = run_stage("firm_parse", stubs,
+                                     lambda s: records.append(firm_parser.parse_html(s, firm_pages[s["firm_url"]])),
+                                     lambda _: 1)
+
+    normalized: List[Firm] = []
+    stages["normalize"] = run_stage("normalize", _batches(records, args.batch),
+                                    lambda b: normalized.extend(Transformer.normalize(b)), len)
+
+    def validate(batch):
+        firms, lics = Validator.flatten(batch)
+        Validator.validate_frames(firms, lics)
+        Validator.metrics_frames(firms, lics)
+        Validator.metrics_detail(firms, lics)
+
+    stages["validate"] = run_stage("validate", _batches(normalized, args.batch), validate, len)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SnapshotStore(Config(SNAPSHOT_DIR=tmp, RUN_DATE=cfg.RUN_DATE))
+
+        def snapshot(_):
+            store.write_snapshot(normalized)
+            store.latest()
+
+        stages["snapshot"] = run_stage("snapshot", list(range(args.repeat)), snapshot, lambda _: len(normalized))
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+            "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                                         / (2 ** 20 if sys.platform == "darwin" else 1024), 1),
+        },
+        "stages": stages,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Stages whose throughput dropped by more than `tolerance` (fraction) versus `baseline`."""
+    regressions = []
+    for name, cur in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old.get("items_per_sec"):
+            continue
+        change = cur["items_per_sec"] / old["items_per_sec"] - 1.0
+        flag = "REGRESSION" if change < -tolerance else "ok"
+        print(f"[BENCH] {name:>10}: {change * 100:+6.1f}% items/s vs baseline "
+              f"({baseline.get('meta', {}).get('git_rev') or '?'})  {flag}")
+        if change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--firms", type=int, default=300)
+    ap.add_argument("--licensees", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=5, help="runs of the list-page and snapshot stages")
+    ap.add_argument("--batch", type=int, default=50, help="records per normalize/validate unit")
+    ap.add_argument("--parser", default=Config.HTML_PARSER, help="HTML_PARSER (default: as in config.py)")
+    ap.add_argument("--targeted", action=argparse.BooleanOptionalAction, default=Config.HTML_TARGETED,
+                    help="HTML_TARGETED (default: as in config.py)")
+    ap.add_argument("--fetch", action="store_true", help="also fetch firm pages from the local server")
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--retries", type=int, default=3)
+    ap.add_argument("--backoff", type=float, default=0.1, help="BACKOFF_SECONDS for the fetch stage")
+    add_fault_args(ap)
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--baseline", help="earlier results JSON to compare throughput against")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed throughput drop before flagging")
+    args = ap.parse_args()
+
+    baseline = None
+    if args.baseline:  # read first: --out may point at the same file
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    results = run_suite(args)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"[BENCH] Results -> {args.out}")
+    if baseline and compare(results, baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,285 @@
+"""
+Local stand-in for webb-site.com serving synthetic SFC licensee pages.
+
+    python -m bench.server --firms 200 --licensees 30 --latency-ms 50
+    python -m bench.server --error-rate 0.05 --bandwidth-kbps 512   # flaky, slow link
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+LIST_PATH = "/dbpub/SFClicount.asp"
+FIRM_PATH = "/dbpub/SFClicensees.asp"
+PERSON_PATH = "/dbpub/natperson.asp"
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"  # sent with validators=("last-modified",)
+
+
+def _day(n: int) -> str:
+    return (date(2020, 1, 1) + timedelta(days=n % 2000)).strftime("%Y-%m-%d")
+
+
+class SyntheticSite:
+    """Deterministic list / firm / person pages for `firms` firms with `licensees` rows each."""
+    def __init__(self, firms: int = 100, licensees: int = 20):
+        self.firms = firms
+        self.licensees = licensees
+        self.people = max(1, firms * licensees // 3)  # people appear under several firms
+
+    def person_id(self, firm: int, row: int) -> int:
+        return (firm * 7 + row * 13) % self.people
+
+    def _until(self, firm: int, row: int) -> str:
+        return _day(firm + row + 1500) if row % 3 == 0 else ""
+
+    def _current(self, firm: int, as_of: str) -> Tuple[int, int]:
+        """(RO, Rep) licensed at `firm` on `as_of`."""
+        ro = rep = 0
+        for j in range(self.licensees):
+            until = self._until(firm, j)
+            if _day(firm + j) <= as_of and not (until and until <= as_of):
+                ro, rep = (ro + 1, rep) if j % 4 == 0 else (ro, rep + 1)
+        return ro, rep
+
+    def list_page(self, as_of: str = "") -> str:
+        """
+        All firms; with `as_of` (the list page's d=YYYY-MM-DD) only those licensed by then, with
+        that day's RO/Rep counts, linked with the date.
+        """
+        rows = []
+        for i in range(self.firms):
+            if as_of and _day(i * 3) > as_of:
+                continue
+            link = f"SFClicensees.asp?p={i}" + (f"&amp;d={as_of}" if as_of else "")
+            ro, rep = self._current(i, as_of) if as_of else (i % 5, self.licensees)
+            rows.append(
+                f"<tr><td>{i + 1}</td><td><a href='{link}'>Firm {i} Limited</a></td>"
+                f"<td>{i % 5}</td><td>{i % 40}</td><td>{i % 5 + i % 40}</td>"
+                f"<td>{ro}</td><td>{rep}</td><td>{ro + rep}</td>"
+                f"<td>{self.licensees - i % 40}</td><td>50.0</td><td>0.0</td>"
+                f"<td>{_day(i * 3)}</td><td>{_day(i * 3 + 900) if i % 4 == 0 else ''}</td></tr>"
+            )
+        return (
+            "<html><body><h2>SFC licensees by firm</h2><table>"
+            "<tr><th>Row</th><th>Name</th><th>RO</th><th>Rep</th><th>Total</th>"
+            "<th>RO</th><th>Rep</th><th>Total</th><th>Change</th><th>Rep%</th><th>End%</th>"
+            "<th>Licence start</th><th>Licence end</th></tr>"
+            + "".join(rows) + "</table></body></html>"
+        )
+
+    def firm_page(self, firm: int, as_of: str = "") -> str:
+        """The firm's licensees; with `as_of` (d=YYYY-MM-DD) as listed that day: started by then, ends not yet known."""
+        rows = []
+        for j in range(self.licensees):
+            pid = self.person_id(firm, j)
+            until = self._until(firm, j)
+            if as_of and _day(firm + j) > as_of:
+                continue
+            if as_of and until > as_of:
+                until = ""
+            rows.append(
+                f"<tr><td>{j + 1}</td><td><a href='natperson.asp?p={pid}'>Person {pid}</a></td>"
+                f"<td>{30 + pid % 40}</td><td>{'M' if pid % 2 else 'F'}</td><td>A{pid:05d}</td>"
+                f"<td>{'RO' if j % 4 == 0 else 'Rep'}</td><td>{_day(firm + j)}</td><td>{until}</td></tr>"
+            )
+        return (
+            f"<html><body><h2>Firm {firm} Limited</h2>"
+            f"<table><tr><td>Licence start</td><td>{_day(firm * 3)}</td></tr>"
+            f"<tr><td>Licence end</td><td></td></tr></table>"
+            "<table><tr><th>Row</th><th>Name</th><th>Age in 2024</th><th>⚥</th><th>SFC ID</th>"
+            "<th>Role</th><th>From</th><th>Until</th></tr>"
+            + "".join(rows) + "</table></body></html>"
+        )
+
+    def person_page(self, pid: int) -> str:
+        rows = []
+        for k in range(4):
+            firm = (pid + k * 17) % max(1, self.firms)
+            rows.append(
+                f"<tr><td>Firm {firm} Limited</td><td>{'RO' if k == 0 else 'Rep'}</td>"
+                f"<td>{k + 1}: Dealing in securities</td><td>{_day(pid + k * 200)}</td>"
+                f"<td>{_day(pid + k * 200 + 150) if k < 3 else ''}</td></tr>"
+            )
+        return (
+            f"<html><body><h2>Person {pid}</h2><h3>SFC licenses</h3>"
+            "<table><tr><th>Organisation</th><th>Role</th><th>Activity</th><th>From</th><th>Until</th></tr>"
+            + "".join(rows) + "</table></body></html>"
+        )
+
+    def route(self, path: str, query: str) -> Optional[str]:
+        qs = parse_qs(query)
+        p = int(qs.get("p", ["0"])[0] or 0)
+        if path == LIST_PATH:
+            return self.list_page(qs.get("d", [""])[0])
+        if path == FIRM_PATH and p < self.firms:
+            return self.firm_page(p, qs.get("d", [""])[0])
+        if path == PERSON_PATH and p < self.people:
+            return self.person_page(p)
+        return None
+
+
+class Faults:
+    """
+    Fault injection for the stand-in server: a fraction `error_rate` of requests is answered with
+    one of `error_codes` (429s carry Retry-After), bodies are sent at `bandwidth_kbps` (0 = no
+    limit), and `jitter_ms` adds uniform extra latency. With `capacity` > 0 a request arriving
+    while that many are already being served gets a 503, like an overloaded origin.
+    Seeded, so runs are repeatable.
+    """
+    def __init__(self, error_rate: float = 0.0, error_codes: Sequence[int] = (429, 500),
+                 retry_after: int = 1, bandwidth_kbps: float = 0.0, jitter_ms: float = 0.0, seed: int = 0,
+                 capacity: int = 0):
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.retry_after = retry_after
+        self.bandwidth_kbps = bandwidth_kbps
+        self.jitter_ms = jitter_ms
+        self.capacity = capacity
+        self.active = 0
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.statuses = Counter()  # status code -> responses sent
+
+    def draw(self) -> Tuple[Optional[int], float]:
+        """(injected status or None, extra delay in seconds) for one request; pair with `done()`."""
+        with self.lock:
+            self.active += 1
+            code = self.rng.choice(self.error_codes) if self.rng.random() < self.error_rate else None
+            if code is None and self.capacity and self.active > self.capacity:
+                code = 503
+            return code, self.rng.uniform(0, self.jitter_ms) / 1000.0
+
+    def done(self):
+        with self.lock:
+            self.active -= 1
+
+    def count(self, status: int):
+        with self.lock:
+            self.statuses[status] += 1
+
+
+def make_handler(site: SyntheticSite, latency_ms: float, faults: Optional[Faults] = None,
+                 validators: Sequence[str] = ("etag",)):
+    faults = faults or Faults()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+        def send_response(self, code, message=None):
+            faults.count(code)
+            super().send_response(code, message)
+
+        def _send_body(self, data: bytes):
+            if not faults.bandwidth_kbps:
+                self.wfile.write(data)
+                return
+            chunk = 16 * 1024
+            for i in range(0, len(data), chunk):
+                part = data[i:i + chunk]
+                self.wfile.write(part)
+                time.sleep(len(part) / (faults.bandwidth_kbps * 1024.0))
+
+        def do_GET(self):
+            try:
+                self._get()
+            finally:
+                faults.done()
+
+        def _get(self):
+            parts = urlsplit(self.path)
+            code, extra = faults.draw()
+            if latency_ms or extra:
+                time.sleep(latency_ms / 1000.0 + extra)
+            if code is not None:
+                self.send_response(code)
+                if code == 429:
+                    self.send_header("Retry-After", str(faults.retry_after))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = site.route(parts.path, parts.query)
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            sent = {}
+            if "etag" in validators:
+                sent["ETag"] = '"%s"' % hashlib.md5(data).hexdigest()
+            if "last-modified" in validators:
+                sent["Last-Modified"] = LAST_MODIFIED
+            if (sent.get("ETag") and self.headers.get("If-None-Match") == sent["ETag"]) or \
+                    (sent.get("Last-Modified") and self.headers.get("If-Modified-Since") == sent["Last-Modified"]):
+                self.send_response(304)
+                for name, value in sent.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in sent.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self._send_body(data)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # default backlog of 5 drops SYNs under concurrent clients
+
+
+def start_server(site: SyntheticSite, latency_ms: float = 0.0, port: int = 0,
+                 faults: Optional[Faults] = None,
+                 validators: Sequence[str] = ("etag",)) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Serve `site` on a background thread; returns (server, list page URL). `validators` picks the
+    cache validators sent and honoured: "etag" (If-None-Match) and/or "last-modified".
+    """
+    server = _Server(("127.0.0.1", port), make_handler(site, latency_ms, faults, validators))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}{LIST_PATH}"
+
+
+def add_fault_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    ap.add_argument("--error-codes", default="429,500")
+    ap.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on injected 429s")
+    ap.add_argument("--bandwidth-kbps", type=float, default=0.0, help="per-connection body rate, 0 = unlimited")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--capacity", type=int, default=0, help="503 above this many concurrent requests, 0 = unlimited")
+
+
+def faults_from_args(args: argparse.Namespace) -> Faults:
+    return Faults(args.error_rate, [int(c) for c in args.error_codes.split(",") if c],
+                  args.retry_after, args.bandwidth_kbps, args.jitter_ms, args.seed, args.capacity)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--firms", type=int, default=100)
+    ap.add_argument("--licensees", type=int, default=20)
+    ap.add_argument("--latency-ms", type=float, default=50.0)
+    ap.add_argument("--port", type=int, default=8765)
+    add_fault_args(ap)
+    args = ap.parse_args()
+    srv, url = start_server(SyntheticSite(args.firms, args.licensees), args.latency_ms, args.port, faults_from_args(args))
+    print(f"[BENCH] Serving {url}  (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -7,14 +7,60 @@ from datetime import datetime
 class Config:
     BASE_URL: str = "https://webb-site.com/dbpub/SFClicount.asp"
     VERIFY_SSL: bool = False          # Set True if your machine trusts the cert; False avoids hostname mismatch errors
-    MAX_WORKERS: int = 8              # Polite concurrency; reduce if server returns 500s
+    MAX_WORKERS: int = 8              # Starting number of requests in flight (fixed when ADAPTIVE_CONCURRENCY is off)
+    PARSE_WORKERS: int = 0            # >0: parse firm pages in a process pool of this size instead of in fetch threads
+    PARSE_QUEUE_SIZE: int = 64        # Max fetched pages waiting for a parse worker; fetchers block when full
     REQ_TIMEOUT: int = 20
-    MAX_RETRIES: int = 3
-    BACKOFF_SECONDS: float = 2.0
+    MAX_RETRIES: int = 3              # Attempts per URL, first one included; only timeouts, connection errors, 429, 5xx are retried
+    BACKOFF_SECONDS: float = 2.0      # Base of the full-jitter exponential backoff (used when there is no Retry-After)
+    RETRY_MAX_DELAY: float = 60.0     # Cap on any single wait, Retry-After included
+    RETRY_BUDGET_RATIO: float = 0.2   # Run-wide retries allowed per request made ...
+    RETRY_BUDGET_MIN: int = 10        # ... plus this many; beyond that failures are not retried
+
+    ADAPTIVE_CONCURRENCY: bool = True # AIMD: grow in-flight requests while responses are fast and clean, halve on 429/5xx/timeouts
+    CONCURRENCY_MIN: int = 1
+    CONCURRENCY_MAX: int = 32         # Thread engine ceiling (and number of fetch threads); async uses ASYNC_MAX_IN_FLIGHT
+
+    FETCH_ENGINE: str = "thread"      # "thread" (requests + ThreadPoolExecutor) or "async" (aiohttp, optional dependency)
+    ASYNC_MAX_IN_FLIGHT: int = 32     # Async engine: max concurrent requests (AIMD ceiling) over the shared connection pool
+    HOST_RATE_PER_SEC: float = 8.0    # Async engine: token-bucket refill rate per host
+    HOST_BURST: int = 8               # Async engine: token-bucket capacity per host
+
+    CACHE_MODE: str = "on"            # "on": on-disk response cache, "off": always download, "replay": cache only, no network
+    CACHE_TTL_HOURS: float = 20.0     # Cached pages younger than this are reused without a request; older ones are revalidated
+    CACHE_EXPIRE_DAYS: int = 30       # Evict cache entries not refetched for this long
+    CACHE_MAX_MB: int = 2048          # Evict least recently used cache entries above this size
+
+    HTML_PARSER: str = "html.parser"  # bs4 tree builder: "html.parser", or opt-in "lxml" (C, faster; falls back to
+                                      # "html.parser" if missing) / "html5lib", which repair malformed markup differently
+    HTML_TARGETED: bool = False       # Opt-in: build only <table> subtrees (full parse kept when a label's value may lie outside)
+    LIST_STREAMING: bool = True       # Tokenize the list page while it downloads; detail fetches start with the first rows
 
     DAYS_FILTER: int = 365            # Early filter: only fetch firm detail if list-page Licence start within last N days
     FETCH_LICENSEE_HISTORY: bool = False  # Follow person link to parse "SFC licenses" history (heavier)
+    HISTORY_WORKERS: int = 8          # Threads for the person-history stage (each person page fetched once per run)
     SNAPSHOT_WINDOW_DAYS: int = 90
+    SNAPSHOT_BACKEND: str = "json"    # "json": one file per run in SNAPSHOT_DIR, "sqlite": versioned rows in SNAPSHOT_DB,
+                                      # "delta": gzip NDJSON bases + daily deltas in SNAPSHOT_DIR
+    SNAPSHOT_BASE_EVERY_DAYS: int = 7 # Delta backend: days between full bases (older runs are rebuilt from base + deltas)
+    INCREMENTAL: bool = False         # Refetch only firms that are new or whose list-page counts/dates differ from the latest snapshot
+
+    FUSED_STAGES: bool = False        # transform/validate/snapshot in one streaming pass over RAW_FILE (one firm in memory)
+
+    CHECKPOINT_EVERY: int = 50        # Rewrite the ingest checkpoint after this many raw records
+    RESUME: bool = False              # Keep RAW_FILE of the same RUN_DATE and skip firms already in it
+
+    SHARD_SIZE: int = 200             # Sharded runs (main.py plan/work/merge): firms per shard
+    SHARD_LEASE_MINUTES: float = 30.0 # A claimed shard whose worker has not renewed it for this long goes back to pending
+    SHARD_PLAN_WAIT_MINUTES: float = 10.0 # A worker exits if the queue has no pending shard and no PLANNED marker this long
+
+    BACKFILL_DATE_PARAM: str = "d"    # Backfill (main.py backfill): list-page query parameter holding the as-of date
+    BACKFILL_LIST_WORKERS: int = 4    # Backfill: dated list pages fetched concurrently
+    BACKFILL_BATCH_DAYS: int = 31     # Backfill: dates whose list pages are fetched before their new firm pages
+
+    TELEMETRY: bool = True            # Per-stage timings + per-request/per-page events -> RUN_REPORT_FILE, TELEMETRY_FILE
+    PROFILER: str = ""                # "": off, "cprofile": deterministic profile (main thread only on 3.12+), "sampler": periodic stack samples (all threads)
+    PROFILE_SAMPLE_MS: float = 5.0    # Sampler interval
 
     RUN_DATE: str = datetime.now().strftime("%Y-%m-%d")
 
@@ -23,11 +69,17 @@ class Config:
     PROCESSED_DIR: str = "data/processed"
     LOGS_DIR: str = "data/logs"
     SNAPSHOT_DIR: str = "data/snapshots"
+    CACHE_DIR: str = "data/cache"
+    QUEUE_DIR: str = "data/queue"     # Sharded runs; share it (and CACHE_DIR) between hosts
 
     # Filenames (derived)
     @property
     def RAW_FILE(self) -> str:
-        return os.path.join(self.RAW_DIR, f"firms_raw_{self.RUN_DATE}.json")
+        return os.path.join(self.RAW_DIR, f"firms_raw_{self.RUN_DATE}.ndjson")
+
+    @property
+    def CHECKPOINT_FILE(self) -> str:
+        return os.path.join(self.RAW_DIR, f"firms_raw_{self.RUN_DATE}.checkpoint.json")
 
     @property
     def PROCESSED_FILE(self) -> str:
@@ -37,10 +89,35 @@ class Config:
     def METRICS_FILE(self) -> str:
         return os.path.join(self.LOGS_DIR, f"metrics_{self.RUN_DATE}.csv")
 
+    @property
+    def METRICS_DETAIL_FILE(self) -> str:
+        return os.path.join(self.LOGS_DIR, f"metrics_detail_{self.RUN_DATE}.csv")
+
     @property
     def VALIDATION_FILE(self) -> str:
         return os.path.join(self.LOGS_DIR, f"validation_{self.RUN_DATE}.csv")
 
+    @property
+    def SNAPSHOT_DB(self) -> str:
+        return os.path.join(self.SNAPSHOT_DIR, "snapshots.sqlite3")
+
+    @property
+    def PERSON_INDEX_FILE(self) -> str:
+        return os.path.join(self.SNAPSHOT_DIR, "person_index.sqlite3")
+
+    @property
+    def RUN_REPORT_FILE(self) -> str:
+        return os.path.join(self.LOGS_DIR, f"run_report_{self.RUN_DATE}.json")
+
+    @property
+    def TELEMETRY_FILE(self) -> str:
+        return os.path.join(self.LOGS_DIR, f"telemetry_{self.RUN_DATE}.csv")
+
+    @property
+    def PROFILE_FILE(self) -> str:
+        # extension added by the profiler: .prof/.txt (cprofile) or .collapsed.txt (sampler)
+        return os.path.join(self.LOGS_DIR, f"profile_{self.RUN_DATE}")
+
     def ensure_dirs(self):
-        for d in (self.RAW_DIR, self.PROCESSED_DIR, self.LOGS_DIR, self.SNAPSHOT_DIR):
+        for d in (self.RAW_DIR, self.PROCESSED_DIR, self.LOGS_DIR, self.SNAPSHOT_DIR, self.CACHE_DIR):
             os.makedirs(d, exist_ok=True)
\ No newline at end of file
@@ -1,8 +1,84 @@
+import argparse
+from datetime import datetime
 from config import Config
-from src.orchestrator import SFCPipeline
+from src.orchestrator import STAGES, SFCPipeline
+
+COMMANDS = {
+    "all": "run the pipeline (stages --from .. --to)",
+    "ingest": "crawl the list and firm pages -> RAW_FILE",
+    "transform": "RAW_FILE -> normalized PROCESSED_FILE (no crawling)",
+    "validate": "PROCESSED_FILE -> validation and metrics CSVs (no crawling)",
+    "snapshot": "PROCESSED_FILE -> snapshot store and person index (no crawling)",
+    "plan": "sharded run: split the filtered firm list into QUEUE_DIR",
+    "work": "sharded run: claim and fetch shards until none are left",
+    "merge": "sharded run: merge shard outputs, then transform/validate/snapshot",
+    "backfill": "build dated snapshots for past dates from the list page's date parameter",
+}
+
+
+def iso_date(s: str) -> str:
+    try:
+        datetime.strptime(s, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{s!r} is not a YYYY-MM-DD date")
+    return s
+
 
 if __name__ == "__main__":
-    cfg = Config()
+    ap = argparse.ArgumentParser(description="SFC licensee scraping pipeline")
+    ap.add_argument("--resume", action="store_true", help="continue an interrupted ingest for the same run date")
+    ap.add_argument("--run-date", help="YYYY-MM-DD; defaults to today (use with --resume to finish an earlier run)")
+    sub = ap.add_subparsers(dest="command", metavar="COMMAND", help="default: all")
+    parsers = {name: sub.add_parser(name, help=text, description=text) for name, text in COMMANDS.items()}
+    parsers["all"].add_argument("--from", dest="first", choices=STAGES, default=STAGES[0], help="first stage")
+    parsers["all"].add_argument("--to", dest="last", choices=STAGES, default=STAGES[-1], help="last stage")
+    parsers["work"].add_argument("--processes", type=int, default=1, help="worker processes to start on this host")
+    parsers["backfill"].add_argument("--start", type=iso_date, required=True, help="first date (YYYY-MM-DD)")
+    parsers["backfill"].add_argument("--end", type=iso_date, required=True, help="last date (YYYY-MM-DD)")
+    parsers["backfill"].add_argument("--step-days", type=int, default=1, help="days between backfilled dates")
+    args = ap.parse_args()
+    command = args.command or "all"
+
+    cfg = Config(RESUME=args.resume)
+    if args.run_date:
+        cfg.RUN_DATE = args.run_date
+    elif command in ("work", "merge"):
+        from src.shards import queued_run_date
+        cfg.RUN_DATE = queued_run_date(cfg)  # the planner's date, even after midnight or on another host
+        print(f"[SHARD] Using the queue of {cfg.RUN_DATE}")
 
-    pipeline = SFCPipeline(cfg)
-    pipeline.run()
\ No newline at end of file
+    if command == "all":
+        if STAGES.index(args.first) > STAGES.index(args.last):
+            ap.error(f"--from {args.first} comes after --to {args.last}")
+        SFCPipeline(cfg).run(args.first, args.last)
+    elif command == "backfill":
+        if args.start > args.end or args.step_days < 1:
+            ap.error("backfill needs --start <= --end and --step-days >= 1")
+        from src.backfill import Backfill
+        Backfill(cfg, args.start, args.end, args.step_days).run()
+    elif command in STAGES:
+        SFCPipeline(cfg).run(command, command)
+    elif command == "work":
+        from src.shards import work_process
+        if args.processes > 1:
+            import multiprocessing
+            cfg.ensure_dirs()
+            ctx = multiprocessing.get_context("spawn")
+            procs = [ctx.Process(target=work_process, args=(cfg,)) for _ in range(args.processes)]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+        else:
+            work_process(cfg)
+    else:
+        from src.shards import ShardedRun
+        pipeline = SFCPipeline(cfg)
+        if command == "plan":
+            with pipeline.telemetry.stage("plan"):
+                ShardedRun(pipeline).plan()
+            pipeline.telemetry.write_report(tag="plan")
+        else:
+            with pipeline.telemetry.stage("merge"):
+                ShardedRun(pipeline).merge()
+            pipeline.run("transform")
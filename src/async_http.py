@@ -0,0 +1,125 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from requests.structures import CaseInsensitiveDict
+from config import Config
+from .http_cache import ResponseCache
+from .retry import RETRYABLE_STATUS, AsyncConcurrencyGate, RetryPolicy
+from .telemetry import Telemetry
+from .utils import FetchedResponse
+
+try:
+    import aiohttp
+except ImportError:  # optional: only needed for FETCH_ENGINE="async"
+    aiohttp = None
+
+
+class TokenBucket:
+    """Per-host token bucket; `rate` tokens/sec refill, at most `capacity` banked."""
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncHttpClient:
+    """
+    aiohttp counterpart of HttpClient: one shared connection pool, a token bucket per host and
+    the same RetryPolicy, its AIMD limit capped at ASYNC_MAX_IN_FLIGHT requests outstanding.
+    Use as `async with AsyncHttpClient(cfg)`.
+    """
+    def __init__(self, cfg: Config, cache: Optional[ResponseCache] = None, telemetry: Optional[Telemetry] = None):
+        if aiohttp is None:
+            raise SystemExit("FETCH_ENGINE='async' requires aiohttp (pip install aiohttp).")
+        self.cfg = cfg
+        self.cache = cache
+        self.telemetry = telemetry
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self.policy = RetryPolicy(cfg, cfg.ASYNC_MAX_IN_FLIGHT)
+        if not cfg.ADAPTIVE_CONCURRENCY:
+            self.policy.limit.limit = float(cfg.ASYNC_MAX_IN_FLIGHT)  # fixed engine default
+        self.gate: Optional[AsyncConcurrencyGate] = None
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    async def __aenter__(self) -> "AsyncHttpClient":
+        connector = aiohttp.TCPConnector(
+            limit=self.cfg.ASYNC_MAX_IN_FLIGHT,
+            ssl=None if self.cfg.VERIFY_SSL else False
+        )
+        timeout = aiohttp.ClientTimeout(total=self.cfg.REQ_TIMEOUT)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self.gate = AsyncConcurrencyGate(self.policy.limit)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.cfg.HOST_RATE_PER_SEC, self.cfg.HOST_BURST)
+        return self.buckets[host]
+
+    def _record(self, url: str, t0: float, status: int, nbytes: int, retries: int, cache: str = ""):
+        if self.telemetry:
+            self.telemetry.request(url, status, time.perf_counter() - t0, nbytes, retries, cache)
+
+    async def _send(self, url: str, headers: dict) -> Tuple[int, str, bytes, Any, str, Optional[Exception]]:
+        """One attempt inside the concurrency gate: (status, text, body, headers, final url, error)."""
+        await self._bucket(url).acquire()
+        async with self.gate:
+            t = time.perf_counter()
+            try:
+                async with self.session.get(url, headers=headers) as r:
+                    body = await r.read()
+                    text = await r.text(errors="replace") if r.status < 400 else ""
+                    result = (r.status, text, body, r.headers.copy(), str(r.url), None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                result = (0, "", b"", {}, url, e)
+            self.policy.limit.observe(time.perf_counter() - t, result[0] in RETRYABLE_STATUS)
+        return result
+
+    async def get(self, url: str) -> Optional[FetchedResponse]:
+        t0 = time.perf_counter()
+        meta = self.cache.lookup(url) if self.cache else None
+        if self.cache and (self.cache.replay or (meta and self.cache.is_fresh(meta))):
+            resp = self.cache.response(meta) if meta else None
+            if resp or self.cache.replay:
+                self._record(url, t0, resp.status_code if resp else 0, 0, 0, "hit")
+                return resp
+        headers = self.cache.conditional_headers(meta) if self.cache else {}
+
+        self.policy.budget.request()
+        attempts = 0
+        while True:
+            status, text, body, resp_headers, final_url, err = await self._send(url, headers)
+            if status == 304 and meta:
+                resp = self.cache.response(meta, revalidated=True)
+                if resp:
+                    self._record(url, t0, 304, 0, attempts, "revalidated")
+                    return resp
+                headers, meta = {}, None  # cached body is gone: ask again unconditionally
+                continue
+            if status and status < 400:
+                if self.cache:
+                    self.cache.store(url, text, resp_headers)
+                self._record(url, t0, status, len(body), attempts)
+                return FetchedResponse(final_url, status, text, CaseInsensitiveDict(resp_headers))
+            attempts += 1
+            if not self.policy.can_retry(attempts, status):
+                print(f"[HTTP ERR] {url}: {err or f'HTTP {status}'}")
+                self._record(url, t0, status, 0, attempts - 1)
+                return None
+            await asyncio.sleep(self.policy.backoff(attempts, resp_headers.get("Retry-After")))
@@ -0,0 +1,202 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from config import Config
+from .orchestrator import STAGES, SFCPipeline
+from .raw_store import RawWriter
+from .schema import Firm
+from .scraper_bsoup import list_page_state
+
+MANIFEST_NOTE = ("Backfilled from the list page and firm pages requested with the date parameter. A firm page "
+                 "fetched for one date is reused for other dates whose list row shows the same counts and "
+                 "licence dates; licensee statuses are derived for each date. Changes that leave the list row "
+                 "unchanged appear from the next date whose row differs.")
+FirmKey = Tuple[str, Tuple[Any, ...]]
+
+
+def dated_url(url: str, param: str, date: Optional[str]) -> str:
+    """`url` with query parameter `param` set to `date`, or without it when `date` is None."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if date is None and param not in dict(query):
+        return url  # keep undated URLs byte-identical to the ones daily runs store
+    query = [(k, v) for k, v in query if k != param] + ([(param, date)] if date else [])
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def as_of(rec: Firm, stub: Dict[str, Any], date: str) -> Firm:
+    """
+    A firm detail record as of `date`: licensees who had started by then, with their status on
+    that day, and the list-page values of that date's list. `rec` is the firm page as of `date`
+    or as of another date with the same list row.
+    """
+    licensees = [replace(lic, status="Active" if not lic.licence_end or lic.licence_end > date else "Inactive")
+                 for lic in rec.licensees if not lic.licence_start or lic.licence_start <= date]
+    return replace(rec, firm_name=stub["firm_name"], last_updated=date, licensees=licensees,
+                   current_licensees_count=len(licensees), list_page=list_page_state(stub))
+
+
+class Backfill:
+    """
+    Dated snapshots for past run dates, from the list and firm pages' date parameter
+    (BACKFILL_DATE_PARAM). Dates are handled in batches of BACKFILL_BATCH_DAYS:
+      1. the batch's list pages are fetched BACKFILL_LIST_WORKERS at a time and early-filtered
+         against each date
+      2. firm pages are fetched with the fetch engine, dated with the first date whose list row
+         shows counts and licence dates not seen before for that firm (see `key`), and shared by
+         every date showing the same row, as incremental runs carry unchanged firms forward;
+         pages that fail are fetched once more, and those failing again are left out of every
+         date sharing them and listed in the manifest
+      3. each date gets its own Config (RUN_DATE, files) and a raw file derived from the shared
+         records (see `as_of`), then transform / validate / snapshot like a normal run
+    Which dates were backfilled, and how, is recorded in SNAPSHOT_DIR/backfill.json. The
+    response cache is shared, so a repeated or resumed backfill does not download pages again.
+    With cfg.RESUME, dates already in the snapshot store are skipped. Dates must be written in
+    order for the sqlite and delta stores, and must lie within SNAPSHOT_WINDOW_DAYS, since every
+    snapshot write prunes older runs.
+    """
+    def __init__(self, cfg: Config, start: str, end: str, step_days: int = 1):
+        self.cfg = cfg
+        self.pipeline = SFCPipeline(cfg)
+        first, last = (datetime.strptime(d, "%Y-%m-%d") for d in (start, end))
+        self.dates = [(first + timedelta(days=n)).strftime("%Y-%m-%d")
+                      for n in range(0, (last - first).days + 1, step_days)]
+        self.details: Dict[FirmKey, Tuple[str, Firm]] = {}  # -> (date fetched for, record), shared by dates
+        self.attempted: Set[FirmKey] = set()
+        self.failed: Dict[FirmKey, str] = {}  # -> dated firm URL, for pages that failed twice
+        self.fetching: Dict[str, Tuple[FirmKey, str]] = {}  # dated firm URL -> (key, date)
+        self.manifest_path = os.path.join(cfg.SNAPSHOT_DIR, "backfill.json")
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+
+    def job_config(self, date: str) -> Config:
+        """Config of the job for one date: that RUN_DATE's files and snapshot, no report of its own."""
+        return replace(self.cfg, RUN_DATE=date, RESUME=False, INCREMENTAL=False, TELEMETRY=False, PROFILER="")
+
+    @staticmethod
+    def key(stub: Dict[str, Any], date: str) -> FirmKey:
+        """
+        Firm pages are shared by the dates whose list rows agree on the counts and licence dates,
+        the values ChangeDetector compares; a row without counts gets a page of its own.
+        """
+        state = list_page_state(stub)
+        return stub["firm_url"], tuple(state.values()) if state["total"] is not None else (date,)
+
+    def _list(self, date: str) -> Optional[List[Dict[str, Any]]]:
+        resp = self.pipeline.http.get(dated_url(self.cfg.BASE_URL, self.cfg.BACKFILL_DATE_PARAM, date))
+        if not resp:
+            print(f"[BACKFILL] {date}: list page unavailable, date skipped")
+            return None
+        cutoff = datetime.strptime(date, "%Y-%m-%d") - timedelta(days=self.cfg.DAYS_FILTER)
+        stubs = []
+        for stub in self.pipeline.list_parser.parse(resp.text):
+            if self.pipeline._keep(stub, cutoff):
+                stub["firm_url"] = dated_url(stub["firm_url"], self.cfg.BACKFILL_DATE_PARAM, None)
+                stubs.append(stub)
+        return stubs
+
+    def _todo(self) -> List[str]:
+        window = (datetime.now() - timedelta(days=self.cfg.SNAPSHOT_WINDOW_DAYS)).strftime("%Y-%m-%d")
+        if self.dates and self.dates[0] < window:
+            days = (datetime.now() - datetime.strptime(self.dates[0], "%Y-%m-%d")).days + 1
+            raise SystemExit(f"[BACKFILL] {self.dates[0]} is older than SNAPSHOT_WINDOW_DAYS={self.cfg.SNAPSHOT_WINDOW_DAYS} "
+                             f"allows, so snapshot pruning would drop it again; set SNAPSHOT_WINDOW_DAYS to at least "
+                             f"{days} in config.py (daily runs prune with it too)")
+        stored = self.pipeline.snapshot.dates()
+        todo = [d for d in self.dates if not (self.cfg.RESUME and d in stored)]
+        if todo and stored and self.cfg.SNAPSHOT_BACKEND != "json" and todo[0] < stored[-1]:
+            raise SystemExit(f"[BACKFILL] The {self.cfg.SNAPSHOT_BACKEND} snapshot store already holds {stored[-1]}; "
+                             f"runs must be written in date order (backfill into an empty store, or use --resume)")
+        return todo
+
+    def _write_date(self, date: str, stubs: List[Dict[str, Any]]) -> int:
+        job = self.job_config(date)
+        writer = RawWriter(job, resume=False)
+        dated, failed = 0, []
+        try:
+            for stub in stubs:
+                key = self.key(stub, date)
+                fetched_for, rec = self.details.get(key, ("", None))
+                if rec is not None:
+                    writer.write(as_of(rec, stub, date))
+                    dated += fetched_for == date
+                elif key in self.failed:
+                    failed.append(self.failed[key])
+        finally:
+            writer.close()
+        SFCPipeline(job).process(STAGES[1:])
+        self.manifest[date] = {"firms": len(writer.done), "firm_pages_dated": dated,
+                               "firm_pages_reused": len(writer.done) - dated, "firm_pages_failed": failed}
+        return len(writer.done)
+
+    def _write_manifest(self):
+        """Merge this backfill's dates into SNAPSHOT_DIR/backfill.json, dropping dates no longer stored."""
+        entries: Dict[str, Any] = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)["dates"]
+        entries.update(self.manifest)
+        stored = set(self.pipeline.snapshot.dates())
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"note": MANIFEST_NOTE, "dates": {d: v for d, v in sorted(entries.items()) if d in stored}},
+                      f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def run(self) -> List[str]:
+        """Backfill every date; returns the dates written."""
+        t0 = time.perf_counter()
+        todo = self._todo()
+        written, listed = [], 0
+        print(f"[BACKFILL] {len(todo)} of {len(self.dates)} dates to build, {self.dates[0]} .. {self.dates[-1]}")
+        with self.pipeline.telemetry.profiling(), self.pipeline.telemetry.stage("backfill"):
+            for i in range(0, len(todo), self.cfg.BACKFILL_BATCH_DAYS):
+                batch = todo[i:i + self.cfg.BACKFILL_BATCH_DAYS]
+                with ThreadPoolExecutor(self.cfg.BACKFILL_LIST_WORKERS) as pool:
+                    lists = dict(zip(batch, pool.map(self._list, batch)))
+                new: Dict[FirmKey, Dict[str, Any]] = {}
+                for date in batch:
+                    for stub in lists[date] or []:
+                        listed += 1
+                        key = self.key(stub, date)
+                        if key not in self.attempted and key not in new:
+                            url = dated_url(stub["firm_url"], self.cfg.BACKFILL_DATE_PARAM, date)
+                            self.fetching[url] = (key, date)
+                            new[key] = dict(stub, firm_url=url)  # the first date showing this row
+                self.attempted.update(new)
+                print(f"[BACKFILL] {batch[0]} .. {batch[-1]}: {len(new)} firm pages not fetched before")
+                if new:
+                    self._fetch_details(new)
+                for date in batch:
+                    if lists[date] is not None:
+                        n = self._write_date(date, lists[date])
+                        written.append(date)
+                        print(f"[BACKFILL] {date}: {n} firms")
+                self._write_manifest()
+        self.pipeline.telemetry.set("backfill", {
+            "dates": len(self.dates), "written": len(written), "firm_rows": listed,
+            "firm_pages": len(self.attempted), "firm_pages_failed": len(self.failed), "seconds": round(time.perf_counter() - t0, 2)})
+        self.pipeline.telemetry.write_report(tag="backfill")
+        print(f"[BACKFILL] {len(written)} dates written; {listed} firm rows from {len(self.attempted)} firm pages, "
+              f"{len(self.failed)} failed")
+        return written
+
+    def _fetch_details(self, new: Dict[FirmKey, Dict[str, Any]]):
+        """Fetch the firm pages of `new`, then once more those that failed; record the ones still missing."""
+        self.pipeline.fetch(list(new.values()), self._keep_detail)
+        missing = {key: stub for key, stub in new.items() if key not in self.details}
+        if missing:
+            print(f"[BACKFILL] Retrying {len(missing)} firm pages that failed")
+            self.pipeline.fetch(list(missing.values()), self._keep_detail)
+        for key, stub in missing.items():
+            if key not in self.details:
+                self.failed[key] = stub["firm_url"]
+                print(f"[BACKFILL ERR] {stub['firm_url']}: failed twice, left out of the dates sharing it")
+
+    def _keep_detail(self, rec: Firm):
+        key, date = self.fetching.pop(rec.firm_url)
+        self.details[key] = (date, replace(rec, firm_url=key[0]))
@@ -0,0 +1,96 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+# Common formats observed on Webb-site, in the order they are tried
+FORMATS = ("%Y-%m-%d", "%d-%b-%Y", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y")
+# Already-normalized values: every later step would return them unchanged (ASCII digits only,
+# since strptime would rewrite other Unicode digits; years < 1000 lose their padding in strftime)
+_ISO = re.compile(r"[1-9][0-9]{3}-[0-9]{2}-[0-9]{2}")
+_ISO_SEARCH = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse_stripped(s: str) -> str:
+    if _ISO.fullmatch(s):
+        return s
+    for fmt in FORMATS:
+        try:
+            return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    m = _ISO_SEARCH.search(s)
+    if m:
+        return m.group(0)
+    return ""
+
+
+def parse_date(s: str) -> str:
+    """Normalize one date cell to YYYY-MM-DD ("" if unparseable); memoized on the raw text."""
+    s = (s or "").strip()
+    if not s:
+        return ""
+    return _parse_stripped(s)
+
+
+def _sniff(s: str) -> Optional[str]:
+    for fmt in FORMATS:
+        try:
+            datetime.strptime(s, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+
+class DateColumn:
+    """
+    Date parser for one table column: locks onto the first format that parses one of its
+    values and tries it first afterwards. The formats are mutually exclusive in shape, so a
+    hit on the locked format gives the same answer parse_date would.
+    """
+    __slots__ = ("fmt",)
+
+    def __init__(self):
+        self.fmt: Optional[str] = None
+
+    def parse(self, s: str) -> str:
+        s = (s or "").strip()
+        if not s:
+            return ""
+        if self.fmt is None and not _ISO.fullmatch(s):
+            self.fmt = _sniff(s)
+        if self.fmt is not None and self.fmt != FORMATS[0]:
+            try:
+                return datetime.strptime(s, self.fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                pass
+        return _parse_stripped(s)
+
+
+def parse_dates(values: Iterable[str]) -> List[str]:
+    """
+    Batch parse_date over a whole column: already-normalized cells pass through, the rest are
+    de-duplicated and parsed with pandas using the column's sniffed format; anything pandas
+    cannot represent (e.g. year 9999) or that does not fit that format goes through parse_date.
+    """
+    import pandas as pd  # only the batch path needs pandas; keeps parser workers light
+
+    col = pd.Series(list(values), dtype=object).fillna("").astype(str).str.strip()
+    if col.empty:
+        return []
+    todo = ~col.str.fullmatch(_ISO.pattern) & (col != "")
+    if todo.any():
+        uniques = pd.Series(col[todo].unique())
+        fmt = _sniff(uniques.iloc[0])
+        parsed = pd.Series("", index=uniques.index, dtype=object)
+        if fmt is not None:
+            ts = pd.to_datetime(uniques, format=fmt, errors="coerce")
+            ok = ts.notna()
+            parsed[ok] = ts[ok].dt.strftime("%Y-%m-%d")
+        else:
+            ok = pd.Series(False, index=uniques.index)
+        parsed[~ok] = uniques[~ok].map(_parse_stripped)
+        col[todo] = col[todo].map(dict(zip(uniques, parsed)))
+    return col.tolist()
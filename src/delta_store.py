@@ -0,0 +1,299 @@
+import argparse
+import gzip
+import hashlib
+import os
+import re
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from config import Config
+from .schema import Firm, dumps, gc_paused, loads
+from .snapshot import SnapshotWriter
+
+# One gzip NDJSON file per run in SNAPSHOT_DIR: <date>.base.ndjson.gz holds every firm,
+# <date>.delta.ndjson.gz only what changed since the run before it. Lines, after a header
+# {"date", "kind", "base"}:
+#   {"put": url, "hash": h, "last_updated": d, "firm": {...}}   firm added or content changed
+#   {"del": url}                                                 firm gone
+#   {"touch_all": d}                 every firm not put by this run now has last_updated d
+#   {"touch": d, "urls": [...]}      these firms (content unchanged) now have last_updated d
+# `hash` covers the firm without last_updated, which changes with every fetch.
+FILE_NAME = re.compile(r"(\d{4}-\d{2}-\d{2})\.(base|delta)\.ndjson\.gz")
+
+# state of one run: firm URL -> (content hash, last_updated, firm dict or None)
+State = Dict[str, Tuple[str, str, Optional[Dict[str, Any]]]]
+
+
+def _content_hash(firm: Dict[str, Any]) -> str:
+    return hashlib.blake2b(dumps(firm), digest_size=12).hexdigest()
+
+
+def _licensee_roles(firm: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Licensees of a firm dict by SFC ID (else person URL, else name), with all their roles there."""
+    out: Dict[str, Dict[str, Any]] = {}
+    for lic in firm.get("licensees") or []:
+        key = lic.get("licensee_id") or lic.get("person_url") or lic.get("name") or ""
+        entry = out.setdefault(key, {"sfc_id": lic.get("licensee_id", ""), "name": lic.get("name", ""), "roles": set()})
+        entry["roles"].add(lic.get("role", ""))
+    return out
+
+
+class DeltaStore:
+    """
+    Snapshot store of gzip NDJSON files keyed by firm URL: a full base every
+    SNAPSHOT_BASE_EVERY_DAYS, and between bases one delta per run against the run before.
+    Any stored run is rebuilt from its base and the deltas after it. Firms come back in base
+    order, with firms added later appended. Same interface as SnapshotStore, plus `diff`.
+    Runs must be written in date order; re-writing the latest run date replaces that run.
+    """
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+
+    def _path(self, date: str, kind: str) -> str:
+        return os.path.join(self.cfg.SNAPSHOT_DIR, f"{date}.{kind}.ndjson.gz")
+
+    def _files(self) -> List[Tuple[str, str]]:
+        """(date, kind) of every stored run, oldest first."""
+        found = []
+        for name in os.listdir(self.cfg.SNAPSHOT_DIR):
+            m = FILE_NAME.fullmatch(name)
+            if m:
+                found.append((m.group(1), m.group(2)))
+        return sorted(found)
+
+    def _lines(self, date: str, kind: str) -> Iterator[Dict[str, Any]]:
+        with gzip.open(self._path(date, kind), "rb") as f:
+            for line in f:
+                yield loads(line)
+
+    def _apply(self, state: State, date: str, kind: str, keep: bool):
+        """Apply one stored run to `state` in place (a base starts it over)."""
+        if kind == "base":
+            state.clear()
+        put: Set[str] = set()
+        for rec in self._lines(date, kind):
+            if "put" in rec:
+                state[rec["put"]] = (rec["hash"], rec["last_updated"], rec["firm"] if keep else None)
+                put.add(rec["put"])
+            elif "del" in rec:
+                state.pop(rec["del"], None)
+            elif "touch_all" in rec:
+                lu = rec["touch_all"]
+                for url, (h, _, firm) in state.items():
+                    if url not in put:
+                        state[url] = (h, lu, firm)
+            elif "touch" in rec:
+                for url in rec["urls"]:
+                    h, _, firm = state[url]
+                    state[url] = (h, rec["touch"], firm)
+
+    def _states(self, dates: Iterable[str], keep: bool = True) -> Dict[str, State]:
+        """States of the given stored runs; each base is read at most once."""
+        wanted = set(dates)
+        files = self._files()
+        missing = wanted - {d for d, _ in files}
+        if missing:
+            raise ValueError(f"DeltaStore: no snapshot for {', '.join(sorted(missing))}")
+        out: Dict[str, State] = {}
+        state: State = {}
+        skip = False
+        with gc_paused():
+            for i, (date, kind) in enumerate(files):
+                if kind == "base":
+                    # skip chains holding none of the wanted dates
+                    nxt = next((d for d, k in files[i + 1:] if k == "base"), "9999-99-99")
+                    skip = not any(date <= d < nxt for d in wanted - set(out))
+                if skip:
+                    continue
+                self._apply(state, date, kind, keep)
+                if date in wanted:
+                    out[date] = dict(state)
+                    if len(out) == len(wanted):
+                        break
+        return out
+
+    @staticmethod
+    def _firms(state: State) -> List[Firm]:
+        firms = []
+        for _, lu, d in state.values():
+            d = dict(d)
+            d["last_updated"] = lu
+            firms.append(Firm.from_dict(d))
+        return firms
+
+    # ---- SnapshotStore interface --------------------------------------------------------
+
+    def write_snapshot(self, data: Iterable[Firm]) -> str:
+        return self.writer().write_all(data)
+
+    def writer(self) -> SnapshotWriter:
+        run_date = self.cfg.RUN_DATE
+        dates = [d for d, _ in self._files()]
+        if dates and run_date < dates[-1]:
+            raise ValueError(f"DeltaStore: run {run_date} is older than the latest stored run {dates[-1]}")
+        previous = max((d for d in dates if d < run_date), default=None)
+        base = None
+        if previous:
+            base = max(d for d, k in self._files() if k == "base" and d <= previous)
+            age = datetime.strptime(run_date, "%Y-%m-%d") - datetime.strptime(base, "%Y-%m-%d")
+            if age.days >= self.cfg.SNAPSHOT_BASE_EVERY_DAYS:
+                base = None
+        run = DeltaRun(self, run_date, base, self._states([previous], keep=False)[previous] if base else {})
+        return SnapshotWriter(self.cfg, run, run.path)
+
+    def dates(self) -> List[str]:
+        """Dates of the stored runs, oldest first."""
+        return [d for d, _ in self._files()]
+
+    def load(self, date: str) -> List[Firm]:
+        return self._firms(self._states([date])[date])
+
+    def latest(self) -> Tuple[str, List[Firm]]:
+        """Most recent run dated on or before RUN_DATE as (date, records); ("", []) if none."""
+        dates = [d for d in self.dates() if d <= self.cfg.RUN_DATE]
+        if not dates:
+            return "", []
+        return dates[-1], self.load(dates[-1])
+
+    def prune(self):
+        """Drop runs before the window, keeping the base (and deltas) that in-window runs are built on."""
+        cutoff = (datetime.now() - timedelta(days=self.cfg.SNAPSHOT_WINDOW_DAYS)).strftime("%Y-%m-%d")
+        files = self._files()
+        keep_from = max((d for d, k in files if k == "base" and d <= cutoff), default=None)
+        for date, kind in files:
+            if keep_from and date < keep_from:
+                os.remove(self._path(date, kind))
+
+    # ---- queries ------------------------------------------------------------------------
+
+    def diff(self, since: str, until: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Churn between two stored runs: firms added/removed, and at firms present in both,
+        licensees who joined, left or changed role. Only firms whose content hash differs are
+        compared licensee by licensee; licensees of added/removed firms are not listed again.
+        """
+        states = self._states([since, until])
+        old, new = states[since], states[until]
+        out: Dict[str, List[Dict[str, Any]]] = {k: [] for k in (
+            "firms_added", "firms_removed", "licensees_joined", "licensees_left", "role_changed")}
+        for url, (_, _, firm) in new.items():
+            if url not in old:
+                out["firms_added"].append({"firm_url": url, "firm_id": firm["firm_id"], "firm_name": firm["firm_name"]})
+        for url, (h, _, firm) in old.items():
+            if url not in new:
+                out["firms_removed"].append({"firm_url": url, "firm_id": firm["firm_id"], "firm_name": firm["firm_name"]})
+                continue
+            new_hash, _, new_firm = new[url]
+            if new_hash == h:
+                continue
+            before, after = _licensee_roles(firm), _licensee_roles(new_firm)
+            where = {"firm_url": url, "firm_name": new_firm["firm_name"]}
+            for key, lic in after.items():
+                role = "/".join(sorted(lic["roles"]))
+                if key not in before:
+                    out["licensees_joined"].append({**where, "sfc_id": lic["sfc_id"], "name": lic["name"], "role": role})
+                elif before[key]["roles"] != lic["roles"]:
+                    out["role_changed"].append({**where, "sfc_id": lic["sfc_id"], "name": lic["name"], "role": role,
+                                                "old_role": "/".join(sorted(before[key]["roles"]))})
+            for key, lic in before.items():
+                if key not in after:
+                    out["licensees_left"].append({**where, "sfc_id": lic["sfc_id"], "name": lic["name"],
+                                                  "role": "/".join(sorted(lic["roles"]))})
+        return out
+
+
+class DeltaRun:
+    """
+    One run written to a DeltaStore firm by firm. A delta run holds the previous run's content
+    hashes and last_updated values (no firm bodies); the file is moved into place by close().
+    abort() drops it, also after a failed close().
+    """
+    def __init__(self, store: DeltaStore, run_date: str, base: Optional[str], previous: State):
+        self.store = store
+        self.run_date = run_date
+        self.kind = "delta" if base else "base"
+        self.previous = previous
+        self.path = store._path(run_date, self.kind)
+        self.tmp = self.path + ".tmp"
+        self.seen: Set[str] = set()
+        self.kept: Dict[str, List[str]] = defaultdict(list)  # unchanged firms by their new last_updated
+        self.f = gzip.open(self.tmp, "wb", compresslevel=6)
+        self._line({"date": run_date, "kind": self.kind, "base": base or run_date})
+
+    def _line(self, rec: Dict[str, Any]):
+        self.f.write(dumps(rec) + b"\n")
+
+    def write(self, firm: Firm):
+        d = firm.to_dict()
+        lu = d.pop("last_updated")
+        h = _content_hash(d)
+        self.seen.add(firm.firm_url)
+        prev = self.previous.get(firm.firm_url)
+        if prev is not None and prev[0] == h:
+            self.kept[lu].append(firm.firm_url)
+        else:
+            self._line({"put": firm.firm_url, "hash": h, "last_updated": lu, "firm": d})
+
+    def close(self):
+        for url in self.previous:
+            if url not in self.seen:
+                self._line({"del": url})
+        if len(self.kept) == 1:
+            self._line({"touch_all": next(iter(self.kept))})
+        else:
+            for lu, urls in self.kept.items():
+                changed = [u for u in urls if self.previous[u][1] != lu]
+                if changed:
+                    self._line({"touch": lu, "urls": changed})
+        self.f.close()
+        os.replace(self.tmp, self.path)
+        other = self.store._path(self.run_date, "base" if self.kind == "delta" else "delta")
+        if os.path.exists(other):
+            os.remove(other)  # a re-run of this date stored as the other kind
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def _print(report: Dict[str, List[Dict[str, Any]]]):
+    for r in report["firms_added"]:
+        print(f"+ firm      {r['firm_name']} ({r['firm_id']})")
+    for r in report["firms_removed"]:
+        print(f"- firm      {r['firm_name']} ({r['firm_id']})")
+    for r in report["licensees_joined"]:
+        print(f"+ licensee  {r['sfc_id']:8}  {r['name']}  {r['role']}  at {r['firm_name']}")
+    for r in report["licensees_left"]:
+        print(f"- licensee  {r['sfc_id']:8}  {r['name']}  {r['role']}  at {r['firm_name']}")
+    for r in report["role_changed"]:
+        print(f"~ role      {r['sfc_id']:8}  {r['name']}  {r['old_role']} -> {r['role']}  at {r['firm_name']}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Churn between two runs of the delta snapshot store")
+    group = ap.add_mutually_exclusive_group(required=True)
+    group.add_argument("--diff", nargs=2, metavar=("SINCE", "UNTIL"), help="run dates (YYYY-MM-DD) to compare")
+    group.add_argument("--list", action="store_true", help="stored runs with their kind and size")
+    ap.add_argument("--json", action="store_true", help="print the diff as JSON")
+    args = ap.parse_args()
+
+    cfg = Config()
+    if not os.path.isdir(cfg.SNAPSHOT_DIR):
+        raise SystemExit(f"[SNAPSHOT] No snapshots in {cfg.SNAPSHOT_DIR}")
+    store = DeltaStore(cfg)
+    if args.list:
+        for date, kind in store._files():
+            print(f"{date}  {kind:5}  {os.path.getsize(store._path(date, kind)) / 1024:10.1f} KiB")
+        raise SystemExit(0)
+    t = time.perf_counter()
+    try:
+        report = store.diff(*args.diff)
+    except ValueError as e:
+        raise SystemExit(f"[SNAPSHOT] {e}")
+    if args.json:
+        print(dumps(report, indent=True).decode("utf-8"))
+    else:
+        _print(report)
+        print(f"[SNAPSHOT] {', '.join(f'{k} {len(v)}' for k, v in report.items())} in {(time.perf_counter() - t) * 1000:.0f} ms")
@@ -0,0 +1,112 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# (field, header substrings) pairs; first header containing any substring wins
+ColumnSpec = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+@lru_cache(maxsize=256)
+def column_map(headers: Tuple[str, ...], spec: ColumnSpec) -> Dict[str, Optional[int]]:
+    """Resolve column indexes once per distinct header signature."""
+    out: Dict[str, Optional[int]] = {}
+    for field, names in spec:
+        out[field] = next((i for i, h in enumerate(headers) if any(n in h for n in names)), None)
+    return out
+
+
+class TableInfo:
+    __slots__ = ("table", "head_tr", "_headers")
+
+    def __init__(self, table: Tag):
+        self.table = table
+        self.head_tr: Optional[Tag] = None
+        self._headers: Optional[Tuple[str, ...]] = None
+
+    @property
+    def headers(self) -> Tuple[str, ...]:
+        """Lower-cased header cell texts (first <tr> holding a <th>), computed on first use."""
+        if self._headers is None:
+            self._headers = tuple(
+                c.get_text(" ", strip=True).lower() for c in self.head_tr.find_all(["th", "td"])
+            ) if self.head_tr else ()
+        return self._headers
+
+    def rows(self) -> List[Tag]:
+        return self.table.find_all("tr")
+
+    def columns(self, spec: ColumnSpec) -> Dict[str, Optional[int]]:
+        return column_map(self.headers, spec)
+
+
+class DocumentIndex:
+    """
+    Single traversal of a soup that records every <table> with its header row and the first
+    text node matching each label, so table lookups and label reads never rescan the document.
+    Matching mirrors the previous per-parser helpers: header row = first <tr> (nested rows
+    included) containing a <th>; label = text node matching ^label$ case-insensitively.
+    """
+    def __init__(self, soup: BeautifulSoup, labels: Iterable[str] = ()):
+        self.soup = soup
+        self.tables: List[TableInfo] = []
+        self.label_nodes: Dict[str, NavigableString] = {}
+        self.label_counts: Dict[str, int] = {}
+        patterns = [(label, re.compile(fr"^{re.escape(label)}$", re.I)) for label in labels]
+        by_tag: Dict[int, TableInfo] = {}
+
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                if node.name == "table":
+                    info = TableInfo(node)
+                    by_tag[id(node)] = info
+                    self.tables.append(info)
+                elif node.name == "th":
+                    # the header row of each enclosing table is the outermost <tr> below it
+                    last_tr = None
+                    for parent in node.parents:
+                        if parent.name == "tr":
+                            last_tr = parent
+                        elif parent.name == "table" and last_tr is not None:
+                            info = by_tag.get(id(parent))
+                            if info is not None and info.head_tr is None:
+                                info.head_tr = last_tr
+            elif patterns:
+                for label, rx in patterns:
+                    if rx.search(node):
+                        self.label_counts[label] = self.label_counts.get(label, 0) + 1
+                        self.label_nodes.setdefault(label, node)
+
+    def find_table(self, must_have: Iterable[str]) -> Optional[TableInfo]:
+        """First table whose joined header text contains every token."""
+        tokens = tuple(must_have)
+        for info in self.tables:
+            if info.head_tr is None:
+                continue
+            joined = " ".join(info.headers)
+            if all(tok in joined for tok in tokens):
+                return info
+        return None
+
+    def first_table(self) -> Optional[TableInfo]:
+        return self.tables[0] if self.tables else None
+
+    def label_value(self, label: str) -> str:
+        """Text of the element following the label node, as soup.find(string=...).find_next()."""
+        node = self.label_nodes.get(label)
+        if node is None:
+            return ""
+        nxt = node.find_next()
+        return nxt.get_text(strip=True) if nxt else ""
+
+    def label_next_in_table(self, label: str) -> bool:
+        """
+        False when the element following the label node is not inside the label's own table:
+        in a table-only tree whatever lay between that table and the next one is missing.
+        """
+        node = self.label_nodes.get(label)
+        if node is None:
+            return True
+        table = node.find_parent("table")
+        nxt = node.find_next()
+        return table is not None and nxt is not None and any(p is table for p in nxt.parents)
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from config import Config
+from .schema import Firm, HistoryEntry
+from .scraper_bsoup import PersonHistoryParser
+
+
+class SingleFlight:
+    """Run `fn(key)` at most once per key; every caller asking for the same key shares one Future."""
+    def __init__(self, executor: Executor, fn: Callable[[str], Any]):
+        self.executor = executor
+        self.fn = fn
+        self.lock = threading.Lock()
+        self.futures: Dict[str, Future] = {}
+
+    def get(self, key: str) -> Future:
+        with self.lock:
+            fut = self.futures.get(key)
+            if fut is None:
+                fut = self.executor.submit(self.fn, key)
+                self.futures[key] = fut
+            return fut
+
+
+class AsyncSingleFlight:
+    """asyncio flavour of SingleFlight: one Task per key."""
+    def __init__(self, fn: Callable[[str], Awaitable[Any]]):
+        self.fn = fn
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def get(self, key: str) -> asyncio.Task:
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.fn(key))
+            self.tasks[key] = task
+        return task
+
+
+class PersonHistoryStage:
+    """
+    Pipeline stage fed with firm records as they arrive: each distinct licensee `person_url`
+    is fetched once per run (HISTORY_WORKERS threads, or the async client) and its history is
+    attached to every licensee row pointing at it, across all firms. A record is handed on
+    only once all of its histories are in. An error raised while handing a record on (on a
+    worker thread) is kept and re-raised when the stage exits.
+    """
+    def __init__(self, person_parser: PersonHistoryParser, cfg: Config):
+        self.person_parser = person_parser
+        self.cfg = cfg
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.flight: Optional[SingleFlight] = None
+        self.aflight: Optional[AsyncSingleFlight] = None
+        self.errors: List[Exception] = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _person_urls(rec: Firm) -> List[str]:
+        return list(dict.fromkeys(lic.person_url for lic in rec.licensees if lic.person_url))
+
+    @staticmethod
+    def _assign(rec: Firm, histories: Dict[str, List[HistoryEntry]]):
+        # licensees of the same person share one history list
+        for lic in rec.licensees:
+            if lic.person_url in histories:
+                lic.history = histories[lic.person_url]
+
+    def _fetch(self, person_url: str) -> List[HistoryEntry]:
+        try:
+            return self.person_parser.parse_history(person_url)
+        except Exception as e:
+            print(f"[HISTORY ERR] {person_url}: {e}")
+            return []
+
+    async def _afetch(self, person_url: str) -> List[HistoryEntry]:
+        try:
+            return await self.person_parser.aparse_history(person_url)
+        except Exception as e:
+            print(f"[HISTORY ERR] {person_url}: {e}")
+            return []
+
+    def __enter__(self) -> "PersonHistoryStage":
+        self.executor = ThreadPoolExecutor(max_workers=self.cfg.HISTORY_WORKERS)
+        self.flight = SingleFlight(self.executor, self._fetch)
+        return self
+
+    def __exit__(self, *exc):
+        self.executor.shutdown(wait=True)
+        if self.flight.futures:
+            print(f"[HISTORY] Fetched {len(self.flight.futures)} unique person pages")
+        if self.errors and exc[0] is None:
+            print(f"[HISTORY ERR] {len(self.errors)} record(s) failed after their histories were attached")
+            raise self.errors[0]
+
+    def attach(self, rec: Firm, done: Callable[[Firm], None]):
+        """
+        Queue `rec`'s person pages; `done(rec)` runs (on a worker thread) once all are attached.
+        Its exceptions surface from __exit__, as a done-callback would otherwise swallow them.
+        """
+        urls = self._person_urls(rec)
+        if not urls:
+            done(rec)
+            return
+        futures = {url: self.flight.get(url) for url in urls}
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                self._assign(rec, {url: fut.result() for url, fut in futures.items()})
+                done(rec)
+            except Exception as e:
+                with self.lock:
+                    self.errors.append(e)
+
+        for fut in futures.values():
+            fut.add_done_callback(on_done)
+
+    async def aattach(self, rec: Firm) -> Firm:
+        """attach for a PersonHistoryParser backed by an AsyncHttpClient."""
+        if self.aflight is None:
+            self.aflight = AsyncSingleFlight(self._afetch)
+        urls = self._person_urls(rec)
+        results = await asyncio.gather(*(self.aflight.get(url) for url in urls))
+        self._assign(rec, dict(zip(urls, results)))
+        return rec
@@ -0,0 +1,47 @@
+import importlib.util
+import re
+from typing import Dict, Iterable
+from bs4 import BeautifulSoup, SoupStrainer
+from config import Config
+
+# Modules behind the bs4 tree builders that are not part of the standard library
+_BACKEND_MODULES = {"lxml": "lxml", "html5lib": "html5lib"}
+_TABLES_ONLY = SoupStrainer("table")
+_warned = set()
+
+
+def resolve_backend(name: str) -> str:
+    """Return `name` if its parser is installed, else fall back to the stdlib "html.parser"."""
+    module = _BACKEND_MODULES.get(name)
+    if module and importlib.util.find_spec(module) is None:
+        if name not in _warned:
+            _warned.add(name)
+            print(f"[PARSE] {name} not installed; falling back to html.parser")
+        return "html.parser"
+    return name
+
+
+def make_soup(html: str, cfg: Config, tables_only: bool = False) -> BeautifulSoup:
+    """
+    Build a soup with cfg.HTML_PARSER. With cfg.HTML_TARGETED and tables_only=True only
+    <table> subtrees are built (html5lib ignores parse_only, so it always builds the full tree).
+    """
+    backend = resolve_backend(cfg.HTML_PARSER)
+    only = _TABLES_ONLY if tables_only and cfg.HTML_TARGETED and backend != "html5lib" else None
+    return BeautifulSoup(html, backend, parse_only=only)
+
+
+def is_targeted(soup: BeautifulSoup) -> bool:
+    return soup.parse_only is not None
+
+
+def labels_outside(label_counts: Dict[str, int], html: str, labels: Iterable[str]) -> bool:
+    """
+    True when a targeted soup may have dropped label text nodes that live outside tables,
+    i.e. the raw HTML has more `>label<` occurrences than the table-only tree (`label_counts`).
+    """
+    for label in labels:
+        raw = len(re.findall(fr">{re.escape(label)}\n?<", html, re.I))
+        if raw > label_counts.get(label, 0):
+            return True
+    return False
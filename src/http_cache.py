@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+from config import Config
+from .utils import FetchedResponse
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk HTTP cache:
+      CACHE_DIR/bodies/<sha256 of body>   page bodies, shared by every URL that serves them
+      CACHE_DIR/meta/<sha1 of url>.json   url, body hash, ETag / Last-Modified, fetched_at, used_at
+
+    Entries younger than CACHE_TTL_HOURS are served without touching the network; older ones are
+    revalidated with If-None-Match / If-Modified-Since; a page from a server that sends neither is
+    downloaded again but stored once per distinct body. Only transfer is saved: every page served
+    from here is still parsed, which is what CACHE_MODE="replay" (cache only, no network) is for.
+    """
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.body_dir = os.path.join(cfg.CACHE_DIR, "bodies")
+        self.meta_dir = os.path.join(cfg.CACHE_DIR, "meta")
+        os.makedirs(self.body_dir, exist_ok=True)
+        os.makedirs(self.meta_dir, exist_ok=True)
+
+    @property
+    def replay(self) -> bool:
+        return self.cfg.CACHE_MODE == "replay"
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # already evicted by another process sharing CACHE_DIR
+
+    def _meta_path(self, url: str) -> str:
+        return os.path.join(self.meta_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(url), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(os.path.join(self.body_dir, meta["sha256"])):
+            return None
+        return meta
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        return time.time() - meta["fetched_at"] < self.cfg.CACHE_TTL_HOURS * 3600
+
+    @staticmethod
+    def conditional_headers(meta: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def response(self, meta: Dict[str, Any], revalidated: bool = False) -> Optional[FetchedResponse]:
+        """Build a response from a cache entry; a revalidated entry restarts its TTL."""
+        try:
+            with open(os.path.join(self.body_dir, meta["sha256"]), "rb") as f:
+                text = f.read().decode("utf-8")
+        except OSError:
+            return None
+        meta["used_at"] = time.time()
+        if revalidated:
+            meta["fetched_at"] = meta["used_at"]
+        self._write_atomic(self._meta_path(meta["url"]), json.dumps(meta).encode("utf-8"))
+        return FetchedResponse(meta["url"], 200, text, {})
+
+    def store(self, url: str, text: str, headers: Dict[str, str]):
+        """Save a freshly downloaded body; identical bodies share one file."""
+        body = text.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        body_path = os.path.join(self.body_dir, digest)
+        if not os.path.exists(body_path):
+            self._write_atomic(body_path, body)
+        now = time.time()
+        meta = {
+            "url": url,
+            "sha256": digest,
+            "size": len(body),
+            "etag": headers.get("ETag", ""),
+            "last_modified": headers.get("Last-Modified", ""),
+            "fetched_at": now,
+            "used_at": now,
+        }
+        self._write_atomic(self._meta_path(url), json.dumps(meta).encode("utf-8"))
+
+    def evict(self):
+        """Drop entries older than CACHE_EXPIRE_DAYS, then least recently used ones above CACHE_MAX_MB."""
+        metas = []
+        for name in os.listdir(self.meta_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.meta_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    metas.append((path, json.load(f)))
+            except (OSError, ValueError):
+                continue
+
+        expire = time.time() - self.cfg.CACHE_EXPIRE_DAYS * 86400
+        keep = []
+        for path, meta in metas:
+            if meta["fetched_at"] < expire:
+                self._remove(path)
+            else:
+                keep.append((path, meta))
+
+        budget = self.cfg.CACHE_MAX_MB * 1024 * 1024
+        keep.sort(key=lambda pm: pm[1]["used_at"], reverse=True)
+        live, used = set(), 0
+        for path, meta in keep:
+            if meta["sha256"] in live:
+                continue
+            if used + meta["size"] > budget:
+                self._remove(path)
+                continue
+            live.add(meta["sha256"])
+            used += meta["size"]
+
+        for name in os.listdir(self.body_dir):
+            if name not in live and not name.endswith(".tmp"):
+                self._remove(os.path.join(self.body_dir, name))
@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Tuple
+from .schema import Firm
+from .scraper_bsoup import list_page_state
+from .utils import DateTools
+
+
+class ChangeDetector:
+    """
+    Incremental runs: compares list-page rows with the previous snapshot. A firm needs its
+    detail page refetched when it is new, or when its list-page RO/Rep/Total counts or licence
+    dates differ from what the list page showed when the snapshot record was fetched.
+    """
+    def __init__(self, previous: List[Firm]):
+        self.previous = {r.firm_url: r for r in previous}
+
+    def changed(self, firm_stub: Dict[str, Any]) -> bool:
+        old = self.previous.get(firm_stub["firm_url"])
+        if old is None or not old.list_page:
+            return True
+        state = list_page_state(firm_stub)
+        if state["total"] is None:
+            return True  # list row without counts: nothing to compare against
+        return state != old.list_page
+
+    def carry_forward(self, firm_stub: Dict[str, Any]) -> Firm:
+        """Previous record for an unchanged firm, with licensee status re-derived for today."""
+        rec = self.previous[firm_stub["firm_url"]]
+        for lic in rec.licensees:
+            lic.status = "Active" if DateTools.is_active(lic.licence_end) else "Inactive"
+        return rec
+
+    def split(self, firms: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Firm]]:
+        """(stubs to fetch, records carried forward)"""
+        fetch, carried = [], []
+        for f in firms:
+            if self.changed(f):
+                fetch.append(f)
+            else:
+                carried.append(self.carry_forward(f))
+        return fetch, carried
@@ -1,93 +1,381 @@
 
-import json
-from typing import List, Dict, Any, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import threading
+import time
+from typing import List, Dict, Any, Tuple, Iterable, Iterator, Callable, Optional, TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from contextlib import nullcontext
 from datetime import datetime, timedelta
-import pandas as pd
+from functools import cached_property
 from config import Config
-from .scraper_bsoup import ListPageParser, FirmDetailParser
+from .raw_store import RawWriter, read_raw
+from .schema import Firm, FirmArrayWriter, dump_firms, load_firms
 from .transformer import Transformer
-from .snapshot import SnapshotStore
-from .utils import HttpClient
-from .validator import Validator
+from .snapshot import open_store
+from .telemetry import Telemetry
+
+# The fetch side (requests, bs4, aiohttp) and pandas are imported where they are first used,
+# so stage-only runs (main.py transform / validate / snapshot) start without them.
+if TYPE_CHECKING:
+    import pandas as pd
+    from .http_cache import ResponseCache
+    from .scraper_bsoup import FirmDetailParser, ListPageParser
+    from .utils import HttpClient
+
+STAGES = ("ingest", "transform", "validate", "snapshot")
 
 
 class SFCPipeline:
     def __init__(self, cfg: Config):
         self.cfg = cfg
         self.cfg.ensure_dirs()
-        self.http = HttpClient(cfg)
-        self.list_parser = ListPageParser(cfg)
-        self.firm_parser = FirmDetailParser(self.http, cfg)
+        self.telemetry = Telemetry(cfg)
         self.transformer = Transformer()
-        self.snapshot = SnapshotStore(cfg)
+
+    @cached_property
+    def cache(self) -> Optional["ResponseCache"]:
+        from .http_cache import ResponseCache
+        return ResponseCache(self.cfg) if self.cfg.CACHE_MODE != "off" else None
+
+    @cached_property
+    def http(self) -> "HttpClient":
+        from .utils import HttpClient
+        return HttpClient(self.cfg, self.cache, self.telemetry)
+
+    @cached_property
+    def list_parser(self) -> "ListPageParser":
+        from .scraper_bsoup import ListPageParser
+        return ListPageParser(self.cfg, self.telemetry)
+
+    @cached_property
+    def firm_parser(self) -> "FirmDetailParser":
+        from .scraper_bsoup import FirmDetailParser
+        return FirmDetailParser(self.http, self.cfg, fetch_history=False, telemetry=self.telemetry)
+
+    @cached_property
+    def snapshot(self):
+        return open_store(self.cfg)
+
+    def _keep(self, stub: Dict[str, Any], cutoff: datetime) -> bool:
+        s = stub.get("licence_start_list", "")
+        if not s:
+            return True  # keep if missing; resolve on detail page
+        try:
+            return datetime.strptime(s, "%Y-%m-%d") >= cutoff
+        except Exception:
+            return True
 
     def _early_filter(self, firms: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         cutoff = datetime.now() - timedelta(days=self.cfg.DAYS_FILTER)
-        def keep(r: Dict[str, Any]) -> bool:
-            s = r.get("licence_start_list", "")
-            if not s:
-                return True  # keep if missing; resolve on detail page
-            try:
-                return datetime.strptime(s, "%Y-%m-%d") >= cutoff
-            except Exception:
-                return True
-        out = [f for f in firms if keep(f)]
+        out = [f for f in firms if self._keep(f, cutoff)]
         print(f"[FILTER] After {self.cfg.DAYS_FILTER}d window by list-page Licence start: {len(out)}")
         return out
 
-    def ingest(self) -> List[Dict[str, Any]]:
-        print("[INGEST] Fetching list page ...")
-        resp = self.http.get(self.cfg.BASE_URL)
-        if not resp:
+    def _incremental_split(self, firms: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Firm]]:
+        from .incremental import ChangeDetector
+        date, previous = self.snapshot.latest()
+        fetch, carried = ChangeDetector(previous).split(firms)
+        print(f"[INCREMENTAL] vs snapshot {date or '(none)'}: refetch {len(fetch)}, carried forward {len(carried)}")
+        return fetch, carried
+
+    def _parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.cfg.PARSE_WORKERS <= 0:
+            return None
+        import multiprocessing
+        # spawn: fetch threads are already running when the first worker starts
+        return ProcessPoolExecutor(self.cfg.PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+    def _fetch_firms_threaded(self, firms: Iterable[Dict[str, Any]], sink: Callable[[Firm], None]):
+        """
+        Fetch firm pages on as many threads as the HTTP client may have requests in flight
+        (its AIMD limit decides how many actually are), keeping at most 2x that many submitted.
+        With PARSE_WORKERS > 0 the threads only download: pages are handed to a process pool of
+        parsers, at most PARSE_QUEUE_SIZE of them queued, and fetch threads block while it is full.
+        """
+        from .history import PersonHistoryStage
+        from .scraper_bsoup import parse_firm_page
+        parsers = self._parse_pool()
+        workers = self.http.policy.max_in_flight
+        queued = threading.BoundedSemaphore(self.cfg.PARSE_QUEUE_SIZE)
+        with PersonHistoryStage(self.firm_parser.person_parser, self.cfg) as history, \
+                parsers or nullcontext(), \
+                ThreadPoolExecutor(max_workers=workers) as ex:
+            def accept(rec: Optional[Firm]):
+                if not rec:
+                    return
+                if self.cfg.FETCH_LICENSEE_HISTORY:
+                    history.attach(rec, sink)
+                else:
+                    sink(rec)
+
+            def parsed(fut, stub: Dict[str, Any], nbytes: int):
+                queued.release()
+                try:
+                    rec, secs = fut.result()
+                    self.telemetry.parse("firm", secs, nbytes, stub["firm_url"])
+                    accept(rec)
+                except Exception as e:
+                    print(f"[PARSE ERR] {e!r}")
+
+            def fetch(stub: Dict[str, Any]):
+                if parsers is None:
+                    accept(self.firm_parser.parse(stub))
+                    return
+                r = self.http.get(stub["firm_url"])
+                if r:
+                    queued.acquire()
+                    fut = parsers.submit(parse_firm_page, self.cfg, stub, r.text)
+                    fut.add_done_callback(lambda f, n=len(r.text): parsed(f, stub, n))
+
+            pending = set()
+            for f in firms:
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        fut.result()
+                pending.add(ex.submit(fetch, f))
+            for fut in as_completed(pending):
+                fut.result()
+
+    async def _fetch_firms_async(self, firms: Iterable[Dict[str, Any]], sink: Callable[[Firm], None]):
+        import asyncio
+        from .async_http import AsyncHttpClient
+        from .history import PersonHistoryStage
+        from .scraper_bsoup import FirmDetailParser, parse_firm_page
+        parsers = self._parse_pool()
+        queued = asyncio.Semaphore(self.cfg.PARSE_QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        async with AsyncHttpClient(self.cfg, self.cache, self.telemetry) as http:
+            parser = FirmDetailParser(http, self.cfg, fetch_history=False, telemetry=self.telemetry)
+            history = PersonHistoryStage(parser.person_parser, self.cfg)
+
+            async def one(stub: Dict[str, Any]):
+                if parsers is None:
+                    rec = await parser.aparse(stub)
+                else:
+                    async with queued:
+                        r = await http.get(stub["firm_url"])
+                        rec = None
+                        if r:
+                            rec, secs = await loop.run_in_executor(parsers, parse_firm_page, self.cfg, stub, r.text)
+                            self.telemetry.parse("firm", secs, len(r.text), stub["firm_url"])
+                if rec and self.cfg.FETCH_LICENSEE_HISTORY:
+                    rec = await history.aattach(rec)
+                if rec:
+                    sink(rec)
+
+            with parsers or nullcontext():
+                if isinstance(firms, list):
+                    await asyncio.gather(*(one(f) for f in firms))
+                else:
+                    # a streamed list page: pull stubs on a worker thread as the page downloads
+                    tasks, it = [], iter(firms)
+                    while (stub := await loop.run_in_executor(None, next, it, None)) is not None:
+                        tasks.append(asyncio.create_task(one(stub)))
+                    await asyncio.gather(*tasks)
+            self.telemetry.set("http", http.policy.stats())
+
+    def _stream_firms(self, chunks: Iterable[str], writer: RawWriter, t0: float) -> Iterator[Dict[str, Any]]:
+        """
+        LIST_STREAMING: firm stubs straight from the downloading list page, through the early
+        filter, incremental split and resume check, so detail fetches start with the first rows.
+        Carried-forward records are written as their rows go by.
+        """
+        from .incremental import ChangeDetector
+        cutoff = datetime.now() - timedelta(days=self.cfg.DAYS_FILTER)
+        detector = None
+        if self.cfg.INCREMENTAL:
+            date, previous = self.snapshot.latest()
+            detector = ChangeDetector(previous)
+            print(f"[INCREMENTAL] vs snapshot {date or '(none)'}")
+        done = set(writer.done)
+        seen = kept = carried = 0
+        first = None
+        for stub in self.list_parser.iter_parse(chunks):
+            seen += 1
+            if not self._keep(stub, cutoff):
+                continue
+            kept += 1
+            if stub["firm_url"] in done:
+                continue
+            if detector and not detector.changed(stub):
+                writer.write(detector.carry_forward(stub))
+                carried += 1
+                continue
+            if first is None:
+                first = time.perf_counter() - t0
+            yield stub
+        print(f"[INGEST] Discovered firms on list page: {seen} (streamed)")
+        print(f"[FILTER] After {self.cfg.DAYS_FILTER}d window by list-page Licence start: {kept}")
+        if detector:
+            print(f"[INCREMENTAL] carried forward {carried}")
+        self.telemetry.set("list_page", {"streamed": True, "firms": seen, "kept": kept,
+                                         "first_fetch_s": round(first, 4) if first is not None else None})
+
+    def fetch_list(self):
+        """The list page: an iterator of body chunks with LIST_STREAMING, else its text. Exits if unavailable."""
+        page = self.http.stream(self.cfg.BASE_URL) if self.cfg.LIST_STREAMING else self.http.get(self.cfg.BASE_URL)
+        if not page:
             raise SystemExit("Unable to fetch list page.")
+        return page if self.cfg.LIST_STREAMING else page.text
 
-        firms = self.list_parser.parse(resp.text)
+    def _list_firms(self, page, writer: RawWriter, t0: float) -> Iterable[Dict[str, Any]]:
+        """Firm stubs to fetch from `fetch_list()` (carried-forward records are written to `writer` directly)."""
+        if self.cfg.LIST_STREAMING:
+            return self._stream_firms(page, writer, t0)
+
+        firms = self.list_parser.parse(page)
         print(f"[INGEST] Discovered firms on list page: {len(firms)}")
+        seen = len(firms)
 
         firms = self._early_filter(firms)
+        kept = len(firms)
+        carried: List[Firm] = []
+        if self.cfg.INCREMENTAL:
+            firms, carried = self._incremental_split(firms)
 
-        print("[INGEST] Fetching firm pages ...")
-        results: List[Dict[str, Any]] = []
-        with ThreadPoolExecutor(max_workers=self.cfg.MAX_WORKERS) as ex:
-            futures = [ex.submit(self.firm_parser.parse, f) for f in firms]
-            for fut in as_completed(futures):
-                rec = fut.result()
-                if rec:
-                    results.append(rec)
+        if writer.done:
+            firms = [f for f in firms if f["firm_url"] not in writer.done]
+            carried = [r for r in carried if r.firm_url not in writer.done]
+        for rec in carried:
+            writer.write(rec)
+        self.telemetry.set("list_page", {"streamed": False, "firms": seen, "kept": kept,
+                                         "first_fetch_s": round(time.perf_counter() - t0, 4)})
+        return firms
 
-        with open(self.cfg.RAW_FILE, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
-        print(f"[INGEST] Raw saved -> {self.cfg.RAW_FILE} (firms: {len(results)})")
-        return results
+    def fetch(self, firms: Iterable[Dict[str, Any]], sink: Callable[[Firm], None]):
+        """Fetch and parse the firm pages of `firms` with FETCH_ENGINE, handing each record to `sink`."""
+        print(f"[INGEST] Fetching firm pages ({self.cfg.FETCH_ENGINE}) ...")
+        if self.cfg.FETCH_ENGINE == "async":
+            import asyncio
+            asyncio.run(self._fetch_firms_async(firms, sink))
+        else:
+            self._fetch_firms_threaded(firms, sink)
+            self.telemetry.set("http", self.http.policy.stats())
 
-    def transform(self, raw_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def ingest(self) -> str:
+        """Fetch and parse firm pages, streaming records to RAW_FILE (NDJSON); returns its path."""
+        print("[INGEST] Fetching list page ...")
+        t0 = time.perf_counter()
+        page = self.fetch_list()
+        writer = RawWriter(self.cfg)  # only now: a failed list fetch leaves an earlier raw file alone
+        try:
+            self.fetch(self._list_firms(page, writer, t0), writer.write)
+        finally:
+            writer.close()
+
+        if self.cache and not self.cache.replay:
+            self.cache.evict()
+        print(f"[INGEST] Raw saved -> {self.cfg.RAW_FILE} (firms: {len(writer.done)})")
+        return self.cfg.RAW_FILE
+
+    def transform(self, raw_records: Iterable[Firm]) -> List[Firm]:
         print("[TRANSFORM] Normalizing records ...")
-        norm = self.transformer.normalize(raw_records)
-        with open(self.cfg.PROCESSED_FILE, "w", encoding="utf-8") as f:
-            json.dump(norm, f, ensure_ascii=False, indent=2)
+        norm = self.transformer.normalize(raw_records, self.cfg.RUN_DATE)
+        dump_firms(self.cfg.PROCESSED_FILE, norm)
         print(f"[TRANSFORM] Processed saved -> {self.cfg.PROCESSED_FILE}")
         return norm
 
-    def validate(self, records: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def validate(self, records: List[Firm]) -> Tuple["pd.DataFrame", "pd.DataFrame"]:
+        from .validator import Validator
         print("[VALIDATE] Running validation and metrics ...")
-        issues = Validator.validate(records)
+        firms, licensees = Validator.flatten(records)
+        return self._write_validation(Validator.validate_frames(firms, licensees),
+                                      Validator.metrics_frames(firms, licensees),
+                                      Validator.metrics_detail(firms, licensees))
+
+    def _write_validation(self, issues: "pd.DataFrame", metrics: "pd.DataFrame",
+                          detail: "pd.DataFrame") -> Tuple["pd.DataFrame", "pd.DataFrame"]:
         issues.to_csv(self.cfg.VALIDATION_FILE, index=False)
-        metrics = Validator.metrics(records)
         metrics.to_csv(self.cfg.METRICS_FILE, index=False)
+        detail.to_csv(self.cfg.METRICS_DETAIL_FILE, index=False)
         print(f"[VALIDATE] Issues -> {self.cfg.VALIDATION_FILE} (rows: {len(issues)})")
-        print(f"[VALIDATE] Metrics -> {self.cfg.METRICS_FILE}")
+        print(f"[VALIDATE] Metrics -> {self.cfg.METRICS_FILE}, {self.cfg.METRICS_DETAIL_FILE}")
         return issues, metrics
 
-    def snapshot_store(self, processed: List[Dict[str, Any]]):
+    def snapshot_store(self, processed: List[Firm]):
         print("[SNAPSHOT] Writing snapshot & pruning old ones ...")
         self.snapshot.write_snapshot(processed)
         self.snapshot.prune()
         print("[SNAPSHOT] Done.")
 
-    def run(self):
-        raw = self.ingest()
-        processed = self.transform(raw)
-        self.validate(processed)
-        self.snapshot_store(processed)
-        print("[PIPELINE] Completed.")
\ No newline at end of file
+    def fused(self, stages: Tuple[str, ...]):
+        """
+        transform plus validate and/or snapshot in one pass: RAW_FILE is read, normalized and
+        handed firm by firm to the processed-file writer, the validation accumulator and the
+        snapshot writer, so only the current firm is in memory. Outputs are the same as the
+        separate stages'; the processed file and snapshot only replace earlier ones on success.
+        """
+        from .validator import ValidationAccumulator
+        print(f"[FUSED] {self.cfg.RAW_FILE} -> {', '.join(stages)} in one pass ...")
+        raw = read_raw(self._artifact(self.cfg.RAW_FILE, "ingest"))
+        records = self.transformer.iter_normalize(raw, self.cfg.RUN_DATE)
+        writers = [FirmArrayWriter(self.cfg.PROCESSED_FILE)]
+        checks = ValidationAccumulator() if "validate" in stages else None
+        if "snapshot" in stages:
+            writers.append(self.snapshot.writer())
+        closed = 0
+        try:
+            for firm in records:
+                for w in writers:
+                    w.write(firm)
+                if checks:
+                    checks.add(firm)
+            writers[0].close()
+            closed = 1
+            print(f"[TRANSFORM] Processed saved -> {self.cfg.PROCESSED_FILE} (firms: {writers[0].count})")
+            if checks:
+                self._write_validation(checks.issues(), checks.metrics(), checks.metrics_detail())
+            if len(writers) > 1:
+                writers[1].close()
+                closed = 2
+        except BaseException:
+            for w in writers[closed:]:
+                w.abort()  # also after a failed close()
+            raise
+        if len(writers) > 1:
+            self.snapshot.prune()
+            print("[SNAPSHOT] Done.")
+
+    def _artifact(self, path: str, stage: str) -> str:
+        if not os.path.exists(path):
+            raise SystemExit(f"[PIPELINE] {path} not found; run the {stage} stage for {self.cfg.RUN_DATE} first")
+        return path
+
+    def run(self, first: str = "ingest", last: str = "snapshot"):
+        """
+        Stages first..last of ingest -> transform -> validate -> snapshot. A run that does not
+        start at ingest reads the previous stage's files (RAW_FILE, PROCESSED_FILE) instead of
+        crawling; the run report of a partial run is tagged with its stages. With FUSED_STAGES,
+        transform and the stages after it run as one streaming pass (see `fused`), timed as one
+        report stage such as "transform+validate+snapshot".
+        """
+        stages = STAGES[STAGES.index(first):STAGES.index(last) + 1]
+        with self.telemetry.profiling():
+            self.process(stages)
+        full = stages == STAGES
+        self.telemetry.write_report(tag="" if full else "-".join(dict.fromkeys((first, last))))
+        print("[PIPELINE] Completed." if full else f"[PIPELINE] Completed {', '.join(stages)}.")
+
+    def process(self, stages: Tuple[str, ...]):
+        """Run `stages` (in STAGES order) as `run` does, without profiling or writing the report."""
+        steps = [(stage,) for stage in stages]
+        if self.cfg.FUSED_STAGES and "transform" in stages and stages[-1] != "transform":
+            steps = steps[:stages.index("transform")] + [stages[stages.index("transform"):]]
+        processed: Optional[List[Firm]] = None
+        for step in steps:
+            with self.telemetry.stage("+".join(step)):
+                stage = step[0]
+                if len(step) > 1:
+                    self.fused(step)
+                elif stage == "ingest":
+                    self.ingest()
+                elif stage == "transform":
+                    processed = self.transform(read_raw(self._artifact(self.cfg.RAW_FILE, "ingest")))
+                else:
+                    if processed is None:
+                        processed = load_firms(self._artifact(self.cfg.PROCESSED_FILE, "transform"))
+                    if stage == "validate":
+                        self.validate(processed)
+                    else:
+                        self.snapshot_store(processed)
@@ -0,0 +1,213 @@
+import argparse
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from config import Config
+from .schema import Firm, dumps
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (run_date TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS people (
+    person_key TEXT PRIMARY KEY,      -- SFC ID, else person URL
+    name TEXT, name_fold TEXT, person_url TEXT, last_seen TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    person_key TEXT NOT NULL, firm_url TEXT NOT NULL, role TEXT NOT NULL, licence_start TEXT NOT NULL,
+    firm_id TEXT, firm_name TEXT, licence_end TEXT,
+    first_seen TEXT NOT NULL, last_seen TEXT NOT NULL,
+    PRIMARY KEY (person_key, firm_url, role, licence_start)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS people_name ON people(name_fold);
+CREATE INDEX IF NOT EXISTS postings_firm_url ON postings(firm_url);
+CREATE INDEX IF NOT EXISTS postings_firm_id ON postings(firm_id COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS postings_firm_name ON postings(firm_name COLLATE NOCASE);
+"""
+
+# newer runs refresh the descriptive columns; first/last seen widen in either direction
+UPSERT_POSTING = """
+INSERT INTO postings VALUES (:key, :firm_url, :role, :start, :firm_id, :firm_name, :end, :run, :run)
+ON CONFLICT (person_key, firm_url, role, licence_start) DO UPDATE SET
+    firm_id = CASE WHEN excluded.last_seen >= last_seen THEN excluded.firm_id ELSE firm_id END,
+    firm_name = CASE WHEN excluded.last_seen >= last_seen THEN excluded.firm_name ELSE firm_name END,
+    licence_end = CASE WHEN excluded.last_seen >= last_seen THEN excluded.licence_end ELSE licence_end END,
+    first_seen = MIN(first_seen, excluded.first_seen),
+    last_seen = MAX(last_seen, excluded.last_seen)
+"""
+UPSERT_PERSON = """
+INSERT INTO people VALUES (:key, :name, :fold, :url, :run)
+ON CONFLICT (person_key) DO UPDATE SET
+    name = excluded.name, name_fold = excluded.name_fold, person_url = excluded.person_url, last_seen = excluded.last_seen
+WHERE excluded.last_seen >= last_seen
+"""
+POSTING_COLUMNS = "firm_url, firm_id, firm_name, role, licence_start, licence_end, first_seen, last_seen"
+
+
+class PersonIndex:
+    """
+    Persisted inverted index person -> (firm, role, licence dates, first/last run seen) in
+    PERSON_INDEX_FILE, kept across snapshots and their pruning. `update` / `begin` upsert one run's
+    records (snapshot writers feed it as they write), so nothing ever rescans old
+    snapshots; lookups by SFC ID, name prefix, firm URL or firm name prefix are indexed reads.
+    """
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.path = cfg.PERSON_INDEX_FILE
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ---- maintenance ---------------------------------------------------------------------
+
+    def update(self, records: Iterable[Firm], run_date: str):
+        """Merge one run in one transaction: new postings are added, known ones widened/refreshed."""
+        run = self.begin(run_date)
+        for firm in records:
+            run.write(firm)
+        run.close()
+
+    def begin(self, run_date: str) -> "IndexRun":
+        """Merge a run firm by firm (see IndexRun); `update` for records already in hand."""
+        return IndexRun(self, run_date)
+
+    def rebuild(self, store) -> int:
+        """Re-index every run still held by a snapshot store (SnapshotStore or SQLiteStore)."""
+        with self.conn:
+            for table in ("runs", "people", "postings"):
+                self.conn.execute(f"DELETE FROM {table}")
+        dates = store.dates()
+        for date in dates:
+            self.update(store.load(date), date)
+        return len(dates)
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM people").fetchone()[0]
+
+    # ---- lookups -------------------------------------------------------------------------
+
+    def _people(self, keys: List[str], where: str = "", args: tuple = ()) -> List[Dict[str, Any]]:
+        out = []
+        for key in keys:
+            person = self.conn.execute("SELECT * FROM people WHERE person_key = ?", (key,)).fetchone()
+            if person is None:
+                continue
+            rows = self.conn.execute(
+                f"SELECT {POSTING_COLUMNS} FROM postings WHERE person_key = ? {where} ORDER BY licence_start, firm_url",
+                (key, *args))
+            out.append({"sfc_id": key, "name": person["name"], "person_url": person["person_url"],
+                        "postings": [dict(r) for r in rows]})
+        return out
+
+    def by_id(self, sfc_id: str) -> Optional[Dict[str, Any]]:
+        found = self._people([sfc_id])
+        return found[0] if found else None
+
+    def by_name(self, prefix: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """People whose name starts with `prefix` (case-insensitive), in name order."""
+        fold = prefix.casefold()
+        keys = [r[0] for r in self.conn.execute(
+            "SELECT person_key FROM people WHERE name_fold >= ? AND name_fold < ? ORDER BY name_fold LIMIT ?",
+            (fold, fold + "\U0010ffff", limit))]
+        return self._people(keys)
+
+    def by_firm(self, firm: str) -> List[Dict[str, Any]]:
+        """
+        Everyone ever indexed at a firm, given its URL, or its SFC CE number (case-insensitive)
+        for records that carry one: the scraper leaves firm_id empty, see `by_firm_name`.
+        """
+        where = "AND (firm_url = ? OR firm_id = ? COLLATE NOCASE)"
+        keys = [r[0] for r in self.conn.execute(
+            "SELECT person_key FROM postings WHERE firm_url = ? "
+            "UNION SELECT person_key FROM postings WHERE firm_id = ? COLLATE NOCASE AND firm_id != '' "
+            "ORDER BY person_key", (firm, firm))]
+        return self._people(keys, where, (firm, firm))
+
+    def by_firm_name(self, prefix: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """Everyone ever indexed at firms whose name starts with `prefix` (ASCII case-insensitive), with their postings there."""
+        bounds = (prefix, prefix + "\U0010ffff")
+        where = "AND firm_name >= ? COLLATE NOCASE AND firm_name < ? COLLATE NOCASE"
+        keys = [r[0] for r in self.conn.execute(
+            f"SELECT DISTINCT person_key FROM postings WHERE 1 {where} ORDER BY person_key LIMIT ?", (*bounds, limit))]
+        return self._people(keys, where, bounds)
+
+
+class IndexRun:
+    """One run being merged into a PersonIndex as its records go by; committed by close()."""
+    def __init__(self, index: PersonIndex, run_date: str):
+        self.index = index
+        self.run_date = run_date
+        self.people = set()  # the first row of a person in a run names them, as in one batch
+
+    def write(self, firm: Firm):
+        people, postings = [], []
+        for lic in firm.licensees:
+            key = lic.licensee_id or lic.person_url
+            if not key:
+                continue
+            if key not in self.people:
+                self.people.add(key)
+                people.append({"key": key, "name": lic.name, "fold": lic.name.casefold(),
+                               "url": lic.person_url, "run": self.run_date})
+            postings.append({"key": key, "firm_url": firm.firm_url, "role": lic.role, "start": lic.licence_start,
+                             "firm_id": firm.firm_id, "firm_name": firm.firm_name, "end": lic.licence_end,
+                             "run": self.run_date})
+        self.index.conn.executemany(UPSERT_PERSON, people)
+        self.index.conn.executemany(UPSERT_POSTING, postings)
+
+    def close(self):
+        with self.index.conn:
+            self.index.conn.execute("INSERT OR IGNORE INTO runs VALUES (?)", (self.run_date,))
+
+    def abort(self):
+        self.index.conn.rollback()
+
+
+def _print(result: Dict[str, Any]):
+    print(f"{result['sfc_id']}  {result['name']}")
+    for p in result["postings"]:
+        until = p["licence_end"] or "present"
+        print(f"    {p['licence_start'] or '?':10} .. {until:10}  {p['role']:4}  {p['firm_name']} ({p['firm_id']})"
+              f"  seen {p['first_seen']}..{p['last_seen']}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Look up licensees in the persisted person index")
+    group = ap.add_mutually_exclusive_group(required=True)
+    group.add_argument("--sfc-id", help="exact SFC ID")
+    group.add_argument("--name", help="name prefix (case-insensitive)")
+    group.add_argument("--firm", help="firm URL (or SFC CE number, for records that carry one)")
+    group.add_argument("--firm-name", help="firm name prefix (case-insensitive)")
+    group.add_argument("--rebuild", action="store_true", help="re-index every stored snapshot")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    cfg = Config()
+    if args.rebuild:
+        cfg.ensure_dirs()
+    elif not os.path.exists(cfg.PERSON_INDEX_FILE):
+        raise SystemExit(f"[INDEX] No index at {cfg.PERSON_INDEX_FILE}; run the pipeline or --rebuild first")
+    t = time.perf_counter()
+    index = PersonIndex(cfg)
+    if args.rebuild:
+        from .snapshot import open_store
+        n = index.rebuild(open_store(cfg))
+        print(f"[INDEX] Rebuilt from {n} snapshots: {index.count()} people -> {index.path}")
+        raise SystemExit(0)
+    if args.sfc_id:
+        found = index.by_id(args.sfc_id)
+        results = [found] if found else []
+    elif args.name:
+        results = index.by_name(args.name)
+    elif args.firm_name:
+        results = index.by_firm_name(args.firm_name)
+    else:
+        results = index.by_firm(args.firm)
+    if args.json:
+        print(dumps(results, indent=True).decode("utf-8"))
+    else:
+        for r in results:
+            _print(r)
+        print(f"[INDEX] {len(results)} match(es) in {(time.perf_counter() - t) * 1000:.1f} ms")
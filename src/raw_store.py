@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from typing import Iterator, Optional, Set
+from config import Config
+from .schema import Firm, dumps, loads
+
+
+def read_raw(path: str) -> Iterator[Firm]:
+    """Stream records from an NDJSON raw file, skipping a torn last line."""
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            yield Firm.from_dict(loads(line))
+
+
+class RawWriter:
+    """
+    Appends each finished firm record to RAW_FILE as one NDJSON line, and every CHECKPOINT_EVERY
+    records rewrites CHECKPOINT_FILE with the byte offset and record count reached (constant size,
+    so a checkpoint costs the same at the millionth record as at the first).
+
+    With cfg.RESUME the existing raw file for the same RUN_DATE is kept: its complete lines are
+    re-read into `done`, which tells ingest which firms to skip, and a torn trailing line is cut
+    off. Without it both files start empty. Thread-safe.
+
+    `path` writes another NDJSON file instead (checkpoint next to it as <name>.checkpoint.json),
+    `resume` overrides cfg.RESUME; shard workers use both for their partial outputs.
+    """
+    def __init__(self, cfg: Config, path: Optional[str] = None, resume: Optional[bool] = None):
+        self.cfg = cfg
+        self.path = path or cfg.RAW_FILE
+        self.checkpoint_path = os.path.splitext(path)[0] + ".checkpoint.json" if path else cfg.CHECKPOINT_FILE
+        self.resume = cfg.RESUME if resume is None else resume
+        self.lock = threading.Lock()
+        self.done: Set[str] = set()
+        self.written = 0
+        offset = self._recover() if self.resume else 0
+        self.f = open(self.path, "r+b" if offset else "wb")
+        self.f.seek(offset)
+        self.f.truncate()
+        if not self.resume and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _recover(self) -> int:
+        """Rebuild `done` from the complete lines of the raw file; returns the offset after the last one."""
+        if not os.path.exists(self.path):
+            return 0
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self.done.add(loads(line)["firm_url"])
+                offset += len(line)
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                ckpt = json.load(f)
+            if ckpt.get("run_date") == self.cfg.RUN_DATE and ckpt["offset"] > offset:
+                print(f"[RESUME] {self.path} is shorter than its checkpoint ({offset} < {ckpt['offset']} bytes); "
+                      f"the missing firms are fetched again")
+        except (OSError, ValueError, KeyError):
+            pass
+        print(f"[RESUME] {len(self.done)} firms already in {self.path}")
+        return offset
+
+    def write(self, rec: Firm):
+        line = dumps(rec.to_dict()) + b"\n"
+        with self.lock:
+            self.f.write(line)
+            self.f.flush()
+            self.done.add(rec.firm_url)
+            self.written += 1
+            if self.written % self.cfg.CHECKPOINT_EVERY == 0:
+                self._checkpoint()
+
+    def _checkpoint(self):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"run_date": self.cfg.RUN_DATE, "offset": self.f.tell(), "records": len(self.done)}, f)
+        os.replace(tmp, self.checkpoint_path)
+        print(f"[INGEST] Checkpoint: {len(self.done)} firms done")
+
+    def close(self):
+        with self.lock:
+            self._checkpoint()
+            self.f.close()
@@ -0,0 +1,182 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from config import Config
+
+# Worth another attempt, and a sign the server wants less load (status 0 = timeout / connection error)
+RETRYABLE_STATUS = {0, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryBudget:
+    """
+    Run-wide cap on retries: at most `minimum + ratio * requests` retries in total, so a
+    failing server costs a bounded fraction of extra traffic instead of MAX_RETRIES x everything.
+    """
+    def __init__(self, ratio: float, minimum: int):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    def request(self):
+        with self.lock:
+            self.requests += 1
+
+    def try_spend(self) -> bool:
+        with self.lock:
+            if self.retries < self.minimum + self.ratio * self.requests:
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+
+class AimdLimit:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit. Like TCP it starts in slow
+    start (+1 per healthy response, doubling per window) until the first congestion signal.
+    After that each healthy response (latency within `tolerance` x the smoothed baseline) adds
+    1/limit, i.e. about +1 per window of `limit` requests; rising latency takes the same step
+    back, and an overload response (429/5xx/timeout) halves the limit, at most once per
+    smoothed latency so one burst of errors counts as one signal. With adaptive=False the
+    limit stays at `initial`.
+    """
+    def __init__(self, initial: int, minimum: int, maximum: int, adaptive: bool = True,
+                 tolerance: float = 2.0, decrease: float = 0.5):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(self.maximum, max(self.minimum, initial)))
+        self.adaptive = adaptive
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self.lock = threading.Lock()
+        self.latency: Optional[float] = None   # EWMA of response latency
+        self.baseline: Optional[float] = None  # slowly rising floor of `latency`
+        self.last_cut = 0.0
+        self.slow_start = True
+        self.overloads = 0
+        self.low = self.high = self.limit
+
+    def observe(self, latency: float, overload: bool):
+        if not self.adaptive:
+            return
+        with self.lock:
+            self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+            self.baseline = self.latency if self.baseline is None else \
+                min(self.latency, self.baseline + 0.01 * (self.latency - self.baseline))
+            now = time.monotonic()
+            if overload:
+                self.overloads += 1
+                self.slow_start = False
+                if now - self.last_cut >= self.latency:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self.last_cut = now
+            elif self.latency <= self.tolerance * self.baseline:
+                self.limit = min(self.maximum, self.limit + (1.0 if self.slow_start else 1.0 / self.limit))
+            else:
+                self.slow_start = False
+                self.limit = max(self.minimum, self.limit - 1.0 / self.limit)
+            self.low, self.high = min(self.low, self.limit), max(self.high, self.limit)
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+
+class ConcurrencyGate:
+    """Blocks threads while `limit.current` requests are already in flight."""
+    def __init__(self, limit: AimdLimit):
+        self.limit = limit
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+    def __enter__(self):
+        with self.cond:
+            while self.in_flight >= self.limit.current:
+                self.cond.wait()
+            self.in_flight += 1
+
+    def __exit__(self, *exc):
+        with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()  # the limit may have grown by more than one slot
+
+
+class AsyncConcurrencyGate:
+    """asyncio flavour of ConcurrencyGate (create inside the running loop)."""
+    def __init__(self, limit: AimdLimit):
+        self.limit = limit
+        self.in_flight = 0
+        self.cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.in_flight < self.limit.current)
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc):
+        async with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+
+class RetryPolicy:
+    """
+    The one retry policy shared by HttpClient and AsyncHttpClient: up to MAX_RETRIES attempts
+    per URL for timeouts, connection errors, 429 and 5xx only; waits honour Retry-After, else
+    full-jitter exponential backoff from BACKOFF_SECONDS, capped at RETRY_MAX_DELAY; every retry
+    draws on the run-wide RetryBudget. Also owns the AIMD concurrency limit fed by each attempt.
+    """
+    def __init__(self, cfg: Config, max_in_flight: int):
+        self.cfg = cfg
+        self.budget = RetryBudget(cfg.RETRY_BUDGET_RATIO, cfg.RETRY_BUDGET_MIN)
+        self.limit = AimdLimit(cfg.MAX_WORKERS, cfg.CONCURRENCY_MIN, max_in_flight, cfg.ADAPTIVE_CONCURRENCY)
+        self.rng = random.Random()
+
+    @property
+    def max_in_flight(self) -> int:
+        return self.limit.maximum if self.limit.adaptive else self.limit.current
+
+    def can_retry(self, attempts: int, status: int) -> bool:
+        """After `attempts` failed attempts ending in `status`, may the caller try again?"""
+        return status in RETRYABLE_STATUS and attempts < self.cfg.MAX_RETRIES and self.budget.try_spend()
+
+    def backoff(self, attempts: int, retry_after: Optional[str] = None) -> float:
+        wait = parse_retry_after(retry_after)
+        if wait is None:
+            wait = self.rng.uniform(0, self.cfg.BACKOFF_SECONDS * 2 ** (attempts - 1))
+        return min(wait, self.cfg.RETRY_MAX_DELAY)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_final": round(self.limit.limit, 2),
+            "concurrency_low": round(self.limit.low, 2),
+            "concurrency_high": round(self.limit.high, 2),
+            "overload_responses": self.limit.overloads,
+            "retries": self.budget.retries,
+            "retry_budget_exhausted": self.budget.exhausted,
+        }
@@ -0,0 +1,187 @@
+import gc
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used when orjson is missing
+    orjson = None
+
+
+@dataclass(slots=True)
+class HistoryEntry:
+    """One row of a person's 'SFC licenses' table."""
+    organisation: str = ""
+    role: str = ""
+    activity: str = ""
+    from_: str = ""   # JSON key "from"
+    until: str = ""
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"organisation": self.organisation, "role": self.role, "activity": self.activity,
+                "from": self.from_, "until": self.until}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "HistoryEntry":
+        try:
+            return cls(*_HISTORY_KEYS(d))
+        except KeyError:
+            return cls(d.get("organisation", ""), d.get("role", ""), d.get("activity", ""),
+                       d.get("from", ""), d.get("until", ""))
+
+
+@dataclass(slots=True)
+class Licensee:
+    licensee_id: str = ""
+    name: str = ""
+    role: str = ""
+    status: str = ""
+    licence_start: str = ""
+    licence_end: str = ""
+    history: List[HistoryEntry] = field(default_factory=list)
+    person_url: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"licensee_id": self.licensee_id, "name": self.name, "role": self.role, "status": self.status,
+                "licence_start": self.licence_start, "licence_end": self.licence_end,
+                "history": [h.to_dict() for h in self.history], "person_url": self.person_url}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Licensee":
+        history = d.get("history") or []
+        if history:
+            history = list(map(HistoryEntry.from_dict, history))
+        try:
+            lid, name, role, status, start, end, url = _LICENSEE_KEYS(d)
+        except KeyError:
+            lid, name, role, status, start, end, url = (
+                d.get("licensee_id", ""), d.get("name", ""), d.get("role", ""), d.get("status", ""),
+                d.get("licence_start", ""), d.get("licence_end", ""), d.get("person_url", ""))
+        return cls(lid, name, role, status, start, end, history, url)
+
+
+@dataclass(slots=True)
+class Firm:
+    """
+    One firm record from parse to snapshot. Fields hold values as parsed; Transformer.normalize
+    coerces and normalizes them in place. `list_page` is what the list page showed (see
+    scraper_bsoup.list_page_state).
+    """
+    firm_id: str = ""
+    firm_name: str = ""
+    firm_url: str = ""
+    licence_start: str = ""
+    licence_end: str = ""
+    last_updated: str = ""
+    licensees: List[Licensee] = field(default_factory=list)
+    current_licensees_count: Optional[int] = 0
+    list_page: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"firm_id": self.firm_id, "firm_name": self.firm_name, "firm_url": self.firm_url,
+                "licence_start": self.licence_start, "licence_end": self.licence_end,
+                "last_updated": self.last_updated, "licensees": [lic.to_dict() for lic in self.licensees],
+                "current_licensees_count": self.current_licensees_count, "list_page": self.list_page}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Firm":
+        licensees = list(map(Licensee.from_dict, d.get("licensees") or []))
+        return cls(d.get("firm_id", ""), d.get("firm_name", ""), d.get("firm_url", ""),
+                   d.get("licence_start", ""), d.get("licence_end", ""), d.get("last_updated", ""),
+                   licensees, d.get("current_licensees_count", len(licensees)), d.get("list_page") or {})
+
+
+# fast path for complete dicts (everything this package writes); .get() defaults otherwise
+_HISTORY_KEYS = itemgetter("organisation", "role", "activity", "from", "until")
+_LICENSEE_KEYS = itemgetter("licensee_id", "name", "role", "status", "licence_start", "licence_end", "person_url")
+
+
+def as_firm(rec: Union[Firm, Dict[str, Any]]) -> Firm:
+    return rec if isinstance(rec, Firm) else Firm.from_dict(rec)
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """UTF-8 JSON; compact, or laid out like json.dumps(indent=2, ensure_ascii=False). orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    Suspend the cyclic GC while building a large acyclic object graph: every few hundred new
+    containers would otherwise trigger a collection that rescans all records built so far.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def dump_firms(path: str, firms: Iterable[Firm], indent: bool = True):
+    """Write records as one JSON array (processed file, snapshots)."""
+    with gc_paused():
+        data = dumps([firm.to_dict() for firm in firms], indent)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class FirmArrayWriter:
+    """
+    Writes records one at a time into the same file dump_firms would produce, holding only the
+    current record. The file is written under <path>.tmp and moved into place by close(), so
+    readers never see a partial array; abort() drops it, also after a failed close().
+    """
+    def __init__(self, path: str, indent: bool = True):
+        self.path = path
+        self.tmp = path + ".tmp"
+        self.sep = b",\n  " if indent else b","
+        self.indent = indent
+        self.count = 0
+        self.f = open(self.tmp, "wb")
+        self.f.write(b"[\n  " if indent else b"[")
+
+    def write(self, firm: Firm):
+        data = dumps(firm.to_dict(), self.indent)
+        if self.indent:
+            data = data.replace(b"\n", b"\n  ")  # newlines inside strings are escaped, so these are layout only
+        if self.count:
+            self.f.write(self.sep)
+        self.f.write(data)
+        self.count += 1
+
+    def close(self):
+        if self.count:
+            self.f.write(b"\n]" if self.indent else b"]")
+        else:
+            self.f.seek(0)
+            self.f.truncate()
+            self.f.write(b"[]")
+        self.f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def load_firms(path: str) -> List[Firm]:
+    with open(path, "rb") as f:
+        data = f.read()
+    with gc_paused():
+        return [Firm.from_dict(d) for d in loads(data)]
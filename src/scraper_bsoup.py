@@ -1,13 +1,222 @@
 
-import re
-from typing import List, Dict, Any, Optional
+import asyncio
+import time
+from collections import deque
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+from bs4.builder import HTMLParserTreeBuilder
 from config import Config
+from .dates import DateColumn
+from .extract import DocumentIndex
+from .html_backend import is_targeted, labels_outside, make_soup
+from .schema import Firm, HistoryEntry, Licensee
+from .telemetry import Telemetry, parse_timer
 from .utils import DateTools, HttpClient
 
-
-
+FIRM_LABELS = ("Licence start", "Licence end")
+LICENSEE_COLUMNS = (
+    ("name", ("name",)),
+    ("sfc_id", ("sfc id", "sfcid", "id")),
+    ("role", ("role",)),
+    ("from", ("from",)),
+    ("until", ("until",)),
+)
+HISTORY_COLUMNS = (
+    ("organisation", ("organisation", "organization")),
+    ("role", ("role",)),
+    ("activity", ("activity",)),
+    ("from", ("from",)),
+    ("until", ("until",)),
+)
+_VOID_TAGS = frozenset(HTMLParserTreeBuilder().empty_element_tags or ())  # what bs4 closes on sight
+
+
+def list_page_state(firm_stub: Dict[str, Any]) -> Dict[str, Any]:
+    """What the list page showed for a firm; stored on the record so later runs can detect changes."""
+    return {
+        "ro": firm_stub.get("ro"),
+        "rep": firm_stub.get("rep"),
+        "total": firm_stub.get("total"),
+        "licence_start": firm_stub.get("licence_start_list", ""),
+        "licence_end": firm_stub.get("licence_end_list", ""),
+    }
+
+
+class _ListRowTokenizer(HTMLParser):
+    """
+    Incremental tokenizer for the list page that rebuilds what bs4's "html.parser" tree would
+    hold: no implicit closing (an unclosed <td> nests the next one), end tags close the most
+    recent open element of that name or are ignored, void elements hold nothing. Each <tr>
+    collects the texts of every <td>/<th> below it (nested tables included) as
+    get_text(strip=True) would, and the first <a> of each cell. The firm table is the first one
+    whose header row (outermost <tr> above its first <th>) mentions every token, else the first
+    table - the same choice as DocumentIndex.find_table(...) or first_table(). Its data rows
+    (every <tr> below it but the first) are queued, in document order, as soon as they close.
+    """
+    HIDDEN = ("script", "style", "template", "rt", "rp")  # bs4 keeps their text out of get_text
+
+    def __init__(self, must_have: Tuple[str, ...]):
+        super().__init__(convert_charrefs=True)
+        self.must_have = must_have
+        self.stack: List[Tuple[str, Optional[Dict[str, Any]]]] = []  # open elements, innermost last
+        self.open_tables: List[Dict[str, Any]] = []
+        self.open_trs: List[Dict[str, Any]] = []
+        self.open_cells: List[Dict[str, Any]] = []
+        self.hidden = 0
+        self.voids_closed: List[str] = []  # void elements whose stray end tag bs4 swallows
+        self.tables: List[Dict[str, Any]] = []
+        self.selected: Optional[Dict[str, Any]] = None
+        self.ready: List[List[Tuple[str, str]]] = []
+        self.text: List[str] = []   # pieces of the current text node (feed() may split one)
+
+    def _add_text(self, text: str):
+        text = text.strip()
+        if text:
+            for cell in self.open_cells:
+                cell["parts"].append(text)
+
+    def _flush_text(self):
+        if self.text:
+            if not self.hidden:
+                self._add_text("".join(self.text))
+            self.text = []
+
+    def _push(self, tag: str, attrs):
+        node = None
+        if tag == "table":
+            node = {"index": len(self.tables), "depth": len(self.stack), "head": None, "match": None,
+                    "rows": deque() if self.selected is None else None, "trs": 0}
+            self.tables.append(node)
+            self.open_tables.append(node)
+        elif tag == "tr":
+            node = {"depth": len(self.stack), "cells": [], "heads": [], "done": False}
+            for t in self.open_tables:
+                if t["rows"] is not None:
+                    t["rows"].append(node)
+            self.open_trs.append(node)
+        elif tag in ("td", "th"):
+            node = {"th": tag == "th", "parts": [], "href": None}
+            for row in self.open_trs:
+                row["cells"].append(node)
+            self.open_cells.append(node)
+            if tag == "th":
+                for t in self.open_tables:
+                    if t["head"] is None:
+                        row = next((r for r in self.open_trs if r["depth"] > t["depth"]), None)
+                        if row is not None:
+                            t["head"] = row
+                            row["heads"].append(t)
+        elif tag == "a":
+            for cell in self.open_cells:
+                if cell["href"] is None:
+                    cell["href"] = dict(attrs).get("href") or ""
+        if tag in self.HIDDEN:
+            self.hidden += 1
+        self.stack.append((tag, node))
+
+    def _pop_to(self, tag: str):
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > i:
+            name, node = self.stack.pop()
+            if name in self.HIDDEN:
+                self.hidden -= 1
+            if name == "table":
+                self.open_tables.pop()
+                if node["match"] is None:
+                    self._decide(node, False)
+            elif name == "tr":
+                self.open_trs.pop()
+                node["done"] = True
+                for t in node["heads"]:
+                    header = " ".join(" ".join(c["parts"]).lower() for c in node["cells"])
+                    self._decide(t, all(tok in header for tok in self.must_have))
+                if self.selected is not None:
+                    self._emit(self.selected)
+            elif name in ("td", "th"):
+                self.open_cells.pop()
+
+    def _decide(self, table: Dict[str, Any], match: bool):
+        table["match"] = match
+        if self.selected is not None:
+            return
+        if not match and table["index"]:
+            table["rows"] = None
+        for t in self.tables:
+            if t["match"] is None:
+                return
+            if t["match"]:
+                self._select(t)
+                return
+
+    def _select(self, table: Dict[str, Any]):
+        self.selected = table
+        for t in self.tables:
+            if t is not table:
+                t["rows"] = None
+        self._emit(table)
+
+    def _emit(self, table: Dict[str, Any]):
+        rows = table["rows"]
+        while rows and rows[0]["done"]:
+            row = rows.popleft()
+            table["trs"] += 1
+            if table["trs"] > 1:  # first row is the header
+                self.ready.append([("".join(c["parts"]), c["href"]) for c in row["cells"] if not c["th"]])
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        self._push(tag, attrs)
+        if tag in _VOID_TAGS:
+            self._pop_to(tag)
+            self.voids_closed.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+        self._push(tag, attrs)
+        self._pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.voids_closed:
+            self.voids_closed.remove(tag)
+            return
+        self._flush_text()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        self._flush_text()
+        if data.upper().startswith("CDATA["):
+            self._add_text(data[6:])  # CData counts for get_text, even in hidden elements
+
+    def finish(self) -> List[List[Tuple[str, str]]]:
+        """Flush at end of input: remaining rows, or the first table's rows if no table matched."""
+        self.close()
+        self._flush_text()
+        while self.stack:
+            self._pop_to(self.stack[-1][0])
+        if self.selected is None and self.tables:
+            self._select(self.tables[0])
+        return self.drain()
+
+    def drain(self) -> List[List[Tuple[str, str]]]:
+        rows, self.ready = self.ready, []
+        return rows
 
 
 class ListPageParser:
@@ -15,135 +224,156 @@ class ListPageParser:
     Parses the list page:
     Columns resemble:
     Row | Name | (prev RO/Rep/Total) | (curr RO/Rep/Total) | Change | Rep% | End% | Licence start | Licence end
-    We extract: firm_name, firm_url, licence_start (last-2 col), licence_end (last col).
+    We extract: firm_name, firm_url, licence_start (last-2 col), licence_end (last col),
+    and the prev/curr counts + Change when the row has all 13 columns.
+    `parse` works on the whole page; `iter_parse` tokenizes it chunk by chunk as it downloads
+    and yields each firm as soon as its row is complete.
     """
-    def __init__(self, cfg: Config):
+    COUNT_COLUMNS = ("ro_prev", "rep_prev", "total_prev", "ro", "rep", "total", "change")  # tds[2:9]
+    TABLE_TOKENS = ("name", "licence", "ro", "rep", "total")  # heuristic: table that mentions name + licence
+
+    def __init__(self, cfg: Config, telemetry: Optional[Telemetry] = None):
         self.cfg = cfg
+        self.telemetry = telemetry
 
     @staticmethod
-    def _find_table_by_headers(soup: BeautifulSoup, must_have: List[str]) -> Optional[BeautifulSoup]:
-        for tbl in soup.find_all("table"):
-            # find header row
-            head_tr = None
-            for tr in tbl.find_all("tr"):
-                if tr.find("th"):
-                    head_tr = tr
-                    break
-            if not head_tr:
-                continue
-            headers = [th.get_text(" ", strip=True).lower() for th in head_tr.find_all(["th", "td"])]
-            joined = " ".join(headers)
-            if all(tok in joined for tok in must_have):
-                return tbl
-        return None
+    def _count(text: str) -> Optional[int]:
+        try:
+            return int(text.replace(",", "").replace("+", ""))
+        except ValueError:
+            return None
+
+    def _stub(self, texts: List[str], href: Optional[str], start_col: DateColumn,
+              end_col: DateColumn) -> Optional[Dict[str, Any]]:
+        """Firm stub from one row's <td> texts and the href of the name cell's first <a>."""
+        if len(texts) < 3:
+            return None
+        firm_name = texts[1]
+        firm_url = urljoin(self.cfg.BASE_URL, href) if href else ""
+
+        lic_start = start_col.parse(texts[-2])
+        lic_end = end_col.parse(texts[-1])
+
+        if not (firm_name and firm_url):
+            return None
+        stub = {
+            "firm_name": firm_name,
+            "firm_url": firm_url,
+            "licence_start_list": lic_start,
+            "licence_end_list": lic_end
+        }
+        if len(texts) >= 13:
+            for key, text in zip(self.COUNT_COLUMNS, texts[2:9]):
+                stub[key] = self._count(text)
+        return stub
 
     def parse(self, html: str) -> List[Dict[str, Any]]:
-        soup = BeautifulSoup(html, "html.parser")
-        # Heuristic: table that mentions name + licence
-        table = self._find_table_by_headers(
-            soup, must_have=["name", "licence", "ro", "rep", "total"]
-        ) or soup.find("table")
+        with parse_timer(self.telemetry, "list", html):
+            return self._parse(html)
+
+    def _parse(self, html: str) -> List[Dict[str, Any]]:
+        doc = DocumentIndex(make_soup(html, self.cfg, tables_only=True))
+        table = doc.find_table(self.TABLE_TOKENS) or doc.first_table()
 
         firms: List[Dict[str, Any]] = []
         if not table:
             return firms
 
-        rows = table.find_all("tr")
+        rows = table.rows()
         if len(rows) <= 1:
             return firms
 
+        start_col, end_col = DateColumn(), DateColumn()
         for tr in rows[1:]:
             tds = tr.find_all("td")
             if len(tds) < 3:
                 continue
-            name_td = tds[1]
-            firm_name = name_td.get_text(strip=True)
-            a = name_td.find("a")
-            firm_url = urljoin(self.cfg.BASE_URL, a["href"]) if a and a.get("href") else ""
-
-            lic_start = DateTools.parse_date(tds[-2].get_text(strip=True)) if len(tds) >= 2 else ""
-            lic_end = DateTools.parse_date(tds[-1].get_text(strip=True)) if len(tds) >= 1 else ""
-
-            if firm_name and firm_url:
-                firms.append({
-                    "firm_name": firm_name,
-                    "firm_url": firm_url,
-                    "licence_start_list": lic_start,
-                    "licence_end_list": lic_end
-                })
+            a = tds[1].find("a")
+            stub = self._stub([td.get_text(strip=True) for td in tds], a.get("href") if a else None,
+                              start_col, end_col)
+            if stub:
+                firms.append(stub)
         return firms
 
+    def iter_parse(self, chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Streaming `parse`: firm stubs from an iterable of HTML text chunks, yielded row by row."""
+        tokenizer = _ListRowTokenizer(self.TABLE_TOKENS)
+        start_col, end_col = DateColumn(), DateColumn()
+        secs, nbytes = 0.0, 0
+
+        def stubs(rows: List[List[Tuple[str, str]]]) -> List[Dict[str, Any]]:
+            out = []
+            for cells in rows:
+                stub = self._stub([text for text, _ in cells], cells[1][1] if len(cells) > 1 else None,
+                                  start_col, end_col)
+                if stub:
+                    out.append(stub)
+            return out
+
+        for chunk in chunks:
+            t = time.perf_counter()
+            tokenizer.feed(chunk)
+            ready = stubs(tokenizer.drain())
+            secs += time.perf_counter() - t
+            nbytes += len(chunk)
+            yield from ready
+        t = time.perf_counter()
+        ready = stubs(tokenizer.finish())
+        secs += time.perf_counter() - t
+        yield from ready
+        if self.telemetry:
+            self.telemetry.parse("list", secs, nbytes)
+
 
 class PersonHistoryParser:
     """
     Parses a person's page for 'SFC licenses' history:
     Headers: Organisation | Role | Activity | From | Until
     """
-    def __init__(self, http: HttpClient):
+    def __init__(self, http: HttpClient, cfg: Optional[Config] = None, telemetry: Optional[Telemetry] = None):
         self.http = http
+        self.cfg = cfg or Config()
+        self.telemetry = telemetry
 
-    @staticmethod
-    def _find_table_by_headers(soup: BeautifulSoup, must_have: List[str]) -> Optional[BeautifulSoup]:
-        for tbl in soup.find_all("table"):
-            head_tr = None
-            for tr in tbl.find_all("tr"):
-                if tr.find("th"):
-                    head_tr = tr
-                    break
-            if not head_tr:
-                continue
-            headers = [th.get_text(" ", strip=True).lower() for th in head_tr.find_all(["th", "td"])]
-            joined = " ".join(headers)
-            if all(tok in joined for tok in must_have):
-                return tbl
-        return None
-
-    def parse_history(self, person_url: str) -> List[Dict[str, str]]:
+    def parse_history(self, person_url: str) -> List[HistoryEntry]:
         r = self.http.get(person_url)
         if not r:
             return []
-        soup = BeautifulSoup(r.text, "html.parser")
-        tbl = self._find_table_by_headers(soup, must_have=["organisation", "role", "activity", "from", "until"])
-        if not tbl:
+        return self.parse_history_html(r.text)
+
+    async def aparse_history(self, person_url: str) -> List[HistoryEntry]:
+        """parse_history for an AsyncHttpClient."""
+        r = await self.http.get(person_url)
+        if not r:
             return []
+        return self.parse_history_html(r.text)
 
-        # identify header row
-        head_tr = None
-        for tr in tbl.find_all("tr"):
-            if tr.find("th"):
-                head_tr = tr
-                break
-        headers = [th.get_text(" ", strip=True).lower() for th in head_tr.find_all(["th", "td"])] if head_tr else []
+    def parse_history_html(self, html: str) -> List[HistoryEntry]:
+        with parse_timer(self.telemetry, "person", html):
+            return self._parse_history_html(html)
 
-        def get_idx(names: List[str]) -> Optional[int]:
-            for i, h in enumerate(headers):
-                if any(n in h for n in names):
-                    return i
-            return None
+    def _parse_history_html(self, html: str) -> List[HistoryEntry]:
+        doc = DocumentIndex(make_soup(html, self.cfg, tables_only=True))
+        tbl = doc.find_table(["organisation", "role", "activity", "from", "until"])
+        if not tbl:
+            return []
 
-        idx_org = get_idx(["organisation", "organization"])
-        idx_role = get_idx(["role"])
-        idx_act = get_idx(["activity"])
-        idx_from = get_idx(["from"])
-        idx_until = get_idx(["until"])
+        cols = tbl.columns(HISTORY_COLUMNS)
+        idx_org, idx_role, idx_act = cols["organisation"], cols["role"], cols["activity"]
+        idx_from, idx_until = cols["from"], cols["until"]
 
+        from_col, until_col = DateColumn(), DateColumn()
         out = []
-        for tr in tbl.find_all("tr")[1:]:
+        for tr in tbl.rows()[1:]:
             tds = tr.find_all("td")
             if not tds:
                 continue
             org = tds[idx_org].get_text(strip=True) if idx_org is not None and idx_org < len(tds) else ""
             role = tds[idx_role].get_text(strip=True) if idx_role is not None and idx_role < len(tds) else ""
             act = tds[idx_act].get_text(strip=True) if idx_act is not None and idx_act < len(tds) else ""
-            frm = DateTools.parse_date(tds[idx_from].get_text(strip=True)) if idx_from is not None and idx_from < len(tds) else ""
-            until = DateTools.parse_date(tds[idx_until].get_text(strip=True)) if idx_until is not None and idx_until < len(tds) else ""
-            out.append({
-                "organisation": org,
-                "role": role,
-                "activity": act,
-                "from": frm,
-                "until": until
-            })
+            frm = from_col.parse(tds[idx_from].get_text(strip=True)) if idx_from is not None and idx_from < len(tds) else ""
+            until = until_col.parse(tds[idx_until].get_text(strip=True)) if idx_until is not None and idx_until < len(tds) else ""
+            out.append(HistoryEntry(org, role, act, frm, until))
         return out
 
 
@@ -153,59 +383,59 @@ class FirmDetailParser:
     Headers: Name | (Age ...) | (⚥) | SFC ID | Role | From | Until
     Derives status from Until.
     """
-    def __init__(self, http: HttpClient, cfg: Config):
+    def __init__(self, http: HttpClient, cfg: Config, fetch_history: Optional[bool] = None,
+                 telemetry: Optional[Telemetry] = None):
         self.http = http
         self.cfg = cfg
-        self.person_parser = PersonHistoryParser(http)
+        self.telemetry = telemetry
+        self.person_parser = PersonHistoryParser(http, cfg, telemetry)
+        # None -> follow cfg.FETCH_LICENSEE_HISTORY; SFCPipeline passes False and runs PersonHistoryStage instead
+        self.fetch_history = cfg.FETCH_LICENSEE_HISTORY if fetch_history is None else fetch_history
 
-    @staticmethod
-    def _find_table_by_headers(soup: BeautifulSoup, must_have: List[str]) -> Optional[BeautifulSoup]:
-        for tbl in soup.find_all("table"):
-            head_tr = None
-            for tr in tbl.find_all("tr"):
-                if tr.find("th"):
-                    head_tr = tr
-                    break
-            if not head_tr:
-                continue
-            headers = [th.get_text(" ", strip=True).lower() for th in head_tr.find_all(["th", "td"])]
-            joined = " ".join(headers)
-            if all(tok in joined for tok in must_have):
-                return tbl
-        return None
-
-    def parse(self, firm_stub: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def parse(self, firm_stub: Dict[str, Any]) -> Optional[Firm]:
         r = self.http.get(firm_stub["firm_url"])
         if not r:
             return None
-        soup = BeautifulSoup(r.text, "html.parser")
+        rec = self.parse_html(firm_stub, r.text)
+        if self.fetch_history:
+            for lic in rec.licensees:
+                if lic.person_url:
+                    lic.history = self.person_parser.parse_history(lic.person_url)
+        return rec
+
+    async def aparse(self, firm_stub: Dict[str, Any]) -> Optional[Firm]:
+        """parse for an AsyncHttpClient; person histories of one firm are fetched concurrently."""
+        r = await self.http.get(firm_stub["firm_url"])
+        if not r:
+            return None
+        rec = self.parse_html(firm_stub, r.text)
+        if self.fetch_history:
+            lics = [lic for lic in rec.licensees if lic.person_url]
+            histories = await asyncio.gather(*(self.person_parser.aparse_history(lic.person_url) for lic in lics))
+            for lic, history in zip(lics, histories):
+                lic.history = history
+        return rec
+
+    def parse_html(self, firm_stub: Dict[str, Any], html: str) -> Firm:
+        """Build the firm record from an already fetched detail page (history left empty)."""
+        with parse_timer(self.telemetry, "firm", html, firm_stub["firm_url"]):
+            return self._parse_html(firm_stub, html)
+
+    def _parse_html(self, firm_stub: Dict[str, Any], html: str) -> Firm:
+        soup = make_soup(html, self.cfg, tables_only=True)
+        doc = DocumentIndex(soup, FIRM_LABELS)
 
         # Find licensees table by header names
-        lic_tbl = self._find_table_by_headers(soup, must_have=["name", "sfc id", "role", "from", "until"])
-        licensees: List[Dict[str, Any]] = []
+        lic_tbl = doc.find_table(["name", "sfc id", "role", "from", "until"])
+        licensees: List[Licensee] = []
 
         if lic_tbl:
-            # header names
-            head_tr = None
-            for tr in lic_tbl.find_all("tr"):
-                if tr.find("th"):
-                    head_tr = tr
-                    break
-            headers = [th.get_text(" ", strip=True).lower() for th in head_tr.find_all(["th", "td"])] if head_tr else []
-
-            def idx(names: List[str]) -> Optional[int]:
-                for i, h in enumerate(headers):
-                    if any(n in h for n in names):
-                        return i
-                return None
-
-            i_name = idx(["name"])
-            i_sfc = idx(["sfc id", "sfcid", "id"])
-            i_role = idx(["role"])
-            i_from = idx(["from"])
-            i_until = idx(["until"])
-
-            for tr in lic_tbl.find_all("tr")[1:]:
+            cols = lic_tbl.columns(LICENSEE_COLUMNS)
+            i_name, i_sfc, i_role = cols["name"], cols["sfc_id"], cols["role"]
+            i_from, i_until = cols["from"], cols["until"]
+
+            from_col, until_col = DateColumn(), DateColumn()
+            for tr in lic_tbl.rows()[1:]:
                 tds = tr.find_all("td")
                 if not tds or None in (i_name, i_role, i_from, i_until):
                     continue
@@ -221,43 +451,48 @@ class FirmDetailParser:
 
                 sfc_id = tds[i_sfc].get_text(strip=True) if (i_sfc is not None and i_sfc < len(tds)) else ""
                 role = tds[i_role].get_text(strip=True) if i_role < len(tds) else ""
-                start = DateTools.parse_date(tds[i_from].get_text(strip=True)) if i_from < len(tds) else ""
-                until = DateTools.parse_date(tds[i_until].get_text(strip=True)) if i_until < len(tds) else ""
+                start = from_col.parse(tds[i_from].get_text(strip=True)) if i_from < len(tds) else ""
+                until = until_col.parse(tds[i_until].get_text(strip=True)) if i_until < len(tds) else ""
                 status = "Active" if DateTools.is_active(until) else "Inactive"
 
-                history = []
-                if self.cfg.FETCH_LICENSEE_HISTORY and person_url:
-                    history = self.person_parser.parse_history(person_url)
-
-                licensees.append({
-                    "licensee_id": sfc_id,
-                    "name": name,
-                    "role": role,
-                    "status": status,
-                    "licence_start": start,
-                    "licence_end": until,
-                    "history": history,
-                    "person_url": person_url
-                })
+                licensees.append(Licensee(
+                    licensee_id=sfc_id,
+                    name=name,
+                    role=role,
+                    status=status,
+                    licence_start=start,
+                    licence_end=until,
+                    person_url=person_url
+                ))
 
         # Attempt to read firm-level Licence start/end labels on page; fallback to list-page values
-        def label_value(label_text: str) -> str:
-            node = soup.find(string=re.compile(fr"^{re.escape(label_text)}$", re.I))
-            if not node:
-                return ""
-            nxt = node.find_next()
-            return nxt.get_text(strip=True) if nxt else ""
+        label_doc = doc
+        if is_targeted(soup) and (labels_outside(doc.label_counts, html, FIRM_LABELS)
+                                  or not all(doc.label_next_in_table(label) for label in FIRM_LABELS)):
+            label_doc = DocumentIndex(make_soup(html, self.cfg), FIRM_LABELS)
+        label_value = label_doc.label_value
 
         firm_lic_start = DateTools.parse_date(label_value("Licence start")) or firm_stub.get("licence_start_list", "")
         firm_lic_end = DateTools.parse_date(label_value("Licence end")) or firm_stub.get("licence_end_list", "")
 
-        return {
-            "firm_id": "",
-            "firm_name": firm_stub["firm_name"],
-            "firm_url": firm_stub["firm_url"],
-            "licence_start": firm_lic_start,
-            "licence_end": firm_lic_end,
-            "last_updated": Config.RUN_DATE,
-            "current_licensees_count": len(licensees),
-            "licensees": licensees
-        }
\ No newline at end of file
+        return Firm(
+            firm_id="",
+            firm_name=firm_stub["firm_name"],
+            firm_url=firm_stub["firm_url"],
+            licence_start=firm_lic_start,
+            licence_end=firm_lic_end,
+            last_updated=self.cfg.RUN_DATE,
+            licensees=licensees,
+            current_licensees_count=len(licensees),
+            list_page=list_page_state(firm_stub)
+        )
+
+
+def parse_firm_page(cfg: Config, firm_stub: Dict[str, Any], html: str) -> Tuple[Firm, float]:
+    """
+    Process-pool entry point: FirmDetailParser.parse_html without an HTTP client.
+    Returns (record, parse seconds) so the parent process can record the timing.
+    """
+    t0 = time.perf_counter()
+    rec = FirmDetailParser(None, cfg, fetch_history=False).parse_html(firm_stub, html)
+    return rec, time.perf_counter() - t0
@@ -0,0 +1,247 @@
+import json
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from config import Config
+from .raw_store import RawWriter, read_raw
+from .schema import loads
+
+
+class WorkQueue:
+    """
+    File-based shard queue for one RUN_DATE, usable by processes on several hosts that share
+    QUEUE_DIR:
+      pending/<shard>.json            firm stubs waiting for a worker
+      claimed/<shard>.json.<worker>   taken by a worker (os.rename is the lock; mtime is its Heartbeat)
+      done/<shard>.json               finished
+      parts/<shard>.<worker>.ndjson   raw records of a shard as fetched by one worker (appended to by
+                                      every claim of that worker on the shard)
+      parts/carried.ndjson            records carried forward by an incremental plan
+      PLANNED                         written once every shard is queued
+    """
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.root = os.path.join(cfg.QUEUE_DIR, cfg.RUN_DATE)
+        self.dirs = {name: os.path.join(self.root, name) for name in ("pending", "claimed", "done", "parts")}
+        for d in self.dirs.values():
+            os.makedirs(d, exist_ok=True)
+        self.planned_marker = os.path.join(self.root, "PLANNED")
+
+    @property
+    def planned(self) -> bool:
+        return os.path.exists(self.planned_marker)
+
+    def _list(self, name: str) -> List[str]:
+        return sorted(n for n in os.listdir(self.dirs[name]) if not n.endswith(".tmp"))
+
+    def status(self) -> Dict[str, int]:
+        return {name: len(self._list(name)) for name in ("pending", "claimed", "done")}
+
+    def add(self, index: int, stubs: List[Dict[str, Any]]):
+        """Queue one shard; written under a temporary name so workers never see it half-written."""
+        name = f"shard-{index:05d}.json"
+        tmp = os.path.join(self.dirs["pending"], name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(stubs, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.dirs["pending"], name))
+
+    def mark_planned(self, shards: int, firms: int):
+        with open(self.planned_marker, "w", encoding="utf-8") as f:
+            json.dump({"shards": shards, "firms": firms}, f)
+
+    def claim(self, worker: str) -> Optional[Tuple[str, str]]:
+        """Take the first pending shard as (name, claimed path); None when nothing is pending."""
+        for name in self._list("pending"):
+            claimed = os.path.join(self.dirs["claimed"], f"{name}.{worker}")
+            try:
+                os.rename(os.path.join(self.dirs["pending"], name), claimed)
+            except FileNotFoundError:
+                continue  # another worker got it first
+            os.utime(claimed)
+            return name, claimed
+        return None
+
+    def load(self, claimed: str) -> List[Dict[str, Any]]:
+        with open(claimed, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def complete(self, name: str, claimed: str) -> bool:
+        """False if the claim was lost (lease expired and the shard was requeued) before finishing."""
+        try:
+            os.replace(claimed, os.path.join(self.dirs["done"], name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def requeue_stale(self, lease_seconds: float) -> int:
+        """Put shards whose worker has not been heard of for `lease_seconds` back into pending."""
+        now, n = time.time(), 0
+        for claimed in self._list("claimed"):
+            path = os.path.join(self.dirs["claimed"], claimed)
+            try:
+                if now - os.path.getmtime(path) < lease_seconds:
+                    continue
+                os.rename(path, os.path.join(self.dirs["pending"], claimed.split(".json.", 1)[0] + ".json"))
+            except FileNotFoundError:
+                continue  # finished or requeued meanwhile
+            print(f"[SHARD] Requeued stale {claimed}")
+            n += 1
+        return n
+
+    def part_path(self, name: str, worker: str) -> str:
+        return os.path.join(self.dirs["parts"], name.replace(".json", f".{worker}.ndjson"))
+
+    def fetched(self, name: str) -> Set[str]:
+        """Firm URLs already written for a shard by earlier (dead or expired) claims."""
+        prefix, urls = name.replace(".json", "."), set()
+        for part in self.parts():
+            if os.path.basename(part).startswith(prefix):
+                urls.update(rec.firm_url for rec in read_raw(part))
+        return urls
+
+    def parts(self) -> List[str]:
+        return [os.path.join(self.dirs["parts"], n) for n in self._list("parts") if n.endswith(".ndjson")]
+
+
+class Heartbeat:
+    """Renews the lease on a claimed shard (its mtime) every `interval` seconds from a background thread."""
+    def __init__(self, claimed: str, interval: float):
+        self.claimed = claimed
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._beat, name="shard-heartbeat", daemon=True)
+
+    def _beat(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                os.utime(self.claimed)
+            except FileNotFoundError:
+                return  # lease already lost: the shard was requeued
+
+    def __enter__(self) -> "Heartbeat":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+class ShardedRun:
+    """
+    Sharded execution of SFCPipeline for crawls larger than one process / connection pool:
+      plan   list page -> early filter / incremental split -> shards of SHARD_SIZE stubs
+      work   claim shards until the queue is drained; fetch + parse each into its own part file
+      merge  once every shard is done: parts -> RAW_FILE, then transform / validate / snapshot
+    Run `plan` once, `work` in any number of processes (any host sharing QUEUE_DIR), then `merge`.
+    Workers may start while the plan is still being written.
+    """
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.cfg: Config = pipeline.cfg
+        self.queue = WorkQueue(self.cfg)
+        self.worker = f"{socket.gethostname()}-{os.getpid()}"
+
+    def plan(self) -> int:
+        if self.queue.planned or any(self.queue.status().values()):
+            raise SystemExit(f"[SHARD] {self.queue.root} is already planned; delete it to plan {self.cfg.RUN_DATE} again")
+        print("[SHARD] Fetching list page ...")
+        t0 = time.perf_counter()
+        page = self.pipeline.fetch_list()
+        writer = RawWriter(self.cfg, os.path.join(self.queue.dirs["parts"], "carried.ndjson"), resume=False)
+        shards = firms = 0
+        batch: List[Dict[str, Any]] = []
+        try:
+            for stub in self.pipeline._list_firms(page, writer, t0):
+                batch.append(stub)
+                if len(batch) >= self.cfg.SHARD_SIZE:
+                    self.queue.add(shards, batch)
+                    shards, firms, batch = shards + 1, firms + len(batch), []
+            if batch:
+                self.queue.add(shards, batch)
+                shards, firms = shards + 1, firms + len(batch)
+        finally:
+            writer.close()
+        self.queue.mark_planned(shards, firms)
+        print(f"[SHARD] Planned {firms} firms in {shards} shards -> {self.queue.root}")
+        return shards
+
+    def work(self) -> int:
+        """
+        Process shards until none are pending and the plan is complete; returns shards done here.
+        Gives up when there is neither a pending shard nor a PLANNED marker for SHARD_PLAN_WAIT_MINUTES.
+        """
+        done = 0
+        lease = self.cfg.SHARD_LEASE_MINUTES * 60
+        idle_since = time.monotonic()
+        while True:
+            self.queue.requeue_stale(lease)
+            got = self.queue.claim(self.worker)
+            if got is None:
+                if self.queue.planned:
+                    break
+                if time.monotonic() - idle_since > self.cfg.SHARD_PLAN_WAIT_MINUTES * 60:
+                    raise SystemExit(f"[SHARD] {self.queue.root} has not been planned after {self.cfg.SHARD_PLAN_WAIT_MINUTES} "
+                                     f"minutes; did plan fail, or was it run with another --run-date?")
+                time.sleep(1.0)  # the coordinator is still writing shards
+                continue
+            name, claimed = got
+            stubs = self.queue.load(claimed)
+            # a shard requeued from a dead worker keeps what that worker finished; a shard this
+            # worker claimed before (its lease expired) continues its own part file
+            fetched = self.queue.fetched(name)
+            writer = RawWriter(self.cfg, self.queue.part_path(name, self.worker), resume=True)
+            try:
+                todo = [s for s in stubs if s["firm_url"] not in fetched]
+                print(f"[SHARD] {self.worker}: {name} ({len(todo)} of {len(stubs)} firms to fetch)")
+                # renewed while the worker is alive, however long a single fetch takes
+                with Heartbeat(claimed, lease / 3):
+                    self.pipeline.fetch(todo, writer.write)
+            finally:
+                writer.close()
+            if self.queue.complete(name, claimed):
+                done += 1
+            else:
+                print(f"[SHARD] {self.worker}: lease on {name} expired; another worker redoes it")
+            idle_since = time.monotonic()
+        print(f"[SHARD] {self.worker}: finished {done} shards; queue {self.queue.status()}")
+        return done
+
+    def merge(self) -> str:
+        """Concatenate every part (first record per firm wins) into RAW_FILE once all shards are done."""
+        status = self.queue.status()
+        if not self.queue.planned or status["pending"] or status["claimed"]:
+            raise SystemExit(f"[SHARD] Not ready to merge: planned={self.queue.planned} {status}")
+        seen = set()
+        with open(self.cfg.RAW_FILE, "wb") as out:
+            for part in self.queue.parts():
+                with open(part, "rb") as f:
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # torn tail of a worker that died mid-write; its shard was redone
+                        url = loads(line)["firm_url"]
+                        if url not in seen:
+                            seen.add(url)
+                            out.write(line)
+        print(f"[SHARD] Merged {len(seen)} firms from {len(self.queue.parts())} parts -> {self.cfg.RAW_FILE}")
+        return self.cfg.RAW_FILE
+
+
+def queued_run_date(cfg: Config) -> str:
+    """RUN_DATE of the newest queue in QUEUE_DIR, for `work` and `merge` started without --run-date."""
+    dates = sorted(d for d in os.listdir(cfg.QUEUE_DIR)
+                   if os.path.isdir(os.path.join(cfg.QUEUE_DIR, d))) if os.path.isdir(cfg.QUEUE_DIR) else []
+    if not dates:
+        raise SystemExit(f"[SHARD] No queue in {cfg.QUEUE_DIR}; run plan first, or pass --run-date")
+    return dates[-1]
+
+
+def work_process(cfg: Config):
+    """Entry point of one local worker process (spawned by `main.py work --processes N`)."""
+    from .orchestrator import SFCPipeline
+    pipeline = SFCPipeline(cfg)
+    with pipeline.telemetry.stage("work"):
+        ShardedRun(pipeline).work()
+    pipeline.telemetry.write_report(tag=f"worker-{os.getpid()}")
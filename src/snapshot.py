@@ -1,19 +1,45 @@
 from config import Config
-from typing import List, Dict, Any
+from typing import Iterable, List, Tuple
 import os
-import json
 from datetime import datetime, timedelta
+from .person_index import PersonIndex
+from .schema import Firm, FirmArrayWriter, load_firms
 
 
 class SnapshotStore:
     def __init__(self, cfg: Config):
         self.cfg = cfg
 
-    def write_snapshot(self, data: List[Dict[str, Any]]):
+    def write_snapshot(self, data: Iterable[Firm]) -> str:
+        return self.writer().write_all(data)
+
+    def writer(self) -> "SnapshotWriter":
         path = os.path.join(self.cfg.SNAPSHOT_DIR, f"{self.cfg.RUN_DATE}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        return path
+        return SnapshotWriter(self.cfg, FirmArrayWriter(path), path)
+
+    def dates(self) -> List[str]:
+        """Dates of the stored snapshots, oldest first."""
+        dates = []
+        for name in os.listdir(self.cfg.SNAPSHOT_DIR):
+            if not name.endswith(".json"):
+                continue
+            stem = name.replace(".json", "")
+            try:
+                datetime.strptime(stem, "%Y-%m-%d")
+            except Exception:
+                continue
+            dates.append(stem)
+        return sorted(dates)
+
+    def load(self, date: str) -> List[Firm]:
+        return load_firms(os.path.join(self.cfg.SNAPSHOT_DIR, f"{date}.json"))
+
+    def latest(self) -> Tuple[str, List[Firm]]:
+        """Most recent snapshot dated on or before RUN_DATE as (date, records); ("", []) if none."""
+        dates = [d for d in self.dates() if d <= self.cfg.RUN_DATE]
+        if not dates:
+            return "", []
+        return dates[-1], self.load(dates[-1])
 
     def prune(self):
         cutoff = datetime.now() - timedelta(days=self.cfg.SNAPSHOT_WINDOW_DAYS)
@@ -26,4 +52,59 @@ class SnapshotStore:
             except Exception:
                 continue
             if d < cutoff:
-                os.remove(os.path.join(self.cfg.SNAPSHOT_DIR, name))
\ No newline at end of file
+                os.remove(os.path.join(self.cfg.SNAPSHOT_DIR, name))
+
+
+class SnapshotWriter:
+    """
+    One run's snapshot written firm by firm: the store's own rows (`rows`: write/close/abort)
+    and the person index update, both committed by close(), which returns `path`. abort()
+    leaves the previous snapshot and index as they were; call it when close() raises, too.
+    Returned by the stores' writer().
+    """
+    def __init__(self, cfg: Config, rows, path: str):
+        self.cfg = cfg
+        self.rows = rows
+        self.path = path
+        self.index = PersonIndex(cfg)
+        self.index_run = self.index.begin(cfg.RUN_DATE)
+
+    def write(self, firm: Firm):
+        self.rows.write(firm)
+        self.index_run.write(firm)
+
+    def close(self) -> str:
+        self.rows.close()
+        self.index_run.close()
+        print(f"[INDEX] {self.index.count()} people -> {self.index.path}")
+        self.index.close()
+        return self.path
+
+    def abort(self):
+        try:
+            self.rows.abort()
+            self.index_run.abort()
+        finally:
+            self.index.close()
+
+    def write_all(self, data: Iterable[Firm]) -> str:
+        try:
+            for firm in data:
+                self.write(firm)
+            return self.close()
+        except BaseException:
+            self.abort()
+            raise
+
+
+def open_store(cfg: Config):
+    """The snapshot store selected by cfg.SNAPSHOT_BACKEND."""
+    if cfg.SNAPSHOT_BACKEND == "sqlite":
+        from .sqlite_store import SQLiteStore
+        return SQLiteStore(cfg)
+    if cfg.SNAPSHOT_BACKEND == "delta":
+        from .delta_store import DeltaStore
+        return DeltaStore(cfg)
+    if cfg.SNAPSHOT_BACKEND != "json":
+        raise ValueError(f"Unknown SNAPSHOT_BACKEND {cfg.SNAPSHOT_BACKEND!r}")
+    return SnapshotStore(cfg)
@@ -0,0 +1,319 @@
+import hashlib
+import json
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import Config
+from .schema import Firm, HistoryEntry, Licensee
+from .snapshot import SnapshotWriter
+
+# Every versioned table carries recorded_from/recorded_to: the run dates between which a row
+# was the current state (recorded_to NULL = still current). A run only closes rows that
+# changed or disappeared and inserts their new versions; unchanged rows are left alone.
+# Valid time is the licence_start/licence_end already in the data.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_date TEXT PRIMARY KEY,
+    firms INTEGER NOT NULL,
+    written_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS firm_versions (
+    firm_url TEXT NOT NULL,
+    firm_id TEXT, firm_name TEXT, licence_start TEXT, licence_end TEXT,
+    current_licensees_count INTEGER, list_page TEXT,
+    last_updated TEXT,            -- NULL: the date of the run being read (fetched by that run)
+    position INTEGER,             -- order within the run; not versioned
+    row_hash TEXT NOT NULL,
+    recorded_from TEXT NOT NULL,
+    recorded_to TEXT
+);
+CREATE TABLE IF NOT EXISTS licensee_versions (
+    firm_url TEXT NOT NULL,
+    lic_key TEXT NOT NULL,        -- SFC ID (else person URL, else name) + occurrence within the firm
+    sfc_id TEXT, name TEXT, role TEXT, status TEXT, licence_start TEXT, licence_end TEXT, person_url TEXT,
+    position INTEGER,
+    row_hash TEXT NOT NULL,
+    recorded_from TEXT NOT NULL,
+    recorded_to TEXT
+);
+CREATE TABLE IF NOT EXISTS history_versions (
+    person_url TEXT NOT NULL,
+    hist_key TEXT NOT NULL,       -- organisation|role|activity|from + occurrence
+    organisation TEXT, role TEXT, activity TEXT, date_from TEXT, date_until TEXT,
+    position INTEGER,
+    row_hash TEXT NOT NULL,
+    recorded_from TEXT NOT NULL,
+    recorded_to TEXT
+);
+CREATE INDEX IF NOT EXISTS firm_current ON firm_versions(firm_url) WHERE recorded_to IS NULL;
+CREATE INDEX IF NOT EXISTS firm_url_time ON firm_versions(firm_url, recorded_from);
+CREATE INDEX IF NOT EXISTS firm_closed ON firm_versions(recorded_to);
+CREATE INDEX IF NOT EXISTS lic_current ON licensee_versions(firm_url, lic_key) WHERE recorded_to IS NULL;
+CREATE INDEX IF NOT EXISTS lic_firm_time ON licensee_versions(firm_url, recorded_from);
+CREATE INDEX IF NOT EXISTS lic_sfc_id ON licensee_versions(sfc_id);
+CREATE INDEX IF NOT EXISTS lic_start ON licensee_versions(licence_start);
+CREATE INDEX IF NOT EXISTS lic_end ON licensee_versions(licence_end);
+CREATE INDEX IF NOT EXISTS lic_closed ON licensee_versions(recorded_to);
+CREATE INDEX IF NOT EXISTS hist_current ON history_versions(person_url, hist_key) WHERE recorded_to IS NULL;
+CREATE INDEX IF NOT EXISTS hist_person_time ON history_versions(person_url, recorded_from);
+CREATE INDEX IF NOT EXISTS hist_closed ON history_versions(recorded_to);
+"""
+
+# (table, identity columns, versioned value columns)
+TABLES = {
+    "firm": ("firm_versions", ("firm_url",),
+             ("firm_id", "firm_name", "licence_start", "licence_end", "current_licensees_count", "list_page",
+              "last_updated")),
+    "licensee": ("licensee_versions", ("firm_url", "lic_key"),
+                 ("sfc_id", "name", "role", "status", "licence_start", "licence_end", "person_url")),
+    "history": ("history_versions", ("person_url", "hist_key"),
+                ("organisation", "role", "activity", "date_from", "date_until")),
+}
+# columns that are refreshed on current rows without creating a new version
+UNVERSIONED = {"firm": ("position",), "licensee": ("position",), "history": ("position",)}
+
+
+def _row_hash(values: Tuple[Any, ...]) -> str:
+    return hashlib.blake2b(json.dumps(values, ensure_ascii=False).encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _keyed(base: str, seen: Dict[str, int]) -> str:
+    n = seen[base] = seen.get(base, -1) + 1
+    return f"{base}#{n}"
+
+
+class SQLiteStore:
+    """
+    Snapshot store on one SQLite file (SNAPSHOT_DB) with normalized, versioned firm / licensee /
+    person-history rows. Same interface as SnapshotStore (write_snapshot, latest, prune) plus
+    point-in-time and change queries. Runs must be written in date order; re-writing the latest
+    run date replaces that run.
+    """
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.conn = sqlite3.connect(cfg.SNAPSHOT_DB)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ---- writing -------------------------------------------------------------------------
+
+    @staticmethod
+    def _rows(pos: int, firm: Firm, persons_done: set, run_date: str) -> Dict[str, List[Tuple[Any, ...]]]:
+        """
+        Incoming rows of one firm per table as identity + values + unversioned columns + row_hash.
+        A last_updated equal to the run date is stored as NULL, so a firm fetched on every run
+        keeps one version instead of getting a new one per run.
+        """
+        rows: Dict[str, List[Tuple[Any, ...]]] = {"firm": [], "licensee": [], "history": []}
+        values = (firm.firm_id, firm.firm_name, firm.licence_start, firm.licence_end,
+                  firm.current_licensees_count, json.dumps(firm.list_page, ensure_ascii=False),
+                  None if firm.last_updated == run_date else firm.last_updated)
+        rows["firm"].append((firm.firm_url, *values, pos, _row_hash(values)))
+        seen: Dict[str, int] = {}
+        for lpos, lic in enumerate(firm.licensees):
+            key = _keyed(lic.licensee_id or lic.person_url or lic.name, seen)
+            values = (lic.licensee_id, lic.name, lic.role, lic.status, lic.licence_start,
+                      lic.licence_end, lic.person_url)
+            rows["licensee"].append((firm.firm_url, key, *values, lpos, _row_hash(values)))
+            # history belongs to the person: stored once per run, from the first row that carries it
+            if lic.person_url and lic.person_url not in persons_done:
+                persons_done.add(lic.person_url)
+                hseen: Dict[str, int] = {}
+                for hpos, h in enumerate(lic.history):
+                    values = (h.organisation, h.role, h.activity, h.from_, h.until)
+                    hkey = _keyed("|".join(values[:4]), hseen)
+                    rows["history"].append((lic.person_url, hkey, *values, hpos, _row_hash(values)))
+        return rows
+
+    @staticmethod
+    def _columns(kind: str) -> Tuple[str, ...]:
+        _, ident, values = TABLES[kind]
+        return ident + values + UNVERSIONED[kind] + ("row_hash",)
+
+    def _apply(self, kind: str, run_date: str):
+        """Merge temp.incoming_<kind> (filled by SQLiteRun) into its versioned table."""
+        table, ident, values = TABLES[kind]
+        extra = UNVERSIONED[kind]
+        cols = self._columns(kind)
+        incoming = f"temp.incoming_{kind}"
+        c = self.conn
+        c.execute(f"CREATE INDEX {incoming}_key ON incoming_{kind}({', '.join(ident)}, row_hash)")
+        match = " AND ".join(f"i.{k} = v.{k}" for k in ident)
+        # the UPDATEs use correlated subqueries, not UPDATE ... FROM (SQLite 3.33+) or aliases
+        current = " AND ".join(f"i.{k} = {table}.{k}" for k in ident)
+        # close current versions that changed or are gone
+        c.execute(f"""
+            UPDATE {table} SET recorded_to = ?
+            WHERE recorded_to IS NULL
+              AND NOT EXISTS (SELECT 1 FROM {incoming} i WHERE {current} AND i.row_hash = {table}.row_hash)
+        """, (run_date,))
+        # new versions for everything without a matching current row
+        c.execute(f"""
+            INSERT INTO {table} ({', '.join(cols)}, recorded_from, recorded_to)
+            SELECT {', '.join('i.' + k for k in cols)}, ?, NULL FROM {incoming} i
+            WHERE NOT EXISTS (SELECT 1 FROM {table} v WHERE {match} AND v.recorded_to IS NULL)
+        """, (run_date,))
+        # refresh unversioned columns of rows that stayed current (incoming holds one row per key)
+        c.execute(f"""
+            UPDATE {table} SET {', '.join(f'{k} = (SELECT i.{k} FROM {incoming} i WHERE {current})' for k in extra)}
+            WHERE recorded_to IS NULL AND EXISTS (SELECT 1 FROM {incoming} i WHERE {current})
+        """)
+
+    def _check_order(self, run_date: str) -> Optional[str]:
+        """The latest stored run date; ValueError if `run_date` is older."""
+        (last,) = self.conn.execute("SELECT MAX(run_date) FROM runs").fetchone()
+        if last and run_date < last:
+            raise ValueError(f"SQLiteStore: run {run_date} is older than the latest stored run {last}")
+        return last
+
+    def write_snapshot(self, data: Iterable[Firm]) -> str:
+        return self.writer().write_all(data)
+
+    def writer(self) -> SnapshotWriter:
+        return SnapshotWriter(self.cfg, SQLiteRun(self), self.cfg.SNAPSHOT_DB)
+
+    def prune(self):
+        """Drop versions superseded before the retention window, and the runs that fell out of it."""
+        cutoff = (datetime.now() - timedelta(days=self.cfg.SNAPSHOT_WINDOW_DAYS)).strftime("%Y-%m-%d")
+        with self.conn:
+            for table, _, _ in TABLES.values():
+                self.conn.execute(f"DELETE FROM {table} WHERE recorded_to < ?", (cutoff,))
+            self.conn.execute("DELETE FROM runs WHERE run_date < ?", (cutoff,))
+
+    # ---- reading -------------------------------------------------------------------------
+
+    @staticmethod
+    def _as_of(table: str) -> str:
+        return f"SELECT * FROM {table} WHERE recorded_from <= :d AND (recorded_to IS NULL OR recorded_to > :d)"
+
+    def as_of(self, date: str) -> List[Firm]:
+        """
+        Records as stored by the latest run on or before `date`. Licensee/firm order is the one of
+        the most recent run that still had the row (positions are not versioned).
+        """
+        c = self.conn
+        (run,) = c.execute("SELECT MAX(run_date) FROM runs WHERE run_date <= ?", (date,)).fetchone()
+        c.row_factory = sqlite3.Row
+        try:
+            histories: Dict[str, List[HistoryEntry]] = defaultdict(list)
+            for r in c.execute(self._as_of("history_versions") + " ORDER BY person_url, position", {"d": date}):
+                histories[r["person_url"]].append(
+                    HistoryEntry(r["organisation"], r["role"], r["activity"], r["date_from"], r["date_until"]))
+            licensees: Dict[str, List[Licensee]] = defaultdict(list)
+            for r in c.execute(self._as_of("licensee_versions") + " ORDER BY firm_url, position", {"d": date}):
+                licensees[r["firm_url"]].append(Licensee(
+                    r["sfc_id"], r["name"], r["role"], r["status"], r["licence_start"], r["licence_end"],
+                    histories.get(r["person_url"], []) if r["person_url"] else [], r["person_url"]))
+            return [
+                Firm(r["firm_id"], r["firm_name"], r["firm_url"], r["licence_start"], r["licence_end"],
+                     r["last_updated"] or run, licensees.get(r["firm_url"], []), r["current_licensees_count"],
+                     json.loads(r["list_page"]))
+                for r in c.execute(self._as_of("firm_versions") + " ORDER BY position", {"d": date})
+            ]
+        finally:
+            c.row_factory = None
+
+    def dates(self) -> List[str]:
+        """Dates of the stored runs, oldest first."""
+        return [d for (d,) in self.conn.execute("SELECT run_date FROM runs ORDER BY run_date")]
+
+    def load(self, date: str) -> List[Firm]:
+        return self.as_of(date)
+
+    def latest(self) -> Tuple[str, List[Firm]]:
+        """Most recent run dated on or before RUN_DATE as (date, records); ("", []) if none."""
+        (date,) = self.conn.execute("SELECT MAX(run_date) FROM runs WHERE run_date <= ?",
+                                    (self.cfg.RUN_DATE,)).fetchone()
+        return (date, self.as_of(date)) if date else ("", [])
+
+    def licensee_timeline(self, sfc_id: str) -> List[Dict[str, Any]]:
+        """Every stored version of a licensee across firms: when each role/licence was first and last recorded."""
+        self.conn.row_factory = sqlite3.Row
+        try:
+            return [dict(r) for r in self.conn.execute("""
+                SELECT l.firm_url,
+                       (SELECT f.firm_name FROM firm_versions f WHERE f.firm_url = l.firm_url
+                        ORDER BY f.recorded_from DESC LIMIT 1) AS firm_name,
+                       l.name, l.role, l.status, l.licence_start, l.licence_end, l.recorded_from, l.recorded_to
+                FROM licensee_versions l
+                WHERE l.sfc_id = ? ORDER BY l.recorded_from, l.firm_url
+            """, (sfc_id,))]
+        finally:
+            self.conn.row_factory = None
+
+    def changes(self, since: str, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Licensee rows that appeared ("added") or were superseded ("removed") in runs after `since`, up to `until`."""
+        until = until or "9999-12-31"
+        self.conn.row_factory = sqlite3.Row
+        try:
+            return [dict(r) for r in self.conn.execute("""
+                SELECT 'added' AS change, recorded_from AS run_date, firm_url, sfc_id, name, role, status,
+                       licence_start, licence_end FROM licensee_versions
+                WHERE recorded_from > :since AND recorded_from <= :until
+                UNION ALL
+                SELECT 'removed', recorded_to, firm_url, sfc_id, name, role, status,
+                       licence_start, licence_end FROM licensee_versions
+                WHERE recorded_to > :since AND recorded_to <= :until
+                ORDER BY run_date, firm_url, sfc_id, change
+            """, {"since": since, "until": until})]
+        finally:
+            self.conn.row_factory = None
+
+
+class SQLiteRun:
+    """
+    One run written into a SQLiteStore firm by firm: rows are staged in temp tables as they
+    arrive and merged into the versioned tables by close(), in one transaction. A firm URL
+    written twice keeps only its last record, so each key has one incoming row.
+    """
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+        self.run_date = store.cfg.RUN_DATE
+        store._check_order(self.run_date)  # fail before the records are produced, not after
+        self.firms = 0
+        self.urls = set()
+        self.persons_done = set()
+        self.inserts = {}
+        for kind in TABLES:
+            cols = store._columns(kind)
+            store.conn.execute(f"DROP TABLE IF EXISTS temp.incoming_{kind}")
+            store.conn.execute(f"CREATE TEMP TABLE incoming_{kind} ({', '.join(cols)})")
+            self.inserts[kind] = f"INSERT INTO temp.incoming_{kind} VALUES ({', '.join('?' * len(cols))})"
+
+    def write(self, firm: Firm):
+        if firm.firm_url in self.urls:
+            for kind in ("firm", "licensee"):
+                self.store.conn.execute(f"DELETE FROM temp.incoming_{kind} WHERE firm_url = ?", (firm.firm_url,))
+        self.urls.add(firm.firm_url)
+        for kind, rows in self.store._rows(self.firms, firm, self.persons_done, self.run_date).items():
+            self.store.conn.executemany(self.inserts[kind], rows)
+        self.firms += 1
+
+    def close(self):
+        conn, run_date = self.store.conn, self.run_date
+        try:
+            with conn:  # one transaction per run
+                if self.store._check_order(run_date) == run_date:
+                    # re-run of the latest date: undo its previous write first
+                    for table, _, _ in TABLES.values():
+                        conn.execute(f"DELETE FROM {table} WHERE recorded_from = ?", (run_date,))
+                        conn.execute(f"UPDATE {table} SET recorded_to = NULL WHERE recorded_to = ?", (run_date,))
+                for kind in TABLES:
+                    self.store._apply(kind, run_date)
+                conn.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?)",
+                             (run_date, len(self.urls), datetime.now().isoformat(timespec="seconds")))
+        finally:
+            self._drop()
+
+    def abort(self):
+        self.store.conn.rollback()
+        self._drop()
+
+    def _drop(self):
+        for kind in TABLES:
+            self.store.conn.execute(f"DROP TABLE IF EXISTS temp.incoming_{kind}")
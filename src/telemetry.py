@@ -0,0 +1,242 @@
+import cProfile
+import csv
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+from config import Config
+
+EVENT_COLUMNS = ["event", "t", "name", "status", "seconds", "bytes", "retries", "cache"]
+# Python 3.12+ allows one active cProfile.Profile per process (sys.monitoring), so there
+# "cprofile" covers the main thread only and the sampler is the way to see worker threads
+CPROFILE_THREADS = sys.version_info < (3, 12)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100); 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def _cpu_seconds() -> float:
+    # this process (all threads) plus reaped children, i.e. parse-pool workers once shut down
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class StackSampler:
+    """Samples every thread's Python stack each `interval` seconds; counts collapsed stacks."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str):
+        """Collapsed-stack text ("frame;frame;frame count"), readable by flamegraph.pl / speedscope."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+class Telemetry:
+    """
+    Run instrumentation: wall/CPU time per pipeline stage, one event per HTTP request
+    (latency, bytes, status, retries, cache outcome) and per parsed page. `write_report`
+    exports a JSON summary (RUN_REPORT_FILE) and the raw events as CSV (TELEMETRY_FILE).
+    cfg.PROFILER="cprofile" or "sampler" additionally profiles whatever runs inside `profiling()`.
+    Thread-safe; with cfg.TELEMETRY off every recording call is a no-op.
+    """
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.enabled = cfg.TELEMETRY
+        self.lock = threading.Lock()
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self.profile_path = ""
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.stages[name] = {
+                    "wall_s": round(time.perf_counter() - wall, 4),
+                    "cpu_s": round(_cpu_seconds() - cpu, 4),
+                }
+                print(f"[TIMING] {name}: {self.stages[name]['wall_s']:.2f}s wall, {self.stages[name]['cpu_s']:.2f}s CPU")
+
+    def set(self, section: str, data: Dict[str, Any]):
+        """Attach a component's own summary (e.g. the HTTP retry policy) to the report."""
+        if self.enabled:
+            self.sections[section] = data
+
+    def _event(self, **fields):
+        if not self.enabled:
+            return
+        fields["t"] = round(time.perf_counter() - self.t0, 4)
+        with self.lock:
+            self.events.append(fields)
+
+    def request(self, url: str, status: int, seconds: float, nbytes: int, retries: int, cache: str = ""):
+        """One HttpClient/AsyncHttpClient.get call; status 0 = no response, cache in {"", hit, revalidated}."""
+        self._event(event="request", name=url, status=status, seconds=round(seconds, 5),
+                    bytes=nbytes, retries=retries, cache=cache)
+
+    def parse(self, kind: str, seconds: float, nbytes: int, name: str = ""):
+        self._event(event=f"parse_{kind}", name=name, status="", seconds=round(seconds, 5),
+                    bytes=nbytes, retries="", cache="")
+
+    @contextmanager
+    def parse_timer(self, kind: str, html: str, name: str = "") -> Iterator[None]:
+        t = time.perf_counter()
+        yield
+        self.parse(kind, time.perf_counter() - t, len(html), name)
+
+    @contextmanager
+    def profiling(self) -> Iterator[None]:
+        """
+        Profile the block with cfg.PROFILER: "cprofile" (main thread, plus threads started inside
+        before Python 3.12) or "sampler" (all threads).
+        """
+        mode = self.cfg.PROFILER
+        if mode == "cprofile":
+            main = cProfile.Profile()
+            threads: List[cProfile.Profile] = []
+            if not CPROFILE_THREADS:
+                print('[PROFILE] Python 3.12+ runs one cProfile at a time: main thread only; '
+                      'PROFILER="sampler" covers fetch/parse threads')
+
+            def start_thread_profile(frame, event, arg):
+                # runs once as the first profile event of each new thread; hands over to cProfile
+                sys.setprofile(None)
+                p = cProfile.Profile()
+                with self.lock:
+                    threads.append(p)
+                p.enable()
+
+            if CPROFILE_THREADS:
+                threading.setprofile(start_thread_profile)
+            main.enable()
+            try:
+                yield
+            finally:
+                main.disable()
+                if CPROFILE_THREADS:
+                    threading.setprofile(None)
+                stats = pstats.Stats(main)
+                for p in threads:
+                    stats.add(p)
+                self.profile_path = self.cfg.PROFILE_FILE + ".prof"
+                stats.dump_stats(self.profile_path)
+                with open(self.cfg.PROFILE_FILE + ".txt", "w", encoding="utf-8") as f:
+                    pstats.Stats(self.profile_path, stream=f).sort_stats("cumulative").print_stats(60)
+                print(f"[PROFILE] cProfile -> {self.profile_path}")
+        elif mode == "sampler":
+            sampler = StackSampler(self.cfg.PROFILE_SAMPLE_MS / 1000.0)
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                self.profile_path = self.cfg.PROFILE_FILE + ".collapsed.txt"
+                sampler.dump(self.profile_path)
+                print(f"[PROFILE] Stack samples -> {self.profile_path}")
+        else:
+            yield
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            events = list(self.events)
+        requests = [e for e in events if e["event"] == "request"]
+        network = [e["seconds"] for e in requests if e["cache"] != "hit"]
+        parses: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for e in events:
+            if e["event"].startswith("parse_"):
+                parses[e["event"][len("parse_"):]].append(e)
+        return {
+            "run_date": self.cfg.RUN_DATE,
+            "wall_s": round(time.perf_counter() - self.t0, 4),
+            "stages": self.stages,
+            "requests": {
+                "count": len(requests),
+                "failed": sum(1 for e in requests if e["status"] == 0 or e["status"] >= 400),
+                "by_status": {str(k): v for k, v in sorted(Counter(e["status"] for e in requests).items())},
+                "cache": {k or "miss": v for k, v in sorted(Counter(e["cache"] for e in requests).items())},
+                "bytes": sum(e["bytes"] for e in requests),
+                "retries": sum(e["retries"] for e in requests),
+                "network_seconds": round(sum(network), 4),
+                "latency_ms": {q: round(percentile(network, p) * 1000, 2)
+                               for q, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+            },
+            "parse": {
+                kind: {
+                    "pages": len(rows),
+                    "bytes": sum(e["bytes"] for e in rows),
+                    "seconds": round(sum(e["seconds"] for e in rows), 4),
+                    "p50_ms": round(percentile([e["seconds"] for e in rows], 50) * 1000, 3),
+                    "p99_ms": round(percentile([e["seconds"] for e in rows], 99) * 1000, 3),
+                }
+                for kind, rows in sorted(parses.items())
+            },
+            **self.sections,
+            "profile": self.profile_path,
+        }
+
+    def write_report(self, tag: str = "") -> Optional[Dict[str, Any]]:
+        """`tag` goes into the file names (run_report_<date>.<tag>.json), e.g. one report per shard worker."""
+        if not self.enabled:
+            return None
+        report = self.summary()
+        report_file, events_file = self.cfg.RUN_REPORT_FILE, self.cfg.TELEMETRY_FILE
+        if tag:
+            report_file = report_file.replace(".json", f".{tag}.json")
+            events_file = events_file.replace(".csv", f".{tag}.csv")
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        with open(events_file, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=EVENT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.events)
+        req = report["requests"]
+        print(f"[TELEMETRY] {req['count']} requests ({req['failed']} failed, {req['retries']} retries, "
+              f"p50 {req['latency_ms']['p50']}ms, p99 {req['latency_ms']['p99']}ms) -> {report_file}")
+        return report
+
+
+def parse_timer(telemetry: Optional[Telemetry], kind: str, html: str, name: str = ""):
+    """telemetry.parse_timer, or a no-op context when there is no Telemetry."""
+    return telemetry.parse_timer(kind, html, name) if telemetry else nullcontext()
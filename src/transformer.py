@@ -1,34 +1,70 @@
 from config import Config
-from typing import List, Any, Dict
-from .utils import DateTools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from .dates import DateColumn, parse_dates
+from .schema import Firm, as_firm
 
 class Transformer:
     """Normalize dates; standardize role/status casing; ensure schema consistency."""
     @staticmethod
-    def normalize(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _parse_column(rows: List[Any], key: str):
+        # one batched parse per date column instead of one parse_date call per cell
+        for row, value in zip(rows, parse_dates(getattr(row, key) for row in rows)):
+            setattr(row, key, value)
+
+    @staticmethod
+    def _coerce(firm: Firm) -> Firm:
+        """Everything but the date columns, in place."""
+        firm.firm_id = str(firm.firm_id or "")
+        firm.firm_name = str(firm.firm_name or "").strip()
+        firm.firm_url = str(firm.firm_url or "").strip()
+        for l in firm.licensees:
+            l.licensee_id = str(l.licensee_id or "")
+            l.name = str(l.name or "").strip()
+            l.role = str(l.role or "").strip().title()
+            l.status = str(l.status or "").strip().title()
+            l.history = l.history or []
+            l.person_url = str(l.person_url or "")
+        firm.current_licensees_count = int(firm.current_licensees_count or 0)
+        firm.list_page = firm.list_page or {}
+        return firm
+
+    @staticmethod
+    def normalize(records: Iterable[Union[Firm, Dict[str, Any]]], run_date: Optional[str] = None) -> List[Firm]:
+        """
+        Normalizes Firm records in place (dicts are converted once) and returns them. A missing
+        last_updated becomes `run_date` (the run's cfg.RUN_DATE; today's date if not given).
+        """
+        run_date = run_date or Config.RUN_DATE
         out = []
-        for r in records:
-            firm = {
-                "firm_id": str(r.get("firm_id", "") or ""),
-                "firm_name": str(r.get("firm_name", "") or "").strip(),
-                "firm_url": str(r.get("firm_url", "") or "").strip(),
-                "licence_start": DateTools.parse_date(r.get("licence_start", "")),
-                "licence_end": DateTools.parse_date(r.get("licence_end", "")),
-                "last_updated": DateTools.parse_date(r.get("last_updated", "")) or Config.RUN_DATE,
-                "licensees": []
-            }
-            lics = r.get("licensees", []) or []
-            for l in lics:
-                firm["licensees"].append({
-                    "licensee_id": str(l.get("licensee_id", "") or ""),
-                    "name": str(l.get("name", "") or "").strip(),
-                    "role": str(l.get("role", "") or "").strip().title(),
-                    "status": str(l.get("status", "") or "").strip().title(),
-                    "licence_start": DateTools.parse_date(l.get("licence_start", "")),
-                    "licence_end": DateTools.parse_date(l.get("licence_end", "")),
-                    "history": l.get("history", []) or [],
-                    "person_url": str(l.get("person_url", "") or "")
-                })
-            firm["current_licensees_count"] = int(r.get("current_licensees_count", len(firm["licensees"])) or 0)
+        licensees = []
+        for firm in map(as_firm, records):
+            Transformer._coerce(firm)
+            licensees.extend(firm.licensees)
             out.append(firm)
-        return out
\ No newline at end of file
+
+        for key in ("licence_start", "licence_end", "last_updated"):
+            Transformer._parse_column(out, key)
+        for key in ("licence_start", "licence_end"):
+            Transformer._parse_column(licensees, key)
+        for firm in out:
+            firm.last_updated = firm.last_updated or run_date
+        return out
+
+    @staticmethod
+    def iter_normalize(records: Iterable[Union[Firm, Dict[str, Any]]], run_date: Optional[str] = None) -> Iterator[Firm]:
+        """
+        Same result as `normalize`, one firm at a time: dates go through a DateColumn per column
+        instead of the batch parser, so nothing but the current firm is held.
+        """
+        run_date = run_date or Config.RUN_DATE
+        firm_cols = {key: DateColumn() for key in ("licence_start", "licence_end", "last_updated")}
+        lic_cols = {key: DateColumn() for key in ("licence_start", "licence_end")}
+        for firm in map(as_firm, records):
+            Transformer._coerce(firm)
+            for key, col in firm_cols.items():
+                setattr(firm, key, col.parse(getattr(firm, key)))
+            for l in firm.licensees:
+                for key, col in lic_cols.items():
+                    setattr(l, key, col.parse(getattr(l, key)))
+            firm.last_updated = firm.last_updated or run_date
+            yield firm
@@ -1,62 +1,183 @@
-import re
+import codecs
 import time
-from typing import  Optional
+from typing import Iterator, Optional, Tuple, TYPE_CHECKING
 from datetime import datetime
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import urllib3
 from config import Config
+from .dates import parse_date
+from .retry import RETRYABLE_STATUS, ConcurrencyGate, RetryPolicy
+
+if TYPE_CHECKING:
+    from .http_cache import ResponseCache
+    from .telemetry import Telemetry
+
+
+class FetchedResponse:
+    """Minimal response object for bodies that did not come from a requests.Session."""
+    def __init__(self, url: str, status_code: int, text: str, headers: Optional[dict] = None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
 
 
 class HttpClient:
-    def __init__(self, cfg: Config):
+    def __init__(self, cfg: Config, cache: Optional["ResponseCache"] = None,
+                 telemetry: Optional["Telemetry"] = None):
         self.cfg = cfg
+        self.cache = cache
+        self.telemetry = telemetry
+        self.policy = RetryPolicy(cfg, cfg.CONCURRENCY_MAX)
+        self.gate = ConcurrencyGate(self.policy.limit)
         self.session = self._make_session()
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
     def _make_session(self) -> requests.Session:
         s = requests.Session()
-        retry = Retry(
-            total=self.cfg.MAX_RETRIES,
-            backoff_factor=1.0,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retry, pool_connections=100, pool_maxsize=100)
+        # no urllib3-level retries: every retry goes through self.policy
+        adapter = HTTPAdapter(max_retries=0, pool_connections=100, pool_maxsize=100)
         s.mount("https://", adapter)
         s.mount("http://", adapter)
         return s
 
-    def get(self, url: str) -> Optional[requests.Response]:
-        for attempt in range(self.cfg.MAX_RETRIES):
+    def _record(self, url: str, t0: float, status: int, nbytes: int, retries: int, cache: str = ""):
+        if self.telemetry:
+            self.telemetry.request(url, status, time.perf_counter() - t0, nbytes, retries, cache)
+
+    def _send(self, url: str, headers: dict, stream: bool = False) -> Tuple[Optional[requests.Response], Optional[Exception]]:
+        """One attempt inside the concurrency gate; feeds latency/overload to the AIMD limit."""
+        with self.gate:
+            t = time.perf_counter()
             try:
-                r = self.session.get(url, timeout=self.cfg.REQ_TIMEOUT, verify=self.cfg.VERIFY_SSL)
-                r.raise_for_status()
+                r = self.session.get(url, headers=headers, timeout=self.cfg.REQ_TIMEOUT, verify=self.cfg.VERIFY_SSL,
+                                     stream=stream)
+            except requests.RequestException as e:
+                r, err = None, e
+            else:
+                err = None
+            status = r.status_code if r is not None else 0
+            self.policy.limit.observe(time.perf_counter() - t, status in RETRYABLE_STATUS)
+        return r, err
+
+    def get(self, url: str) -> Optional[requests.Response]:
+        t0 = time.perf_counter()
+        meta = self.cache.lookup(url) if self.cache else None
+        if self.cache and (self.cache.replay or (meta and self.cache.is_fresh(meta))):
+            resp = self.cache.response(meta) if meta else None
+            if resp or self.cache.replay:
+                self._record(url, t0, resp.status_code if resp else 0, 0, 0, "hit")
+                return resp
+        headers = self.cache.conditional_headers(meta) if self.cache else {}
+
+        self.policy.budget.request()
+        attempts = 0
+        while True:
+            r, err = self._send(url, headers)
+            status = r.status_code if r is not None else 0
+            if status == 304 and meta:
+                resp = self.cache.response(meta, revalidated=True)
+                if resp:
+                    self._record(url, t0, 304, 0, attempts, "revalidated")
+                    return resp
+                headers, meta = {}, None  # cached body is gone: ask again unconditionally
+                continue
+            if r is not None and status < 400:
+                r.encoding = _encoding(r)
+                if self.cache:
+                    self.cache.store(url, r.text, r.headers)
+                self._record(url, t0, status, len(r.content), attempts)
                 return r
-            except Exception as e:
-                if attempt == self.cfg.MAX_RETRIES - 1:
-                    print(f"[HTTP ERR] {url}: {e}")
-                    return None
-                time.sleep(self.cfg.BACKOFF_SECONDS * (attempt + 1))
+            attempts += 1
+            if not self.policy.can_retry(attempts, status):
+                print(f"[HTTP ERR] {url}: {err or f'HTTP {status}'}")
+                self._record(url, t0, status, 0, attempts - 1)
+                return None
+            time.sleep(self.policy.backoff(attempts, r.headers.get("Retry-After") if r is not None else None))
+
+    def stream(self, url: str, chunk_size: int = 64 * 1024) -> Optional[Iterator[str]]:
+        """
+        Like get(), but returns the body as an iterator of decoded text chunks as they arrive
+        (None if the request failed). Retries happen only before the body starts; cached and
+        revalidated bodies are replayed in chunks. With a cache the chunks are also kept and
+        the full body is stored once the iterator is exhausted.
+        """
+        t0 = time.perf_counter()
+        meta = self.cache.lookup(url) if self.cache else None
+        if self.cache and (self.cache.replay or (meta and self.cache.is_fresh(meta))):
+            resp = self.cache.response(meta) if meta else None
+            if resp or self.cache.replay:
+                self._record(url, t0, resp.status_code if resp else 0, 0, 0, "hit")
+                return _chunks(resp.text, chunk_size) if resp else None
+        headers = self.cache.conditional_headers(meta) if self.cache else {}
+
+        self.policy.budget.request()
+        attempts = 0
+        while True:
+            r, err = self._send(url, headers, stream=True)
+            status = r.status_code if r is not None else 0
+            if status == 304 and meta:
+                r.close()
+                resp = self.cache.response(meta, revalidated=True)
+                if resp:
+                    self._record(url, t0, 304, 0, attempts, "revalidated")
+                    return _chunks(resp.text, chunk_size)
+                headers, meta = {}, None
+                continue
+            if r is not None and status < 400:
+                return self._body(url, r, t0, attempts, chunk_size)
+            if r is not None:
+                r.close()
+            attempts += 1
+            if not self.policy.can_retry(attempts, status):
+                print(f"[HTTP ERR] {url}: {err or f'HTTP {status}'}")
+                self._record(url, t0, status, 0, attempts - 1)
+                return None
+            time.sleep(self.policy.backoff(attempts, r.headers.get("Retry-After") if r is not None else None))
+
+    def _body(self, url: str, r: requests.Response, t0: float, attempts: int, chunk_size: int) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder(_encoding(r))(errors="replace")
+        kept = [] if self.cache else None
+        nbytes = 0
+        try:
+            for data in r.iter_content(chunk_size):
+                nbytes += len(data)
+                chunk = decoder.decode(data)
+                if kept is not None:
+                    kept.append(chunk)
+                yield chunk
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                if kept is not None:
+                    kept.append(tail)
+                yield tail
+        except requests.RequestException as e:
+            print(f"[HTTP ERR] {url}: body interrupted: {e!r}")
+            raise
+        finally:
+            r.close()
+            self._record(url, t0, r.status_code, nbytes, attempts)
+        if kept is not None:
+            self.cache.store(url, "".join(kept), r.headers)
+
+
+def _encoding(r: requests.Response) -> str:
+    # requests assumes ISO-8859-1 for text/* without a charset (RFC 2616); the site's pages are utf-8
+    declared = "charset=" in r.headers.get("Content-Type", "").lower()
+    return r.encoding if declared and r.encoding else "utf-8"
+
+
+def _chunks(text: str, size: int) -> Iterator[str]:
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
 
 
 class DateTools:
     @staticmethod
     def parse_date(s: str) -> str:
-        s = (s or "").strip()
-        if not s:
-            return ""
-        # Try common formats observed on Webb-site
-        for fmt in ("%Y-%m-%d", "%d-%b-%Y", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y"):
-            try:
-                return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
-            except ValueError:
-                continue
-        m = re.search(r"\d{4}-\d{2}-\d{2}", s)
-        if m:
-            return m.group(0)
-        return ""
+        # Memoized; see src/dates.py for per-column (DateColumn) and batch (parse_dates) variants
+        return parse_date(s)
 
     @staticmethod
     def is_active(until_yyyy_mm_dd: str) -> bool:
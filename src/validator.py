@@ -1,34 +1,176 @@
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Tuple, Union
+import numpy as np
 import pandas as pd
+from .schema import Firm
+
+Record = Union[Firm, Dict[str, Any]]
 
 class Validator:
-    """Simple validation + metrics collection."""
+    """
+    Validation + metrics over two flat frames built once per run (see `flatten`):
+    one row per firm and one row per licensee, checked with vectorized masks.
+    """
     REQUIRED_FIRM_FIELDS = ["firm_name", "firm_url", "last_updated", "licensees"]
     REQUIRED_LICENSEE_FIELDS = ["name", "role", "licence_start"]  # minimal set
+    FIRM_COLUMNS = ["firm_name", "firm_url", "last_updated", "licensees", "licence_start", "licence_end"]
+    LICENSEE_COLUMNS = ["name", "role", "status", "licence_start", "licence_end"]
+
+    @staticmethod
+    def _objects(values: List[Any]) -> pd.Series:
+        # 1-D object column even when the values are lists (np.array would nest them)
+        return pd.Series(values, dtype=object)
+
+    @staticmethod
+    def _column(rows: List[Any], f: str) -> List[Any]:
+        # Firm/Licensee records, or plain dicts (absent keys -> None)
+        if rows and isinstance(rows[0], dict):
+            return [r.get(f) for r in rows]
+        return [getattr(r, f, None) for r in rows]
+
+    @classmethod
+    def flatten(cls, records: Iterable[Record]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(firms, licensees); absent keys become None, licensees carry their firm `row` and `index`."""
+        records = records if isinstance(records, list) else list(records)
+        firms = pd.DataFrame({f: cls._objects(cls._column(records, f)) for f in cls.FIRM_COLUMNS},
+                             columns=cls.FIRM_COLUMNS)
+        owners = [(i, lst) for i, lst in enumerate(cls._column(records, "licensees")) if isinstance(lst, list)]
+        flat = [lic for _, lst in owners for lic in lst]
+        sizes = [len(lst) for _, lst in owners]
+        lics = pd.DataFrame({
+            "row": np.repeat(np.array([i for i, _ in owners], dtype=int), sizes),
+            "index": np.concatenate([np.arange(n) for n in sizes]) if sizes else np.array([], dtype=int),
+            **{f: cls._objects(cls._column(flat, f)) for f in cls.LICENSEE_COLUMNS},
+        }, columns=["row", "index"] + cls.LICENSEE_COLUMNS)
+        return firms, lics
+
+    @staticmethod
+    def _missing(col: pd.Series) -> np.ndarray:
+        # same test as `value in (None, "")`: identity/equality only, so NaN and [] are not missing
+        values = col.to_numpy(dtype=object)
+        return (values == None) | (values == "")  # noqa: E711 (elementwise)
+
+    @classmethod
+    def validate_frames(cls, firms: pd.DataFrame, lics: pd.DataFrame) -> pd.DataFrame:
+        parts = []
+        for k, f in enumerate(cls.REQUIRED_FIRM_FIELDS):
+            rows = np.flatnonzero(cls._missing(firms[f]))
+            parts.append(pd.DataFrame({"row": rows, "_lvl": 0, "index": -1, "_k": k, "field": f}))
+        for k, f in enumerate(cls.REQUIRED_LICENSEE_FIELDS):
+            hit = lics[cls._missing(lics[f])]
+            parts.append(pd.DataFrame({"row": hit["row"].to_numpy(), "_lvl": 1, "index": hit["index"].to_numpy(),
+                                       "_k": k, "field": f}))
+        issues = pd.concat(parts, ignore_index=True).sort_values(["row", "_lvl", "index", "_k"], kind="stable")
+        if issues.empty:
+            return pd.DataFrame([])
+
+        # Same frame pd.DataFrame(list_of_issue_dicts) used to produce: columns in order of first
+        # appearance, `index` only when a licensee issue exists (float if firm issues leave NaNs)
+        issues["level"] = np.where(issues["_lvl"] == 0, "firm", "licensee")
+        issues["issue"] = "missing"
+        out_cols = ["row", "level", "field", "issue"]
+        if (issues["_lvl"] == 1).any():
+            index = issues["index"].where(issues["_lvl"] == 1)
+            issues["index"] = index if index.isna().any() else index.astype(int)
+            out_cols = ["row", "level", "index", "field", "issue"] if issues["_lvl"].iloc[0] == 1 \
+                else out_cols + ["index"]
+        return issues[out_cols].reset_index(drop=True)
+
+    @staticmethod
+    def metrics_frames(firms: pd.DataFrame, lics: pd.DataFrame) -> pd.DataFrame:
+        # `not r.get(f)`: falsy or absent
+        empty = ~firms[["licence_start", "licence_end", "licensees"]].astype(bool)
+        counts = empty.sum()
+        return pd.DataFrame([{
+            "total_firms": len(firms),
+            "firms_missing_licence_start": int(counts["licence_start"]),
+            "firms_missing_licence_end": int(counts["licence_end"]),
+            "firms_with_no_licensees": int(counts["licensees"])
+        }])
+
+    @staticmethod
+    def metrics_detail(firms: pd.DataFrame, lics: pd.DataFrame) -> pd.DataFrame:
+        """Long-format breakdowns: metric, key, value (licensees per role/status, start/end years)."""
+        def year(col: pd.Series) -> pd.Series:
+            return col.fillna("").astype(str).str[:4].replace("", "(none)")
+
+        groups = [
+            ("licensees_by_role", lics["role"].fillna("").astype(str)),
+            ("licensees_by_status", lics["status"].fillna("").astype(str)),
+            ("licensee_start_year", year(lics["licence_start"])),
+            ("licensee_end_year", year(lics["licence_end"])),
+            ("firm_start_year", year(firms["licence_start"])),
+            ("firm_end_year", year(firms["licence_end"])),
+        ]
+        frames = [
+            keys.value_counts().sort_index().rename_axis("key").reset_index(name="value").assign(metric=name)
+            for name, keys in groups
+        ]
+        return pd.concat(frames, ignore_index=True)[["metric", "key", "value"]]
 
     @classmethod
-    def validate(cls, records: List[Dict[str, Any]]) -> pd.DataFrame:
-        issues = []
-        for i, rec in enumerate(records):
-            for f in cls.REQUIRED_FIRM_FIELDS:
-                if f not in rec or rec[f] in (None, ""):
-                    issues.append({"row": i, "level": "firm", "field": f, "issue": "missing"})
-            if isinstance(rec.get("licensees"), list):
-                for j, lic in enumerate(rec["licensees"]):
-                    for f in cls.REQUIRED_LICENSEE_FIELDS:
-                        if f not in lic or lic[f] in (None, ""):
-                            issues.append({"row": i, "level": "licensee", "index": j, "field": f, "issue": "missing"})
-        return pd.DataFrame(issues)
+    def validate(cls, records: List[Record]) -> pd.DataFrame:
+        return cls.validate_frames(*cls.flatten(records))
+
+    @classmethod
+    def metrics(cls, records: List[Record]) -> pd.DataFrame:
+        return cls.metrics_frames(*cls.flatten(records))
+
+
+class ValidationAccumulator:
+    """
+    Validator's three outputs built one firm at a time (the fused run in SFCPipeline), equal to
+    validate_frames / metrics_frames / metrics_detail over the same records. Holds the issues
+    found and a counter per breakdown, never the records themselves.
+    """
+    DETAIL_METRICS = ["licensees_by_role", "licensees_by_status", "licensee_start_year", "licensee_end_year",
+                      "firm_start_year", "firm_end_year"]
+
+    def __init__(self):
+        self.rows = 0
+        self.issue_rows: List[Dict[str, Any]] = []
+        self.missing = Counter()
+        self.detail = {name: Counter() for name in self.DETAIL_METRICS}
 
     @staticmethod
-    def metrics(records: List[Dict[str, Any]]) -> pd.DataFrame:
-        total_firms = len(records)
-        missing_start = sum(1 for r in records if not r.get("licence_start"))
-        missing_end = sum(1 for r in records if not r.get("licence_end"))
-        empty_lics = sum(1 for r in records if not r.get("licensees"))
+    def _text(value: Any) -> str:
+        return "" if value is None else str(value)
+
+    @classmethod
+    def _year(cls, value: Any) -> str:
+        return cls._text(value)[:4] or "(none)"
+
+    def add(self, firm: Firm):
+        row = self.rows
+        self.rows += 1
+        for f in Validator.REQUIRED_FIRM_FIELDS:
+            if getattr(firm, f) in (None, ""):
+                self.issue_rows.append({"row": row, "level": "firm", "field": f, "issue": "missing"})
+        for i, lic in enumerate(firm.licensees):
+            for f in Validator.REQUIRED_LICENSEE_FIELDS:
+                if getattr(lic, f) in (None, ""):
+                    self.issue_rows.append({"row": row, "level": "licensee", "index": i, "field": f, "issue": "missing"})
+            self.detail["licensees_by_role"][self._text(lic.role)] += 1
+            self.detail["licensees_by_status"][self._text(lic.status)] += 1
+            self.detail["licensee_start_year"][self._year(lic.licence_start)] += 1
+            self.detail["licensee_end_year"][self._year(lic.licence_end)] += 1
+        for f in ("licence_start", "licence_end", "licensees"):
+            if not getattr(firm, f):
+                self.missing[f] += 1
+        self.detail["firm_start_year"][self._year(firm.licence_start)] += 1
+        self.detail["firm_end_year"][self._year(firm.licence_end)] += 1
+
+    def issues(self) -> pd.DataFrame:
+        return pd.DataFrame(self.issue_rows)
+
+    def metrics(self) -> pd.DataFrame:
         return pd.DataFrame([{
-            "total_firms": total_firms,
-            "firms_missing_licence_start": missing_start,
-            "firms_missing_licence_end": missing_end,
-            "firms_with_no_licensees": empty_lics
+            "total_firms": self.rows,
+            "firms_missing_licence_start": self.missing["licence_start"],
+            "firms_missing_licence_end": self.missing["licence_end"],
+            "firms_with_no_licensees": self.missing["licensees"]
         }])
+
+    def metrics_detail(self) -> pd.DataFrame:
+        rows = [(name, key, n) for name in self.DETAIL_METRICS for key, n in sorted(self.detail[name].items())]
+        return pd.DataFrame(rows, columns=["metric", "key", "value"])
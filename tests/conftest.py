@@ -0,0 +1,27 @@
+import os
+import pytest
+from bench.server import SyntheticSite, start_server
+from config import Config
+
+RUN_DATE = "2026-01-15"
+
+
+@pytest.fixture(scope="session")
+def site() -> SyntheticSite:
+    return SyntheticSite(firms=40, licensees=6)
+
+
+@pytest.fixture(scope="session")
+def site_url(site):
+    server, url = start_server(site)
+    yield url
+    server.shutdown()
+
+
+@pytest.fixture
+def cfg(tmp_path, site_url) -> Config:
+    """A run against the local synthetic site, every file under tmp_path, nothing filtered or pruned."""
+    dirs = {name: os.path.join(str(tmp_path), name.lower()) for name in
+            ("RAW_DIR", "PROCESSED_DIR", "LOGS_DIR", "SNAPSHOT_DIR", "CACHE_DIR", "QUEUE_DIR")}
+    return Config(BASE_URL=site_url, RUN_DATE=RUN_DATE, DAYS_FILTER=100000, SNAPSHOT_WINDOW_DAYS=100000,
+                  TELEMETRY=False, MAX_RETRIES=1, **dirs)
@@ -0,0 +1,82 @@
+import json
+import os
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from bench.server import _day
+from src.backfill import Backfill
+from src.orchestrator import SFCPipeline
+
+
+@pytest.fixture
+def backfilled(cfg):
+    cfg.SNAPSHOT_BACKEND = "sqlite"
+    return Backfill(cfg, "2024-01-20", "2024-03-30", step_days=10), cfg
+
+
+def test_dated_snapshots(backfilled, site, site_url):
+    backfill, cfg = backfilled
+    assert backfill.run() == backfill.dates
+    store = SFCPipeline(cfg).snapshot
+    assert store.dates() == backfill.dates
+
+    firm_url = site_url.replace("SFClicount.asp", "SFClicensees.asp?p=2")
+    for date in ("2024-01-20", "2024-03-30"):
+        firm = next(f for f in store.load(date) if f.firm_url == firm_url)
+        ends = {lic.licensee_id: (lic.licence_end, lic.status) for lic in firm.licensees}
+        # row 0 of firm 2 leaves in February 2024: not known yet on the dated page before, recorded after
+        left = _day(2 + 1500)
+        assert ends[f"A{site.person_id(2, 0):05d}"] == (("", "Active") if date < left else (left, "Inactive"))
+
+    # one dated firm page per firm and distinct list row, not per firm and date
+    assert len(backfill.attempted) < site.firms * len(backfill.dates) / 2
+    with open(os.path.join(cfg.SNAPSHOT_DIR, "backfill.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert sorted(manifest["dates"]) == backfill.dates
+    assert all(e["firm_pages_dated"] + e["firm_pages_reused"] == e["firms"] == site.firms
+               for e in manifest["dates"].values())
+    assert sum(e["firm_pages_dated"] for e in manifest["dates"].values()) == len(backfill.attempted)
+
+
+def test_resume_and_order(backfilled):
+    backfill, cfg = backfilled
+    backfill.run()
+    cfg.RESUME = True
+    assert Backfill(cfg, "2024-01-20", "2024-04-09", step_days=10).run() == ["2024-04-09"]
+    with pytest.raises(SystemExit, match="date order"):
+        Backfill(cfg, "2024-01-01", "2024-01-02").run()
+
+
+def test_window(backfilled):
+    _, cfg = backfilled
+    cfg.SNAPSHOT_WINDOW_DAYS = 90
+    with pytest.raises(SystemExit, match="SNAPSHOT_WINDOW_DAYS to at least"):
+        Backfill(cfg, "2024-01-20", "2024-03-30").run()
+
+
+def test_failed_firm_pages_are_retried_once(backfilled, site, site_url, monkeypatch):
+    backfill, cfg = backfilled
+    http, get = backfill.pipeline.http, backfill.pipeline.http.get
+    tries = Counter()
+
+    def flaky(url, *a, **kw):
+        firm = parse_qs(urlsplit(url).query).get("p", [""])[0] if "SFClicensees" in url else ""
+        tries[firm] += 1
+        if firm == "2" or (firm == "3" and tries[firm] == 1):  # firm 2 always fails, firm 3 once
+            return None
+        return get(url, *a, **kw)
+
+    monkeypatch.setattr(http, "get", flaky)
+    assert backfill.run() == backfill.dates
+    store = SFCPipeline(cfg).snapshot
+    urls = {f.firm_url for f in store.load("2024-03-30")}
+    firm_url = site_url.replace("SFClicount.asp", "SFClicensees.asp?p={}")
+    assert firm_url.format(3) in urls and firm_url.format(2) not in urls
+    # firm 2's list row changes in February 2024: two dated pages, both failed twice
+    failed = sorted(backfill.failed.values())
+    assert len(failed) == 2 and all(url.startswith(f"{firm_url.format(2)}&{cfg.BACKFILL_DATE_PARAM}=") for url in failed)
+    assert tries["2"] == 4 and tries["3"] == len({k for k in backfill.attempted if k[0] == firm_url.format(3)}) + 1
+    with open(os.path.join(cfg.SNAPSHOT_DIR, "backfill.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert all(len(e["firm_pages_failed"]) == 1 and e["firm_pages_failed"][0] in failed and e["firms"] == site.firms - 1
+               for e in manifest["dates"].values())
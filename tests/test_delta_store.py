@@ -0,0 +1,105 @@
+import os
+import random
+from datetime import date, timedelta
+import pytest
+from config import Config
+from src.delta_store import DeltaStore
+from src.schema import Firm, Licensee
+
+DAYS = [(date(2025, 3, 1) + timedelta(days=i)).isoformat() for i in range(12)]
+
+
+def _licensee(n: int, role: str) -> Licensee:
+    return Licensee(f"A{n:05d}", f"Person {n}", role, "Active", "2020-01-01", "", [], f"natperson.asp?p={n}")
+
+
+def _firm(n: int, day: str) -> Firm:
+    lics = [_licensee(n * 10 + j, "Ro" if j == 0 else "Rep") for j in range(3)]
+    return Firm("", f"Firm {n}", f"SFClicensees.asp?p={n}", "2020-01-01", "", day, lics, len(lics))
+
+
+def _evolve(rng: random.Random, firms: list, day: str, next_id: list) -> list:
+    """Next day's firms: some added, removed, with licensees joining/leaving/changing role, most refetched."""
+    out = []
+    for firm in firms:
+        if rng.random() < 0.08:
+            continue
+        firm = Firm.from_dict(firm.to_dict())
+        r = rng.random()
+        if r < 0.1:
+            firm.licensees.append(_licensee(1000 + next_id[0], "Rep"))
+            next_id[0] += 1
+        elif r < 0.2 and firm.licensees:
+            firm.licensees.pop(rng.randrange(len(firm.licensees)))
+        elif r < 0.3 and firm.licensees:
+            lic = rng.choice(firm.licensees)
+            lic.role = "Rep" if lic.role == "Ro" else "Ro"
+        firm.current_licensees_count = len(firm.licensees)
+        if rng.random() < 0.7:
+            firm.last_updated = day
+        out.append(firm)
+    for _ in range(rng.randint(0, 3)):
+        out.append(_firm(100 + next_id[0], day))
+        next_id[0] += 1
+    return out
+
+
+def _key(firms) -> dict:
+    return {f.firm_url: f.to_dict() for f in firms}
+
+
+@pytest.fixture
+def history(tmp_path):
+    """Twelve daily runs with a base every 5 days; returns (store, {date: firms written})."""
+    cfg = Config(SNAPSHOT_DIR=str(tmp_path), SNAPSHOT_BACKEND="delta", SNAPSHOT_BASE_EVERY_DAYS=5)
+    rng, next_id = random.Random(21), [0]
+    firms = [_firm(n, DAYS[0]) for n in range(30)]
+    written = {}
+    for i, day in enumerate(DAYS):
+        if i:
+            firms = _evolve(rng, firms, day, next_id)
+        cfg.RUN_DATE = day
+        DeltaStore(cfg).write_snapshot(firms)
+        written[day] = firms
+    return DeltaStore(cfg), written
+
+
+def test_reconstructs_every_day(history):
+    store, written = history
+    assert store.dates() == DAYS
+    kinds = sorted(name.split(".")[1] for name in os.listdir(store.cfg.SNAPSHOT_DIR))
+    assert kinds.count("base") == 3 and kinds.count("delta") == 9
+    for day in DAYS:
+        assert _key(store.load(day)) == _key(written[day]), day
+    assert store.latest() == (DAYS[-1], store.load(DAYS[-1]))
+
+
+@pytest.mark.parametrize("since,until", [(0, 1), (3, 6), (0, 11), (4, 5)])
+def test_diff(history, since, until):
+    store, written = history
+    old, new = _key(written[DAYS[since]]), _key(written[DAYS[until]])
+    report = store.diff(DAYS[since], DAYS[until])
+
+    assert sorted(r["firm_url"] for r in report["firms_added"]) == sorted(set(new) - set(old))
+    assert sorted(r["firm_url"] for r in report["firms_removed"]) == sorted(set(old) - set(new))
+    joined, left, changed = set(), set(), set()
+    for url in set(old) & set(new):
+        before = {lic["licensee_id"]: lic["role"] for lic in old[url]["licensees"]}
+        after = {lic["licensee_id"]: lic["role"] for lic in new[url]["licensees"]}
+        joined |= {(url, k) for k in after.keys() - before.keys()}
+        left |= {(url, k) for k in before.keys() - after.keys()}
+        changed |= {(url, k) for k in after.keys() & before.keys() if after[k] != before[k]}
+    assert {(r["firm_url"], r["sfc_id"]) for r in report["licensees_joined"]} == joined
+    assert {(r["firm_url"], r["sfc_id"]) for r in report["licensees_left"]} == left
+    assert {(r["firm_url"], r["sfc_id"]) for r in report["role_changed"]} == changed
+    assert joined or left or changed
+
+
+def test_rewrite_latest_replaces_run(history):
+    store, written = history
+    store.cfg.RUN_DATE = DAYS[-1]
+    store.write_snapshot(written[DAYS[-2]])
+    assert _key(store.load(DAYS[-1])) == _key(written[DAYS[-2]])
+    store.cfg.RUN_DATE = DAYS[-2]
+    with pytest.raises(ValueError, match="older than the latest"):
+        store.writer()
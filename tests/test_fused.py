@@ -0,0 +1,63 @@
+import os
+from dataclasses import replace
+import pytest
+from src.orchestrator import SFCPipeline
+from src.person_index import PersonIndex
+
+
+@pytest.fixture
+def ingested(cfg):
+    SFCPipeline(cfg).run("ingest", "ingest")
+    cfg.FUSED_STAGES = True
+    return cfg
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "delta"])
+def test_failure_after_processed_file_aborts_snapshot(ingested, backend, monkeypatch):
+    cfg = ingested
+    cfg.SNAPSHOT_BACKEND = backend
+
+    def broken(*args):
+        raise RuntimeError("disk full")
+
+    pipeline = SFCPipeline(cfg)
+    monkeypatch.setattr(pipeline, "_write_validation", broken)
+    with pytest.raises(RuntimeError, match="disk full"):
+        pipeline.run("transform", "snapshot")
+
+    assert pipeline.snapshot.dates() == []
+    assert not [n for n in os.listdir(cfg.SNAPSHOT_DIR) if n.endswith(".tmp")]
+    if backend == "sqlite":
+        assert pipeline.snapshot.conn.execute("SELECT name FROM temp.sqlite_master").fetchall() == []
+    index = PersonIndex(cfg)
+    assert index.count() == 0
+    index.close()
+
+    SFCPipeline(cfg).run("transform", "snapshot")  # nothing left behind blocks the next attempt
+    assert SFCPipeline(cfg).snapshot.dates() == [cfg.RUN_DATE]
+
+
+def _outputs(cfg) -> dict:
+    files = {}
+    for path in (cfg.PROCESSED_FILE, cfg.VALIDATION_FILE, cfg.METRICS_FILE, cfg.METRICS_DETAIL_FILE):
+        with open(path, "rb") as f:
+            files[os.path.basename(path)] = f.read()
+    index = PersonIndex(cfg)
+    people = (index.count(), index.by_name("Person"))
+    index.close()
+    store = SFCPipeline(cfg).snapshot
+    return {"files": files, "snapshot": [firm.to_dict() for firm in store.load(cfg.RUN_DATE)],
+            "dates": store.dates(), "people": people}
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite", "delta"])
+def test_fused_matches_staged(cfg, tmp_path, backend):
+    SFCPipeline(cfg).run("ingest", "ingest")
+    staged = replace(cfg, SNAPSHOT_BACKEND=backend, FUSED_STAGES=False)
+    fused = replace(staged, FUSED_STAGES=True, **{name: str(tmp_path / "fused" / name.lower()) for name in
+                                                  ("PROCESSED_DIR", "LOGS_DIR", "SNAPSHOT_DIR")})
+    SFCPipeline(staged).run("transform", "snapshot")
+    SFCPipeline(fused).run("transform", "snapshot")
+    expected = _outputs(staged)
+    assert expected["snapshot"] and expected["people"][0]
+    assert _outputs(fused) == expected
@@ -0,0 +1,48 @@
+import threading
+import pytest
+from config import Config
+from src.history import PersonHistoryStage
+from src.schema import Firm, HistoryEntry, Licensee
+
+
+class CountingParser:
+    """Stands in for PersonHistoryParser: one history entry per person page, calls counted."""
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def parse_history(self, person_url: str):
+        with self.lock:
+            self.calls.append(person_url)
+        return [HistoryEntry("Firm", "RO", "1: Dealing in securities", "2019-01-01", person_url)]
+
+
+def _firm(n: int, people) -> Firm:
+    lics = [Licensee(f"A{p:05d}", f"Person {p}", "Rep", "Active", "2019-01-01", "", [], f"natperson.asp?p={p}")
+            for p in people]
+    return Firm(f"CE{n}", f"Firm {n}", f"SFClicensees.asp?p={n}", "2018-01-01", "", "", lics, len(lics), {})
+
+
+def test_each_person_fetched_once():
+    parser, out = CountingParser(), []
+    with PersonHistoryStage(parser, Config(HISTORY_WORKERS=4)) as stage:
+        for n, people in enumerate([(1, 2), (2, 3), (), (1, 3)]):
+            stage.attach(_firm(n, people), out.append)
+    assert sorted(parser.calls) == [f"natperson.asp?p={p}" for p in (1, 2, 3)]
+    assert sorted(f.firm_id for f in out) == ["CE0", "CE1", "CE2", "CE3"]
+    for firm in out:
+        assert all(lic.history[0].until == lic.person_url for lic in firm.licensees)
+
+
+def test_sink_errors_are_raised_on_exit():
+    def sink(rec: Firm):
+        if rec.firm_id == "CE1":
+            raise ValueError("disk full")
+        out.append(rec)
+
+    out = []
+    with pytest.raises(ValueError, match="disk full"):
+        with PersonHistoryStage(CountingParser(), Config(HISTORY_WORKERS=2)) as stage:
+            for n in range(3):
+                stage.attach(_firm(n, (n,)), sink)
+    assert sorted(f.firm_id for f in out) == ["CE0", "CE2"]
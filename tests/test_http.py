@@ -0,0 +1,65 @@
+import asyncio
+import io
+import time
+from dataclasses import replace
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from config import Config
+from src.async_http import AsyncHttpClient
+from src.orchestrator import SFCPipeline
+from src.utils import HttpClient, _encoding
+
+BODY = "<p>Café 中文</p>"
+
+
+def _response(content_type: str, body: bytes) -> requests.Response:
+    """A streamed response as requests.Session would build it, without a socket."""
+    r = requests.Response()
+    r.status_code, r.url, r.raw = 200, "http://test/", io.BytesIO(body)
+    r.headers = CaseInsensitiveDict({"Content-Type": content_type})
+    r.encoding = get_encoding_from_headers(r.headers)
+    return r
+
+
+@pytest.mark.parametrize("content_type, body, expected", [
+    ("text/html", BODY.encode("utf-8"), "utf-8"),  # requests would say ISO-8859-1
+    ("text/html; charset=utf-8", BODY.encode("utf-8"), "utf-8"),
+    ("text/html; charset=big5", "<p>中文</p>".encode("big5"), "big5"),
+    ("application/octet-stream", BODY.encode("utf-8"), "utf-8"),
+])
+def test_encoding(content_type, body, expected):
+    r = _response(content_type, body)
+    assert _encoding(r) == expected
+    streamed = "".join(HttpClient(Config())._body(r.url, r, time.perf_counter(), 0, 3))
+    assert streamed == body.decode(expected)
+
+
+async def _fetch_async(cfg: Config, urls):
+    async with AsyncHttpClient(cfg) as http:
+        return await asyncio.gather(*(http.get(url) for url in urls))
+
+
+def test_async_matches_threaded(cfg, site_url):
+    pytest.importorskip("aiohttp")
+    urls = [site_url] + [site_url.replace("SFClicount.asp", f"SFClicensees.asp?p={i}") for i in range(3)]
+    threaded = [HttpClient(cfg).get(url) for url in urls]
+    for a, t in zip(asyncio.run(_fetch_async(cfg, urls)), threaded):
+        assert (a.status_code, a.text) == (t.status_code, t.text)
+        assert a.headers["content-type"] == a.headers["Content-Type"] == t.headers["content-type"]
+        assert a.headers.get("etag") == t.headers.get("ETag")
+
+
+def test_async_engine_matches_thread_engine(cfg):
+    pytest.importorskip("aiohttp")
+    records = {}
+    for engine in ("thread", "async"):
+        pipeline = SFCPipeline(replace(cfg, FETCH_ENGINE=engine, LIST_STREAMING=False,
+                                       FETCH_LICENSEE_HISTORY=True))
+        stubs = pipeline.list_parser.parse(pipeline.fetch_list())[:8]
+        out = []
+        pipeline.fetch(stubs, out.append)
+        records[engine] = sorted((f.to_dict() for f in out), key=lambda d: d["firm_url"])
+    assert records["async"] == records["thread"]
+    assert any(lic["history"] for rec in records["thread"] for lic in rec["licensees"])
@@ -0,0 +1,91 @@
+import random
+import re
+import pytest
+from config import Config
+from src.scraper_bsoup import ListPageParser
+
+HEAD = ("<tr><th>Row</th><th>Name</th><th>RO</th><th>Rep</th><th>Total</th><th>RO</th><th>Rep</th>"
+        "<th>Total</th><th>Change</th><th>Rep%</th><th>End%</th><th>Licence start</th><th>Licence end</th></tr>")
+
+
+def _row(i: int, name: str = "", tail: str = "</td></tr>") -> str:
+    name = name or f"<a href='SFClicensees.asp?p={i}'>Firm {i}</a>"
+    return (f"<tr><td>{i}</td><td>{name}</td>" + "".join(f"<td>{i + k}</td>" for k in range(7))
+            + f"<td>50.0</td><td>0.0</td><td>2020-01-{i + 1:02d}</td><td>{tail}")
+
+
+# list pages where a tokenizer that only tracks table/tr/td would drift from the html.parser tree
+PAGES = {
+    "nested_table_in_name": "<table>" + HEAD + _row(1, "<a href='SFClicensees.asp?p=1'>A</a>"
+                                                       "<table><tr><td>x</td></tr></table>") + _row(2) + "</table>",
+    "unclosed_cells": "<table>" + HEAD + "<tr><td>1<td><a href='SFClicensees.asp?p=1'>A</a><td>2<td>3"
+                      "<td>4<td>5<td>6<td>7<td>8<td>9<td>10<td>2020-01-01<td>" + _row(2) + "</table>",
+    "unclosed_rows": "<table>" + HEAD + "".join(_row(i, tail="") for i in range(1, 4)) + "</table>",
+    "div_closes_table": "<div><table>" + HEAD + _row(1) + "</div>" + _row(2) + "</table>",
+    "stray_end_tags": "<table>" + HEAD + _row(1).replace("</a>", "</a></p></span>") + "</tr></td>" + _row(2)
+                      + "</table>",
+    "comments_scripts": "<table><!-- <tr><td>no</td></tr> -->" + HEAD + _row(1, "<a href='SFClicensees.asp?p=1'>"
+                        "A<script>var s = '<td>';</script><style>b{}</style>B</a><!--c-->C") + "</table>",
+    "voids": "<table>" + HEAD + _row(1, "<a href='SFClicensees.asp?p=1'>A<br>B</br> C<img src=x/>D</a>")
+             + "</table>",
+    "header_table_after_layout": "<table><tr><td>menu</td></tr></table><table>" + HEAD + _row(1) + "</table>",
+    "no_header_falls_back": "<table><tr><td>x</td></tr>" + _row(1) + _row(2) + "</table><table>" + _row(3)
+                            + "</table>",
+    "header_in_nested_table": "<table><tr><td><table>" + HEAD + _row(1) + "</table></td></tr>" + _row(2)
+                              + "</table>",
+    "entities_cdata": "<table>" + HEAD + _row(1, "<a href='SFClicensees.asp?p=1&amp;d=1'>A &amp; B<![CDATA[x]]>"
+                      "&#67;o.</a>") + "</table>",
+}
+TAGS = ("table", "tr", "td", "th", "a", "div", "p", "br", "span", "script", "b")
+NOISE = ("<!-- x -->", " ", "\n", "<br/>", "&amp;", "Name", "licence", "x", "2021-02-03", "<th>Total</th>")
+
+
+def _fuzz_page(rng: random.Random) -> str:
+    """A valid list page with tags dropped, moved, and stray tags and text spliced in."""
+    tokens = re.findall(r"<[^>]*>|[^<]+", "<table>" + HEAD + "".join(_row(i) for i in range(1, 6)) + "</table>")
+    for _ in range(rng.randint(1, 12)):
+        i = rng.randrange(len(tokens))
+        r = rng.random()
+        if r < 0.3:
+            del tokens[i]
+        elif r < 0.45:
+            tokens.insert(rng.randrange(len(tokens)), tokens.pop(i))
+        elif r < 0.8:
+            tag = rng.choice(TAGS)
+            tokens.insert(i, f"<{tag}>" if rng.random() < 0.5 else f"</{tag}>")
+        else:
+            tokens.insert(i, rng.choice(NOISE))
+    return "".join(tokens)
+
+
+def _stream(html: str, size: int):
+    return list(ListPageParser(Config()).iter_parse(html[i:i + size] for i in range(0, len(html), size)))
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+@pytest.mark.parametrize("size", [1, 7, 64, 1 << 20])
+def test_iter_parse_matches_parse(name, size):
+    html = "<html><body>" + PAGES[name] + "</body></html>"
+    assert _stream(html, size) == ListPageParser(Config()).parse(html)
+
+
+def test_nested_table_text_counts_toward_name():
+    stubs = _stream(PAGES["nested_table_in_name"], 64)
+    assert [s["firm_name"] for s in stubs] == ["Ax", "Firm 2"]
+
+
+@pytest.mark.parametrize("size", [3, 64, 1 << 20])
+def test_iter_parse_matches_parse_on_site(site, size):
+    html = site.list_page()
+    assert _stream(html, size) == ListPageParser(Config()).parse(html)
+
+
+def test_iter_parse_matches_parse_fuzz():
+    rng = random.Random(17)
+    found = 0
+    for _ in range(300):
+        html = _fuzz_page(rng)
+        expected = ListPageParser(Config()).parse(html)
+        assert _stream(html, rng.choice((1, 5, 1 << 20))) == expected, html
+        found += len(expected)
+    assert found > 300  # the corpus still yields firms
@@ -0,0 +1,75 @@
+import pytest
+from config import Config
+from src.html_backend import resolve_backend
+from src.scraper_bsoup import FirmDetailParser, ListPageParser, PersonHistoryParser
+
+STUB = {"firm_name": "Fixture", "firm_url": "https://webb-site.com/dbpub/SFClicensees.asp?p=1",
+        "licence_start_list": "2001-01-01", "licence_end_list": ""}
+LICENSEES = ("<table><tr><th>Name</th><th>SFC ID</th><th>Role</th><th>From</th><th>Until</th></tr>"
+             "<tr><td><a href='natperson.asp?p=1'>Chan Tai Man</a></td><td>AAA001</td><td>RO</td>"
+             "<td>2018-03-03</td><td></td></tr></table>")
+# firm pages whose "Licence start/end" values a table-only tree could lose
+LABEL_LAYOUTS = {
+    "in_table": "<table><tr><td>Licence start</td><td>2019-05-05</td></tr>"
+                "<tr><td>Licence end</td><td>2024-01-31</td></tr></table>",
+    "value_after_table": "<table><tr><td>Licence start</td></tr></table><div>2019-05-05</div>",
+    "value_in_next_table": "<table><tr><td>Licence start</td></tr></table><table><tr><td>2019-05-05</td></tr></table>",
+    "label_outside": "<div>Licence start</div><div>2019-05-05</div><p>Licence end</p><span>2024-01-31</span>",
+    "missing": "",
+}
+MALFORMED = ("<table><tr><th>Name</th><th>SFC ID</th><th>Role</th><th>From</th><th>Until</th></tr>"
+             "<tr><td><a href='natperson.asp?p=1'>Chan Tai Man<td>AAA001<td>RO<td>2019-05-05<td>"
+             "<tr><td>Lee Siu Ming</td><td>BBB002<td>Rep</td><td>2020-02-02<td>2021-03-03</table>")
+
+
+def _modes():
+    for backend in ("html.parser", "lxml", "html5lib"):
+        for targeted in (False, True):
+            if resolve_backend(backend) == backend:
+                yield backend, targeted
+
+
+def _page(*parts: str) -> str:
+    return "<html><body><h2>Firm</h2>" + "".join(parts) + "</body></html>"
+
+
+def _parse_all(cfg: Config, site) -> dict:
+    firm = FirmDetailParser(None, cfg)
+    return {
+        "list": ListPageParser(cfg).parse(site.list_page()),
+        "firm": [firm.parse_html(STUB, site.firm_page(i)) for i in range(5)],
+        "person": [PersonHistoryParser(None, cfg).parse_history_html(site.person_page(i)) for i in range(5)],
+        "labels": [firm.parse_html(STUB, _page(html, LICENSEES)) for html in LABEL_LAYOUTS.values()],
+    }
+
+
+def test_default_is_html_parser_full_tree():
+    cfg = Config()
+    assert (cfg.HTML_PARSER, cfg.HTML_TARGETED) == ("html.parser", False)
+
+
+@pytest.mark.parametrize("backend,targeted", list(_modes()))
+def test_backends_match_html_parser(site, backend, targeted):
+    baseline = _parse_all(Config(HTML_PARSER="html.parser", HTML_TARGETED=False), site)
+    assert _parse_all(Config(HTML_PARSER=backend, HTML_TARGETED=targeted), site) == baseline
+
+
+@pytest.mark.parametrize("layout", sorted(LABEL_LAYOUTS))
+def test_targeted_labels(layout):
+    html = _page(LABEL_LAYOUTS[layout], LICENSEES)
+    full = FirmDetailParser(None, Config()).parse_html(STUB, html)
+    targeted = FirmDetailParser(None, Config(HTML_TARGETED=True)).parse_html(STUB, html)
+    assert targeted == full
+    if layout == "value_after_table":
+        assert full.licence_start == "2019-05-05"
+
+
+def test_malformed_rows():
+    html = _page(MALFORMED)
+    full = FirmDetailParser(None, Config()).parse_html(STUB, html)
+    assert FirmDetailParser(None, Config(HTML_TARGETED=True)).parse_html(STUB, html) == full
+    if resolve_backend("lxml") == "lxml":
+        # lxml closes the open cells itself; why it is opt-in rather than the default
+        lxml = FirmDetailParser(None, Config(HTML_PARSER="lxml")).parse_html(STUB, html)
+        assert [lic.name for lic in lxml.licensees] == ["Chan Tai Man", "Lee Siu Ming"]
+        assert lxml.licensees != full.licensees
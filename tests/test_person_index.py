@@ -0,0 +1,48 @@
+import sqlite3
+import pytest
+from src.orchestrator import SFCPipeline
+from src.person_index import PersonIndex
+
+
+@pytest.fixture
+def index(cfg):
+    SFCPipeline(cfg).run()
+    index = PersonIndex(cfg)
+    yield index
+    index.close()
+
+
+def test_by_id_and_name(index, site):
+    pid = site.person_id(3, 0)
+    found = index.by_id(f"A{pid:05d}")
+    assert found["name"] == f"Person {pid}"
+    assert any(p["firm_name"] == "Firm 3 Limited" and p["role"] == "Ro" for p in found["postings"])
+    assert all(p["first_seen"] == p["last_seen"] == index.cfg.RUN_DATE for p in found["postings"])
+    assert f"A{pid:05d}" in [r["sfc_id"] for r in index.by_name(f"person {pid}")]
+    assert index.by_id("NOPE") is None
+
+
+def test_by_firm(index, site, site_url):
+    url = site_url.replace("SFClicount.asp", "SFClicensees.asp?p=3")
+    by_url = index.by_firm(url)
+    assert len(by_url) == len({site.person_id(3, j) for j in range(site.licensees)})
+    assert all(p["firm_url"] == url for r in by_url for p in r["postings"])
+
+    by_name = index.by_firm_name("firm 3 ")
+    assert by_name == by_url
+    assert {p["firm_name"] for r in index.by_firm_name("FIRM 3") for p in r["postings"]} == \
+        {"Firm 3 Limited", "Firm 30 Limited", "Firm 31 Limited", "Firm 32 Limited", "Firm 33 Limited",
+         "Firm 34 Limited", "Firm 35 Limited", "Firm 36 Limited", "Firm 37 Limited", "Firm 38 Limited",
+         "Firm 39 Limited"}
+
+
+def test_firm_name_lookup_is_indexed(index):
+    plan = index.conn.execute("EXPLAIN QUERY PLAN SELECT DISTINCT person_key FROM postings WHERE 1 "
+                              "AND firm_name >= ? COLLATE NOCASE AND firm_name < ? COLLATE NOCASE", ("a", "b"))
+    assert "postings_firm_name" in " ".join(str(tuple(r)) for r in plan)
+
+
+def test_rebuild(index, cfg):
+    before = index.by_firm_name("firm")
+    assert index.rebuild(SFCPipeline(cfg).snapshot) == 1
+    assert index.by_firm_name("firm") == before
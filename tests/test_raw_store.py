@@ -0,0 +1,77 @@
+import json
+import os
+from src.orchestrator import SFCPipeline
+from src.raw_store import RawWriter, read_raw
+from src.schema import Firm
+
+
+def _firms(n: int, start: int = 0):
+    return [Firm(firm_name=f"Firm {i}", firm_url=f"https://example.org/firm?p={i}") for i in range(start, start + n)]
+
+
+def test_checkpoint_has_constant_size(cfg):
+    cfg.CHECKPOINT_EVERY = 10
+    cfg.ensure_dirs()
+    writer = RawWriter(cfg)
+    sizes = []
+    for firm in _firms(500):
+        writer.write(firm)
+        if writer.written % 100 == 0:
+            sizes.append(os.path.getsize(cfg.CHECKPOINT_FILE))
+    writer.close()
+    with open(cfg.CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+        ckpt = json.load(f)
+    assert ckpt == {"run_date": cfg.RUN_DATE, "offset": os.path.getsize(cfg.RAW_FILE), "records": 500}
+    assert max(sizes) - min(sizes) <= 2
+
+
+def test_resume_cuts_torn_line(cfg):
+    cfg.CHECKPOINT_EVERY = 7
+    cfg.ensure_dirs()
+    writer = RawWriter(cfg)
+    for firm in _firms(20):
+        writer.write(firm)
+    writer.f.write(b'{"firm_url": "https://example.org/fi')  # died mid-line, checkpoint at 14 records
+    writer.f.close()
+
+    cfg.RESUME = True
+    writer = RawWriter(cfg)
+    assert writer.done == {f.firm_url for f in _firms(20)}
+    for firm in _firms(5, start=20):
+        writer.write(firm)
+    writer.close()
+    assert [r.firm_url for r in read_raw(cfg.RAW_FILE)] == [f.firm_url for f in _firms(25)]
+
+
+def test_resume_file_shorter_than_checkpoint(cfg):
+    cfg.CHECKPOINT_EVERY = 5
+    cfg.ensure_dirs()
+    writer = RawWriter(cfg)
+    for firm in _firms(10):
+        writer.write(firm)
+    writer.close()
+    with open(cfg.RAW_FILE, "rb") as f:
+        lines = f.readlines()
+    with open(cfg.RAW_FILE, "wb") as f:
+        f.writelines(lines[:4])
+
+    cfg.RESUME = True
+    writer = RawWriter(cfg)
+    writer.close()
+    assert writer.done == {f.firm_url for f in _firms(4)}
+
+
+def test_ingest_resume(cfg, site):
+    pipeline = SFCPipeline(cfg)
+    pipeline.ingest()
+    with open(cfg.RAW_FILE, "rb") as f:
+        lines = f.readlines()
+    with open(cfg.RAW_FILE, "wb") as f:
+        f.writelines(lines[:15])
+        f.write(lines[15][:40])
+
+    cfg.RESUME = True
+    SFCPipeline(cfg).ingest()
+    urls = [r.firm_url for r in read_raw(cfg.RAW_FILE)]
+    assert len(urls) == len(set(urls)) == site.firms
+    assert [r.firm_url for r in read_raw(cfg.RAW_FILE)][:15] == [Firm.from_dict(json.loads(l)).firm_url for l in lines[:15]]
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+from bench.server import FIRM_PATH, Faults, SyntheticSite, start_server
+from config import Config
+from src.retry import (AimdLimit, AsyncConcurrencyGate, ConcurrencyGate, RetryBudget, RetryPolicy,
+                       parse_retry_after)
+from src.utils import HttpClient
+
+
+@pytest.fixture
+def throttled():
+    """A stand-in server answering every request with 429 and Retry-After: 7."""
+    faults = Faults(error_rate=1.0, error_codes=(429,), retry_after=7)
+    server, url = start_server(SyntheticSite(firms=5, licensees=3), faults=faults)
+    yield url.replace(url[url.index("/dbpub"):], FIRM_PATH), faults
+    server.shutdown()
+
+
+def _recording(http: HttpClient) -> list:
+    """Record each backoff the client computes, without sleeping through it."""
+    waits, backoff = [], http.policy.backoff
+    http.policy.backoff = lambda attempts, retry_after=None: waits.append(backoff(attempts, retry_after)) or 0.0
+    return waits
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after(" 0 ") == 0.0
+    assert parse_retry_after("-5") == 0.0
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 28 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+    assert parse_retry_after(format_datetime(datetime.now(timezone.utc) - timedelta(hours=1), usegmt=True)) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_honours_retry_after_and_cap():
+    policy = RetryPolicy(Config(RETRY_MAX_DELAY=60.0, BACKOFF_SECONDS=2.0), 8)
+    assert policy.backoff(1, "7") == 7.0
+    when = datetime.now(timezone.utc) + timedelta(seconds=20)
+    assert 18 <= policy.backoff(1, format_datetime(when, usegmt=True)) <= 20
+    assert policy.backoff(1, "3600") == 60.0
+    assert all(0 <= policy.backoff(3) <= 8.0 for _ in range(100))  # full jitter up to 2 * 2**2
+
+
+def test_retry_after_from_server(throttled):
+    firm_url, faults = throttled
+    http = HttpClient(Config(MAX_RETRIES=3))
+    waits = _recording(http)
+    assert http.get(firm_url + "?p=1") is None
+    assert faults.statuses[429] == 3
+    assert waits == [7.0, 7.0]
+
+
+def test_can_retry_only_retryable_statuses():
+    policy = RetryPolicy(Config(MAX_RETRIES=3), 8)
+    assert policy.can_retry(1, 503) and policy.can_retry(2, 0)
+    assert not policy.can_retry(3, 503)  # attempts used up
+    assert not policy.can_retry(1, 404)
+
+
+def test_budget():
+    budget = RetryBudget(ratio=0.5, minimum=1)
+    for _ in range(4):
+        budget.request()
+    assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+    assert (budget.retries, budget.exhausted) == (3, 1)
+
+
+def test_retries_stop_when_budget_is_spent(throttled):
+    firm_url, faults = throttled
+    http = HttpClient(Config(MAX_RETRIES=5, RETRY_BUDGET_MIN=2, RETRY_BUDGET_RATIO=0.0))
+    _recording(http)
+    for p in range(3):
+        assert http.get(f"{firm_url}?p={p}") is None
+    assert faults.statuses[429] == 3 + 2  # one attempt each, plus the two retries the budget allows
+    assert http.policy.stats()["retry_budget_exhausted"] == 3
+
+
+def test_aimd():
+    limit = AimdLimit(initial=8, minimum=1, maximum=32)
+    limit.observe(0.1, False)
+    assert limit.limit == 9  # slow start: +1 per healthy response
+    limit.observe(0.1, True)
+    assert limit.limit == 4.5  # throttle: halved, slow start over
+    limit.observe(0.1, True)
+    assert limit.limit == 4.5  # same burst (within one smoothed latency): not cut again
+    for _ in range(5):
+        limit.observe(0.1, False)
+    assert 5.4 < limit.limit < 5.6  # about one more per window of `limit` responses
+    fixed = AimdLimit(initial=8, minimum=1, maximum=32, adaptive=False)
+    fixed.observe(0.1, True)
+    assert fixed.current == 8
+
+
+def _peak(enter, leave, n: int = 12) -> int:
+    """Highest number of workers seen inside the gate at once."""
+    inside, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with enter():
+            with lock:
+                inside[0] += 1
+                peak[0] = max(peak[0], inside[0])
+            time.sleep(0.01)
+            with lock:
+                inside[0] -= 1
+        leave()
+
+    threads = [threading.Thread(target=work) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return peak[0]
+
+
+def test_concurrency_gate():
+    limit = AimdLimit(initial=3, minimum=1, maximum=3, adaptive=False)
+    gate = ConcurrencyGate(limit)
+    assert _peak(lambda: gate, lambda: None) == 3
+    assert gate.in_flight == 0
+
+
+def test_async_concurrency_gate():
+    async def run():
+        gate = AsyncConcurrencyGate(AimdLimit(initial=2, minimum=1, maximum=2, adaptive=False))
+        inside, peak = [0], [0]
+
+        async def work():
+            async with gate:
+                inside[0] += 1
+                peak[0] = max(peak[0], inside[0])
+                await asyncio.sleep(0.01)
+                inside[0] -= 1
+
+        await asyncio.gather(*(work() for _ in range(10)))
+        return peak[0], gate.in_flight
+
+    assert asyncio.run(run()) == (2, 0)
@@ -0,0 +1,77 @@
+import os
+import time
+import pytest
+from src.orchestrator import SFCPipeline
+from src.raw_store import RawWriter, read_raw
+from src.shards import Heartbeat, ShardedRun, queued_run_date
+
+
+def _planned(cfg, shard_size=10) -> ShardedRun:
+    cfg.SHARD_SIZE = shard_size
+    run = ShardedRun(SFCPipeline(cfg))
+    assert run.plan() == 4
+    return run
+
+
+def test_plan_work_merge(cfg, site):
+    run = _planned(cfg)
+    assert run.work() == 4
+    run.merge()
+    assert sorted(int(r.firm_url.rsplit("=", 1)[1]) for r in read_raw(cfg.RAW_FILE)) == list(range(site.firms))
+
+
+def test_reclaim_after_expired_lease_keeps_own_part(cfg, site):
+    run = _planned(cfg)
+    name, claimed = run.queue.claim(run.worker)
+    stubs = run.queue.load(claimed)
+    part = run.queue.part_path(name, run.worker)
+    writer = RawWriter(cfg, part, resume=False)
+    run.pipeline.fetch(stubs[:3], writer.write)  # the worker stalls after three firms ...
+    writer.close()
+    os.utime(claimed, (0, 0))  # ... until its lease runs out
+
+    assert run.work() == 4  # requeues the shard and claims it again itself
+    assert len(list(read_raw(part))) == len(stubs)
+    run.merge()
+    assert len(list(read_raw(cfg.RAW_FILE))) == site.firms
+
+
+def test_work_gives_up_without_plan(cfg):
+    cfg.SHARD_PLAN_WAIT_MINUTES = 0
+    with pytest.raises(SystemExit, match="has not been planned"):
+        ShardedRun(SFCPipeline(cfg)).work()
+
+
+def test_queued_run_date(cfg):
+    with pytest.raises(SystemExit):
+        queued_run_date(cfg)
+    for date in ("2026-01-14", "2026-01-15"):
+        os.makedirs(os.path.join(cfg.QUEUE_DIR, date))
+    assert queued_run_date(cfg) == "2026-01-15"
+
+
+def test_lease_renewed_during_a_slow_fetch(cfg, monkeypatch):
+    run = _planned(cfg)
+    cfg.SHARD_LEASE_MINUTES = 0.3 / 60
+    lease, fetch, requeued = cfg.SHARD_LEASE_MINUTES * 60, run.pipeline.fetch, []
+
+    def slow(stubs, sink):
+        time.sleep(3 * lease)  # one page taking longer than the lease
+        requeued.append(run.queue.requeue_stale(lease))
+        fetch(stubs, sink)
+
+    monkeypatch.setattr(run.pipeline, "fetch", slow)
+    assert run.work() == 4
+    assert requeued == [0, 0, 0, 0]
+
+
+def test_heartbeat_stops_when_claim_is_lost(tmp_path):
+    claimed = tmp_path / "shard-00000.json.w"
+    claimed.write_text("[]")
+    os.utime(claimed, (0, 0))
+    with Heartbeat(str(claimed), 0.02) as beat:
+        time.sleep(0.1)
+        assert time.time() - os.path.getmtime(claimed) < 1
+        claimed.unlink()
+        beat.thread.join(1)
+        assert not beat.thread.is_alive()
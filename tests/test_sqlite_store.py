@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+import pytest
+from config import Config
+from src.schema import Firm, HistoryEntry, Licensee
+from src.sqlite_store import SQLiteStore
+
+
+def _days_ago(n: int) -> str:
+    return (date.today() - timedelta(days=n)).isoformat()
+
+
+D1, D2, D3 = _days_ago(30), _days_ago(20), _days_ago(10)
+HISTORY = [HistoryEntry("Firm A", "RO", "1: Dealing in securities", "2019-01-01", ""),
+           HistoryEntry("Firm Z", "Rep", "4: Advising on securities", "2015-01-01", "2018-12-31")]
+
+
+def _lic(n: int, role: str, end: str = "") -> Licensee:
+    return Licensee(f"A{n:05d}", f"Person {n}", role, "Inactive" if end else "Active", "2019-01-01", end,
+                    HISTORY if n == 1 else [], f"natperson.asp?p={n}")
+
+
+def _firm(n: int, day: str, lics) -> Firm:
+    return Firm(f"CE{n}", f"Firm {n}", f"SFClicensees.asp?p={n}", "2018-01-01", "", day, list(lics), len(lics),
+                {"ro": 1, "rep": len(lics) - 1, "total": len(lics), "licence_start": "2018-01-01", "licence_end": ""})
+
+
+def _runs():
+    """Three dated runs: a role change, a firm leaving and one joining, a licensee leaving, a firm carried forward."""
+    return {
+        D1: [_firm(1, D1, [_lic(1, "Ro"), _lic(2, "Rep")]), _firm(2, D1, [_lic(3, "Ro")])],
+        D2: [_firm(1, D2, [_lic(1, "Ro"), _lic(2, "Ro")]), _firm(3, D2, [_lic(4, "Rep")])],
+        D3: [_firm(3, D2, [_lic(4, "Rep")]), _firm(1, D3, [_lic(1, "Ro"), _lic(2, "Ro", end=D3)])],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    cfg = Config(SNAPSHOT_DIR=str(tmp_path), SNAPSHOT_BACKEND="sqlite", SNAPSHOT_WINDOW_DAYS=100000)
+    s = SQLiteStore(cfg)
+    for day, firms in _runs().items():
+        cfg.RUN_DATE = day
+        s.write_snapshot(firms)
+    yield s
+    s.close()
+
+
+def _dicts(firms, ordered: bool = True):
+    """Records as dicts; unordered for past runs, whose firm order is the latest run's."""
+    out = [f.to_dict() for f in firms]
+    return out if ordered else sorted(out, key=lambda d: d["firm_url"])
+
+
+def test_as_of_each_run(store):
+    runs = _runs()
+    assert store.dates() == [D1, D2, D3]
+    for day, firms in runs.items():
+        assert _dicts(store.as_of(day), day == D3) == _dicts(firms, day == D3), day
+    assert _dicts(store.as_of(_days_ago(25)), False) == _dicts(runs[D1], False)  # between runs: the earlier one
+    assert store.as_of(_days_ago(40)) == []
+    assert store.latest()[0] == D3
+
+
+def test_only_changed_rows_get_new_versions(store):
+    # firm 1 is fetched on every run: one version; firm 3 is carried forward on D3 with its D2 date
+    rows = store.conn.execute("SELECT firm_url, COUNT(*) FROM firm_versions GROUP BY firm_url ORDER BY firm_url")
+    assert rows.fetchall() == [("SFClicensees.asp?p=1", 1), ("SFClicensees.asp?p=2", 1), ("SFClicensees.asp?p=3", 2)]
+    (closed,) = store.conn.execute(
+        "SELECT recorded_to FROM firm_versions WHERE firm_url = 'SFClicensees.asp?p=2'").fetchone()
+    assert closed == D2
+    (n,) = store.conn.execute("SELECT COUNT(*) FROM history_versions").fetchone()
+    assert n == len(HISTORY)
+
+
+def test_changes_and_timeline(store):
+    changes = [(c["change"], c["run_date"], c["sfc_id"], c["role"]) for c in store.changes(D1)]
+    assert changes == [
+        ("added", D2, "A00002", "Ro"), ("removed", D2, "A00002", "Rep"),
+        ("removed", D2, "A00003", "Ro"), ("added", D2, "A00004", "Rep"),
+        ("added", D3, "A00002", "Ro"), ("removed", D3, "A00002", "Ro"),
+    ]
+    assert [c["run_date"] for c in store.changes(D1, D2)] == [D2] * 4
+    timeline = [(t["role"], t["licence_end"], t["recorded_from"], t["recorded_to"])
+                for t in store.licensee_timeline("A00002")]
+    assert timeline == [("Rep", "", D1, D2), ("Ro", "", D2, D3), ("Ro", D3, D3, None)]
+
+
+def test_rerun_of_latest_date_replaces_it(store):
+    store.cfg.RUN_DATE = D3
+    firms = [_firm(1, D3, [_lic(1, "Rep")])]
+    store.write_snapshot(firms)
+    assert _dicts(store.as_of(D3)) == _dicts(firms)
+    assert _dicts(store.as_of(D2), False) == _dicts(_runs()[D2], False)
+    store.cfg.RUN_DATE = D2
+    with pytest.raises(ValueError, match="older than the latest"):
+        store.writer()
+
+
+def test_duplicate_firm_in_one_run_keeps_the_last(store):
+    store.cfg.RUN_DATE = _days_ago(5)
+    first, last = _firm(5, store.cfg.RUN_DATE, [_lic(7, "Ro")]), _firm(5, store.cfg.RUN_DATE, [_lic(8, "Rep")])
+    store.write_snapshot([first, last])
+    assert _dicts(store.as_of(store.cfg.RUN_DATE)) == _dicts([last])
+    (current,) = store.conn.execute(
+        "SELECT COUNT(*) FROM firm_versions WHERE firm_url = ? AND recorded_to IS NULL", (last.firm_url,)).fetchone()
+    assert current == 1
+    assert store.conn.execute("SELECT firms FROM runs WHERE run_date = ?", (store.cfg.RUN_DATE,)).fetchone() == (1,)
+
+
+def test_prune(store):
+    store.cfg.SNAPSHOT_WINDOW_DAYS = 15
+    store.prune()
+    assert store.dates() == [D3]
+    assert _dicts(store.as_of(D3)) == _dicts(_runs()[D3])
+    (closed,) = store.conn.execute("SELECT COUNT(*) FROM licensee_versions WHERE recorded_to < ?",
+                                   (_days_ago(15),)).fetchone()
+    assert closed == 0
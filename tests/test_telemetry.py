@@ -0,0 +1,39 @@
+import pstats
+import sys
+import threading
+import pytest
+from config import Config
+from src import telemetry
+from src.telemetry import Telemetry
+
+
+def _thread_work():
+    return sum(range(1000))
+
+
+def _main_work():
+    return sum(range(1000))
+
+
+def _profiled_functions(tmp_path) -> set:
+    tel = Telemetry(Config(LOGS_DIR=str(tmp_path), PROFILER="cprofile"))
+    with tel.profiling():
+        _main_work()
+        t = threading.Thread(target=_thread_work)
+        t.start()
+        t.join()
+    return {name for _, _, name in pstats.Stats(tel.profile_path).stats}
+
+
+@pytest.mark.parametrize("threads", [True, False])
+def test_cprofile_threads(tmp_path, monkeypatch, threads):
+    if threads and sys.version_info >= (3, 12):
+        pytest.skip("one active cProfile per process on Python 3.12+")
+    monkeypatch.setattr(telemetry, "CPROFILE_THREADS", threads)
+    names = _profiled_functions(tmp_path)
+    assert "_main_work" in names
+    assert ("_thread_work" in names) == threads
+
+
+def test_cprofile_default_runs_on_this_python(tmp_path):
+    assert "_main_work" in _profiled_functions(tmp_path)